@@ -1,31 +1,69 @@
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_openai import ChatOpenAI
-from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.constants import END
 from langgraph.graph import StateGraph
 from langgraph.types import interrupt, Command
-from src.utils.set_logging import logger
-from src.utils.state import AgentState
+from src.utils.artifacts import artifact_index, artifact_path
+from src.utils.calibration import calibration_store, section_type
+from src.utils.checkpoint_serde import CompactSerializer
+from src.utils.checkpointing import CoalescingSaver
+from src.utils.exporters import export_title, stream_approved_sections
+from src.utils.llm import batch_model, chat_model, invoke_model
+from src.utils.metrics import node_timing
+from src.utils.nodes import wrap_node
+from src.utils.tracing import node_span
+from src.utils.usage import over_budget, summarize_usage, total_tokens, usage_metering
+from src.utils.patching import (
+    PATCH_MIN_PARAGRAPHS,
+    apply_patch,
+    build_patch_prompt,
+    parse_section_patch,
+    split_paragraphs,
+)
+from src.utils.set_logging import log_context, logger
+from src.utils.reflection import (
+    build_batch_reflection_prompt,
+    build_section_reflection_prompt,
+    parse_batch_reflection,
+    parse_section_reflection,
+)
+from src.utils.render_service import get_render_service
+from src.utils.run_history import get_run_history
+from src.utils.section_store import InterningSerializer, record_versions
+from src.utils.speculative import SPECULATIVE_TEMPERATURES, build_candidate_prompt, parse_candidate, pick_best_candidate
+from src.utils.state import DEFAULT_RENDER_MODE, AgentState
+from src.utils.text import estimate_tokens, strip_code_fence
 from src.utils.tools import write_sections_to_doc
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import json
+import time
 
-# ---------------------------LOADING ENV----------------------------
-load_dotenv(".env")
+# ---------------------------SETTINGS-------------------------------
+# Maximum number of concurrent per-section reflection calls
+REFLECTION_MAX_CONCURRENCY = 4
+
+# Maximum number of concurrent speculative candidate calls
+SPECULATIVE_MAX_CONCURRENCY = 4
 
 
 # ------------------------------------------------------------------
 
 # ------------------------------------NODES---------------------------------------------------
 
+def _thread_id(config: RunnableConfig) -> str:
+    return config.get("configurable", {}).get("thread_id", "default")
+
+
 def ai_generate_with_confidence(state: AgentState):
     """
     Node that generates content with sections and confidence scores.
     LLM self-assesses confidence for each section.
     """
-    model = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+    model = chat_model(model="gpt-4o-mini", temperature=0.3)
 
-    logger.info(f"[AGENT] Generating content with confidence assessment...")
+    logger.info("[AGENT] Generating content with confidence assessment...")
 
     prompt = state["prompt"]
     learned_rules = ""
@@ -39,8 +77,8 @@ def ai_generate_with_confidence(state: AgentState):
     section_rules_text = ""
     if section_specific_rules:
         section_rules_text = "\n\nSection-specific rules:"
-        for section_type, rules in section_specific_rules.items():
-            section_rules_text += f"\n\nFor '{section_type}' sections:\n- " + "\n- ".join(rules)
+        for section_name, rules in section_specific_rules.items():
+            section_rules_text += f"\n\nFor '{section_name}' sections:\n- " + "\n- ".join(rules)
 
     system_prompt = f"""You are an expert content generator for technical documentation.
 
@@ -77,18 +115,12 @@ Respond ONLY with valid JSON in this exact format:
         HumanMessage(content=f"User request: {prompt}")
     ]
 
-    logger.debug(f"[DEBUG] Generating sections with confidence...")
-    response = model.invoke(messages)
+    logger.debug("[DEBUG] Generating sections with confidence...")
+    response = invoke_model(model, messages, site="generate")
 
     try:
-        # Parse JSON response
-        response_text = response.content.strip()
-
-        # Handle markdown code blocks
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
+        # Parse JSON response (handles markdown code blocks)
+        response_text = strip_code_fence(response.content)
 
         result = json.loads(response_text)
         sections = result.get("sections", [])
@@ -103,15 +135,16 @@ Respond ONLY with valid JSON in this exact format:
         for section in sections:
             section_name = section["name"]
             confidence = section["confidence"]
+            section["initial_confidence"] = confidence
 
             if confidence >= threshold:
                 high_confidence.append(section_name)
                 section["status"] = "auto_approved"
-                logger.info(f"[AGENT] Section '{section_name}' auto-approved (confidence: {confidence:.2f})")
+                logger.info("[AGENT] Section '%s' auto-approved (confidence: %.2f)", section_name, confidence)
             else:
                 review_required.append(section_name)
                 section["status"] = "pending_review"
-                logger.warning(f"[AGENT] Section '{section_name}' needs review (confidence: {confidence:.2f})")
+                logger.warning("[AGENT] Section '%s' needs review (confidence: %.2f)", section_name, confidence)
 
         auto_count = len(high_confidence)
         total_count = len(sections)
@@ -121,15 +154,17 @@ Respond ONLY with valid JSON in this exact format:
 
         return {
             "sections": sections,
+            "section_versions": record_versions(sections, state.get("section_versions", {})),
             "high_confidence_sections": high_confidence,
             "review_req_sections": review_required,
             "auto_approval_count": state.get("auto_approval_count", 0) + auto_count,
+            "started_at": state.get("started_at") or time.time(),
             "messages": state.get("messages", []) + [AIMessage(content=f"Generated {total_count} sections")]
         }
 
     except json.JSONDecodeError as e:
-        logger.error(f"[ERROR] Failed to parse JSON response: {e}")
-        logger.error(f"[ERROR] Response was: {response.content}")
+        logger.error("[ERROR] Failed to parse JSON response: %s", e)
+        logger.error("[ERROR] Response was: %s", response.content)  # truncated by the log formatter
         # Fallback: treat as single section with low confidence
         return {
             "sections": [{
@@ -145,21 +180,156 @@ Respond ONLY with valid JSON in this exact format:
         }
 
 
-def evaluate_sections(state: AgentState):
+def speculative_drafting(state: AgentState):
+    """
+    Optional node that drafts N alternative candidates for every low-confidence section.
+    The best candidate is auto-approved if it clears the threshold, otherwise it replaces
+    the draft shown to the reviewer. Extra calls are capped per thread by speculative_max_calls.
+    """
+    n_candidates = state.get("speculative_candidates", 0)
+    review_required = state.get("review_req_sections", [])
+
+    if n_candidates <= 0 or not review_required:
+        return {}
+
+    sections = state.get("sections", [])
+    threshold = state.get("confidence_threshold", 0.8)
+    learned_rules = state.get("mistakes", [])
+    section_rules = state.get("section_rules", {})
+    calls_used = state.get("speculative_calls_used", 0)
+    remaining = state.get("speculative_max_calls", 12) - calls_used
+
+    if remaining <= 0:
+        logger.info("[AGENT] Speculative drafting budget exhausted")
+        return {}
+
+    # Lowest confidence sections first, each gets up to n_candidates calls from the remaining budget
+    pending = sorted((s for s in sections if s["name"] in review_required), key=lambda s: s["confidence"])
+    jobs = []
+    for section in pending:
+        for k in range(min(n_candidates, remaining)):
+            jobs.append((section, SPECULATIVE_TEMPERATURES[k % len(SPECULATIVE_TEMPERATURES)]))
+        remaining -= min(n_candidates, remaining)
+
+    logger.info(f"[AGENT] Speculatively drafting {len(jobs)} candidate(s) for {len(pending)} section(s)")
+
+    def draft(section, temperature):
+        model = chat_model(model="gpt-4o-mini", temperature=temperature)
+        prompt = build_candidate_prompt(state["prompt"], section, learned_rules,
+                                        section_rules.get(section["name"], []))
+        # Candidates are deliberately independent samples, never shared
+        response = invoke_model(model, prompt, coalesce=False, site="speculative")
+        tokens = (getattr(response, "usage_metadata", None) or {}).get("total_tokens", 0)
+        return section["name"], parse_candidate(response.content), tokens
+
+    candidates = {}
+    tokens_used = 0
+    with ThreadPoolExecutor(max_workers=SPECULATIVE_MAX_CONCURRENCY) as executor:
+        # One context copy per draft, so its usage, span and stream output belong to this node
+        futures = [executor.submit(contextvars.copy_context().run, draft, section, temperature)
+                   for section, temperature in jobs]
+        for future in futures:
+            try:
+                section_name, candidate, tokens = future.result()
+            except Exception as e:
+                logger.error("[ERROR] Speculative candidate failed: %s", e)
+                continue
+            candidates.setdefault(section_name, []).append(candidate)
+            tokens_used += tokens
+
+    high_confidence = list(state.get("high_confidence_sections", []))
+    still_required = []
+    avoided = 0
+
+    for section in pending:
+        best = pick_best_candidate(candidates.get(section["name"], []))
+
+        if best is not None and best["confidence"] >= threshold:
+            section.update(best)
+            section["status"] = "auto_approved"
+            high_confidence.append(section["name"])
+            avoided += 1
+            logger.info("[AGENT] Section '%s' auto-approved via speculative candidate (confidence: %.2f)",
+                        section["name"], best["confidence"])
+            continue
+
+        if best is not None and best["confidence"] > section["confidence"]:
+            section.update(best)
+            logger.info("[AGENT] Showing best candidate for '%s' (confidence: %.2f)",
+                        section["name"], best["confidence"])
+        still_required.append(section["name"])
+
+    logger.info(f"[AGENT] Speculative drafting avoided {avoided} review(s) using {len(jobs)} extra call(s)")
+
+    return {
+        "sections": sections,
+        "section_versions": record_versions(sections, state.get("section_versions", {})),
+        "high_confidence_sections": high_confidence,
+        "review_req_sections": still_required,
+        "auto_approval_count": state.get("auto_approval_count", 0) + avoided,
+        "speculative_calls_used": calls_used + len(jobs),
+        "speculative_tokens_used": state.get("speculative_tokens_used", 0) + tokens_used,
+        "speculative_reviews_avoided": state.get("speculative_reviews_avoided", 0) + avoided
+    }
+
+
+def evaluate_sections(state: AgentState, config: RunnableConfig):
     """
     Routing node: Decides whether to proceed to finalization or human review.
+    With calibrated_routing enabled, sections are re-routed on their calibrated approval
+    probability (learned per section type from review history) instead of the raw confidence.
     """
     review_required = state.get("review_req_sections", [])
+    update = {}
+
+    if state.get("calibrated_routing", False):
+        sections = state.get("sections", [])
+        threshold = state.get("confidence_threshold", 0.8)
+        high_confidence = []
+        review_required = []
+        auto_delta = 0
+
+        for section in sections:
+            if section["status"] == "human_reviewed":
+                continue
+
+            calibrated = calibration_store.probability(section["name"], section["confidence"])
+            section["calibrated_confidence"] = calibrated
+
+            if calibrated >= threshold:
+                high_confidence.append(section["name"])
+                if section["status"] != "auto_approved":
+                    auto_delta += 1
+                section["status"] = "auto_approved"
+            else:
+                review_required.append(section["name"])
+                if section["status"] == "auto_approved":
+                    auto_delta -= 1
+                section["status"] = "pending_review"
+
+        logger.info(f"[AGENT] Calibrated routing: {len(high_confidence)} confident, {len(review_required)} need review")
+
+        update = {
+            "sections": sections,
+            "high_confidence_sections": high_confidence,
+            "review_req_sections": review_required,
+            "auto_approval_count": state.get("auto_approval_count", 0) + auto_delta
+        }
+
+    # Stream sections approved so far to the thread's export files
+    if state.get("export_formats"):
+        update["streamed_sections"] = stream_approved_sections(
+            {**state, **update}, _thread_id(config), export_title(state.get("prompt")))
 
     if not review_required:
         logger.info("[AGENT] All sections confident -> Proceeding to finalization")
-        return Command(goto="finalize")
+        return Command(goto="finalize", update=update)
     else:
         logger.info(f"[AGENT] {len(review_required)} section(s) require human review")
-        return Command(goto="human_selective_review")
+        return Command(goto="human_selective_review", update=update)
 
 
-def human_selective_review(state: AgentState):
+def human_selective_review(state: AgentState, config: RunnableConfig):
     """
     Node that presents ONLY uncertain sections for human review.
     Shows auto-approved sections for context but doesn't require approval.
@@ -194,6 +364,8 @@ def human_selective_review(state: AgentState):
         if section["name"] in review_required:
             review_output += f"\n Section: {section['name']}\n"
             review_output += f"   Confidence: {section['confidence']:.2f}\n"
+            if "calibrated_confidence" in section:
+                review_output += f"   Calibrated: {section['calibrated_confidence']:.2f}\n"
             review_output += f"   Reason: {section.get('reasoning', 'N/A')}\n"
             review_output += f"\n   Content:\n   {section['content']}\n"
             review_output += "-" * 60 + "\n"
@@ -206,20 +378,24 @@ def human_selective_review(state: AgentState):
 
     response = interrupt(prompt)
 
-    logger.error(f"[ERROR] Response was: {response}")
+    logger.debug("[HUMAN] Response was: %s", response)
     if response.lower() == "y":
         logger.info("[HUMAN] All reviewed sections approved")
         # Mark all as approved
         for section in sections:
             if section["name"] in review_required:
                 section["status"] = "human_reviewed"
+                section["reviewed"] = True
+                calibration_store.record(section["name"], section["confidence"], True)
 
         return Command(
             goto="finalize",
             update={
                 "sections": sections,
                 "approved_sections": state.get("approved_sections", []) + review_required,
-                "human_review_count": state.get("human_review_count", 0) + len(review_required)
+                "human_review_count": state.get("human_review_count", 0) + len(review_required),
+                "streamed_sections": stream_approved_sections(
+                    state, _thread_id(config), export_title(state.get("prompt")))
             }
         )
 
@@ -250,10 +426,15 @@ def human_selective_review(state: AgentState):
 
     approved = [s for s in review_required if s not in rejected]
 
-    # Update status
+    # Update status and record decisions for confidence calibration
     for section in sections:
         if section["name"] in approved:
             section["status"] = "human_reviewed"
+        if section["name"] in review_required:
+            section["reviewed"] = True
+            if section["name"] in rejected:
+                section["rejections"] = section.get("rejections", 0) + 1
+            calibration_store.record(section["name"], section["confidence"], section["name"] in approved)
 
     logger.info(f"[HUMAN] Approved: {len(approved)}, Rejected: {len(rejected)}")
 
@@ -264,7 +445,9 @@ def human_selective_review(state: AgentState):
             "approved_sections": state.get("approved_sections", []) + approved,
             "rejected_sections": rejected,
             "section_feedback": section_feedback,
-            "human_review_count": state.get("human_review_count", 0) + len(review_required)
+            "human_review_count": state.get("human_review_count", 0) + len(review_required),
+            "streamed_sections": stream_approved_sections(
+                state, _thread_id(config), export_title(state.get("prompt")))
         }
     )
 
@@ -272,8 +455,16 @@ def human_selective_review(state: AgentState):
 def reflect_and_learn(state: AgentState):
     """
     Enhanced reflection node that extracts section-specific rules.
+    In "batched" mode all rejected sections are reflected on in a single structured call;
+    if the batch would exceed the context budget (or the response fails validation),
+    it falls back to concurrent per-section reflection.
     """
-    model = ChatOpenAI(model="gpt-4o-mini")
+    if over_budget(state):
+        logger.warning(f"[AGENT] Token budget ({state['token_budget']}) used up ({total_tokens(state)} tokens). "
+                       f"Skipping reflection.")
+        return Command(goto="regenerate_sections")
+
+    model = chat_model(model="gpt-4o-mini")
 
     logger.info("[AGENT] Reflecting on section-specific feedback...")
 
@@ -284,53 +475,59 @@ def reflect_and_learn(state: AgentState):
     new_global_mistakes = []
     section_rules = state.get("section_rules", {})
 
+    # Collect (name, content, feedback) for every rejected section with feedback
+    items = []
     for section_name in rejected_sections:
         if section_name in section_feedback:
-            feedback = section_feedback[section_name]
-
-            # Find section content
             section_content = ""
             for s in sections:
                 if s["name"] == section_name:
                     section_content = s["content"]
                     break
-
-            reflection_prompt = f"""
-Analyze this feedback and extract rules.
-
-Section: {section_name}
-Generated content: {section_content}
-Human feedback: {feedback}
-
-Provide two types of rules:
-1. GLOBAL RULE: A general rule applicable to all sections (if applicable)
-2. SECTION-SPECIFIC RULE: A rule specific to '{section_name}' type sections
-
-Format your response as:
-GLOBAL: <rule or "NONE">
-SPECIFIC: <rule or "NONE">
-
-Rules should be imperative (e.g., "Use simpler language", "Include code examples").
-"""
-
-            response = model.invoke(reflection_prompt).content.strip()
-
-            # Parse response
-            lines = response.split("\n")
-            for line in lines:
-                if line.startswith("GLOBAL:"):
-                    rule = line.replace("GLOBAL:", "").strip()
-                    if rule and rule.upper() != "NONE":
-                        new_global_mistakes.append(rule)
-                        logger.info(f"[AGENT] New global rule learned: {rule}")
-
-                elif line.startswith("SPECIFIC:"):
-                    rule = line.replace("SPECIFIC:", "").strip()
-                    if rule and rule.upper() != "NONE":
-                        if section_name not in section_rules:
-                            section_rules[section_name] = []
-                        section_rules[section_name].append(rule)
-                        logger.info(f"[AGENT] New rule for '{section_name}': {rule}")
+            items.append((section_name, section_content, section_feedback[section_name]))
+
+    section_names = [name for name, _, _ in items]
+    learned = None
+
+    if items and state.get("reflection_mode", "batched") == "batched":
+        batch_prompt = build_batch_reflection_prompt(items)
+        budget = state.get("reflection_token_budget", 12000)
+
+        if estimate_tokens(batch_prompt) <= budget:
+            response = invoke_model(model, batch_prompt, site="reflect_batch")
+            learned = parse_batch_reflection(response.content, section_names)
+            if learned is None:
+                logger.warning("[AGENT] Batched reflection response failed validation, falling back to per-section")
+        else:
+            logger.info(f"[AGENT] Batched reflection exceeds token budget ({budget}), falling back to per-section")
+
+    if items and learned is None:
+        prompts = [build_section_reflection_prompt(*item) for item in items]
+        responses = batch_model(model, prompts, max_concurrency=REFLECTION_MAX_CONCURRENCY,
+                                site="reflect_section")
+
+        global_rules = []
+        specific_rules = {}
+        for section_name, response in zip(section_names, responses):
+            section_global, section_specific = parse_section_reflection(response.content)
+            global_rules.extend(section_global)
+            if section_specific:
+                specific_rules[section_name] = section_specific
+        learned = (global_rules, specific_rules)
+
+    if learned:
+        global_rules, specific_rules = learned
+
+        for rule in global_rules:
+            new_global_mistakes.append(rule)
+            logger.info("[AGENT] New global rule learned: %s", rule)
+
+        for section_name, rules in specific_rules.items():
+            if section_name not in section_rules:
+                section_rules[section_name] = []
+            for rule in rules:
+                section_rules[section_name].append(rule)
+                logger.info("[AGENT] New rule for '%s': %s", section_name, rule)
 
     return Command(
         goto="regenerate_sections",
@@ -342,11 +539,14 @@ Rules should be imperative (e.g., "Use simpler language", "Include code examples
     )
 
 
-def regenerate_sections(state: AgentState):
+def regenerate_sections(state: AgentState, config: RunnableConfig):
     """
     Regenerates ONLY rejected sections while preserving approved ones.
+    In "patch" mode the model returns paragraph edits that are applied to the stored content;
+    invalid patches (and short sections) fall back to a full rewrite.
+    With preview_renders on, a preview document is queued on the render service after every round.
     """
-    model = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+    model = chat_model(model="gpt-4o-mini", temperature=0.3)
 
     logger.info("[AGENT] Regenerating rejected sections...")
 
@@ -363,6 +563,11 @@ def regenerate_sections(state: AgentState):
         logger.warning(f"[AGENT] Max regeneration attempts ({max_attempts}) reached. Escalating to human.")
         return Command(goto="human_selective_review")
 
+    if over_budget(state):
+        logger.warning(f"[AGENT] Token budget ({state['token_budget']}) used up ({total_tokens(state)} tokens). "
+                       f"Escalating to human.")
+        return Command(goto="human_selective_review")
+
     # Regenerate each rejected section
     for section_name in rejected:
         feedback = section_feedback.get(section_name, "")
@@ -380,7 +585,27 @@ def regenerate_sections(state: AgentState):
         if not original_section:
             continue
 
-        regeneration_prompt = f"""
+        result = None
+
+        # Targeted edit: ask for a paragraph patch instead of the whole section
+        paragraphs, separator = split_paragraphs(original_section["content"])
+        if state.get("regeneration_mode", "patch") == "patch" and len(paragraphs) >= PATCH_MIN_PARAGRAPHS:
+            patch_prompt = build_patch_prompt(section_name, paragraphs, feedback, learned_rules, specific_rules)
+            response = invoke_model(model, patch_prompt, site="regenerate_patch")
+            patch = parse_section_patch(response.content, len(paragraphs))
+
+            if patch is not None:
+                result = {
+                    "content": apply_patch(paragraphs, patch.edits, separator),
+                    "confidence": patch.confidence,
+                    "reasoning": patch.reasoning or "Patched based on feedback"
+                }
+                logger.info("[AGENT] Patched '%s' with %d paragraph edit(s)", section_name, len(patch.edits))
+            else:
+                logger.warning("[AGENT] Invalid patch for '%s', falling back to full rewrite", section_name)
+
+        if result is None:
+            regeneration_prompt = f"""
 Regenerate the content for section: {section_name}
 
 Original content:
@@ -403,35 +628,29 @@ Respond with JSON:
 }}
 """
 
-        response = model.invoke(regeneration_prompt)
-
-        try:
-            response_text = response.content.strip()
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
-
-            result = json.loads(response_text)
+            response = invoke_model(model, regeneration_prompt, site="regenerate")
 
-            # Update section
-            original_section["content"] = result["content"]
-            original_section["confidence"] = result["confidence"]
-            original_section["reasoning"] = result.get("reasoning", "Regenerated based on feedback")
-
-            # Re-evaluate confidence
-            threshold = state.get("confidence_threshold", 0.8)
-            if result["confidence"] >= threshold:
-                original_section["status"] = "auto_approved"
-                logger.info(f"[AGENT]  Regenerated '{section_name}' now confident ({result['confidence']:.2f})")
-            else:
+            try:
+                result = json.loads(strip_code_fence(response.content))
+            except json.JSONDecodeError as e:
+                logger.error("[ERROR] Failed to parse regeneration response for '%s'", section_name)
                 original_section["status"] = "pending_review"
-                logger.warning(
-                    f"[AGENT] Regenerated '{section_name}' still needs review ({result['confidence']:.2f})")
+                continue
 
-        except json.JSONDecodeError as e:
-            logger.error(f"[ERROR] Failed to parse regeneration response for '{section_name}'")
+        # Update section
+        original_section["content"] = result["content"]
+        original_section["confidence"] = result["confidence"]
+        original_section["reasoning"] = result.get("reasoning", "Regenerated based on feedback")
+
+        # Re-evaluate confidence
+        threshold = state.get("confidence_threshold", 0.8)
+        if result["confidence"] >= threshold:
+            original_section["status"] = "auto_approved"
+            logger.info("[AGENT]  Regenerated '%s' now confident (%.2f)", section_name, result["confidence"])
+        else:
             original_section["status"] = "pending_review"
+            logger.warning(
+                f"[AGENT] Regenerated '{section_name}' still needs review ({result['confidence']:.2f})")
 
     # Re-categorize sections
     high_confidence = []
@@ -448,10 +667,31 @@ Respond with JSON:
 
     logger.info(f"[AGENT] After regeneration: {len(high_confidence)} confident, {len(review_required)} need review")
 
+    # Preview of this revision, rendered by the thread's render worker: only regenerated
+    # sections miss that worker's fragment cache
+    if state.get("preview_renders", False):
+        thread_id = _thread_id(config)
+
+        def record_preview(job):
+            if job["status"] != "done":
+                logger.error(f"[ERROR] Preview render failed: {job['error']}")
+                return
+            artifact_index.record(thread_id, current_revision, job["path"], kind="preview", render_job=job["job_id"])
+            logger.info(
+                f"[STATS] Preview r{current_revision} rendered in "
+                f"{(job['finished_at'] - job['started_at']) * 1000:.1f} ms "
+                f"({job['rendered_sections']}/{len(sections)} sections re-rendered)")
+
+        get_render_service().submit(
+            export_title(state.get("prompt")), [dict(section) for section in sections],
+            artifact_path(thread_id, current_revision, kind="preview"), on_done=record_preview, affinity=thread_id
+        )
+
     return Command(
         goto="evaluate_sections",
         update={
             "sections": sections,
+            "section_versions": record_versions(sections, state.get("section_versions", {})),
             "high_confidence_sections": high_confidence,
             "review_req_sections": review_required,
             "rejected_sections": [],  # Clear rejected list
@@ -460,23 +700,44 @@ Respond with JSON:
     )
 
 
-def finalize(state: AgentState):
+def finalize(state: AgentState, config: RunnableConfig):
     """
     Final node that writes the approved document.
+    With render_mode "pooled" the document is rendered by the render service and
+    the node only returns the render job handle.
     """
     logger.info("[AGENT] Writing to document...")
 
     sections = state.get("sections", [])
     prompt = state.get("prompt", "Generated Document")
+    thread_id = _thread_id(config)
+    revision = state.get("revision_count", 0)
 
     # Extract title from prompt or use default
-    title = prompt[:50] if len(prompt) > 50 else prompt
+    title = export_title(prompt)
 
-    # Write document using enhanced tool
-    result = write_sections_to_doc.invoke({
-        "title": title,
-        "sections": sections
-    })
+    # Write document: inline with the enhanced tool, or hand it off to the render worker pool
+    render_job = None
+    if state.get("render_mode", DEFAULT_RENDER_MODE) == "pooled":
+        def record_artifact(job):
+            if job["status"] == "done":
+                artifact_index.record(thread_id, revision, job["path"], kind="document", render_job=job["job_id"])
+
+        render_job = get_render_service().submit(
+            title, sections, artifact_path(thread_id, revision), on_done=record_artifact, affinity=thread_id
+        )
+        result = f"Document rendering queued as job {render_job}"
+    else:
+        result = write_sections_to_doc.invoke({
+            "title": title,
+            "sections": sections,
+            "thread_id": thread_id,
+            "revision": revision
+        })
+
+    # Finish the streamed exports (remaining sections + statistics footer)
+    if state.get("export_formats"):
+        stream_approved_sections(state, thread_id, title, final=True)
 
     # Log statistics
     total = len(sections)
@@ -491,31 +752,64 @@ def finalize(state: AgentState):
     logger.info(f"[STATS] Human-reviewed: {human_reviewed}")
     logger.info(f"[STATS] Revision cycles: {revisions}")
     logger.info(f"[STATS] Automation rate: {(auto_approved / total * 100):.1f}%")
+    if state.get("speculative_candidates", 0) > 0:
+        logger.info(f"[STATS] Speculative calls: {state.get('speculative_calls_used', 0)} "
+                    f"({state.get('speculative_tokens_used', 0)} tokens)")
+        logger.info(f"[STATS] Reviews avoided by speculation: {state.get('speculative_reviews_avoided', 0)}")
+    usage = summarize_usage(state.get("token_usage"))
+    logger.info(f"[STATS] Tokens: {usage['total']['total_tokens']} ({usage['total']['input_tokens']} in, "
+                f"{usage['total']['output_tokens']} out) in {usage['total']['calls']} calls, "
+                f"cost ${usage['total']['cost_usd']:.4f}")
+    for node, node_usage in usage["by_node"].items():
+        logger.info(f"[STATS]   {node}: {node_usage['input_tokens'] + node_usage['output_tokens']} tokens, "
+                    f"${node_usage['cost_usd']:.4f}")
+    for rev_key, revision_usage in usage["by_revision"].items():
+        logger.info(f"[STATS]   revision {rev_key}: "
+                    f"{revision_usage['input_tokens'] + revision_usage['output_tokens']} tokens, "
+                    f"${revision_usage['cost_usd']:.4f}")
     logger.info(f"[RESULT] {result}")
     logger.info("=" * 60)
 
+    # Keep per-section outcomes for analytics / what-if simulation
+    try:
+        run_id = get_run_history().record_run(state, [section_type(s["name"]) for s in sections])
+        logger.info(f"[AGENT] Run recorded in history as run {run_id}")
+    except Exception as e:
+        logger.error(f"[ERROR] Failed to record run history: {e}")
+
     return {
-        "output": f"Document completed with {total} sections. {result}"
+        "output": f"Document completed with {total} sections. {result}",
+        "render_job": render_job
     }
 
 
 # --------------------------------------------------------------------------------------------
 
-def compile_graph():
+def instrumented(name: str, fn):
+    """Graph node with duration metrics, a trace span, token usage accounting and log context."""
+    return wrap_node(name, fn, node_timing, node_span, usage_metering, log_context)
+
+
+def compile_graph(checkpointer=None):
     """Method to compile the progressive refinement graph"""
-    checkpointer = InMemorySaver()
+    # Section content is checkpointed as content hashes (see src/utils/section_store.py),
+    # the rest as compressed, schema-versioned msgpack (see src/utils/checkpoint_serde.py).
+    # Checkpoints of routing-only steps are coalesced (see src/utils/checkpointing.py)
+    checkpointer = checkpointer or CoalescingSaver(serde=InterningSerializer(CompactSerializer()))
     builder = StateGraph(AgentState)
 
     # Add nodes
-    builder.add_node("ai_generate_with_confidence", ai_generate_with_confidence)
-    builder.add_node("evaluate_sections", evaluate_sections)
-    builder.add_node("human_selective_review", human_selective_review)
-    builder.add_node("reflect_and_learn", reflect_and_learn)
-    builder.add_node("regenerate_sections", regenerate_sections)
-    builder.add_node("finalize", finalize)
+    builder.add_node("ai_generate_with_confidence", instrumented("ai_generate_with_confidence", ai_generate_with_confidence))
+    builder.add_node("speculative_drafting", instrumented("speculative_drafting", speculative_drafting))
+    builder.add_node("evaluate_sections", instrumented("evaluate_sections", evaluate_sections))
+    builder.add_node("human_selective_review", instrumented("human_selective_review", human_selective_review))
+    builder.add_node("reflect_and_learn", instrumented("reflect_and_learn", reflect_and_learn))
+    builder.add_node("regenerate_sections", instrumented("regenerate_sections", regenerate_sections))
+    builder.add_node("finalize", instrumented("finalize", finalize))
 
     # Add edges
-    builder.add_edge("ai_generate_with_confidence", "evaluate_sections")
+    builder.add_edge("ai_generate_with_confidence", "speculative_drafting")
+    builder.add_edge("speculative_drafting", "evaluate_sections")
     builder.add_edge("regenerate_sections", "evaluate_sections")
     builder.add_edge("finalize",END)
 
@@ -3,36 +3,27 @@ from langgraph.types import Command
 # from graph_agent_logging import compile_graph
 from src.graph_agent_complex import compile_graph
 # from graph_agent_selective_section_approval import compile_graph
-from langgraph.types import Command
-from src.utils.set_logging import logger
+from src.utils import settings
+from src.utils.set_logging import logger, start_logging
+from src.utils.state import default_initial_state
+from src.utils.tracing import tracer
 
 
 def main():
     """Run the progressive refinement agent"""
+    settings.load_env()
+    start_logging()
 
     # Compile the graph
     graph = compile_graph()
 
-    # Initial state with configuration
-    initial_state = {
-        "prompt": "Write a comprehensive technical guide about Docker containerization for beginners",
-        "messages": [],
-        "sections": [],
-        "high_confidence_sections": [],
-        "review_req_sections": [],
-        "approved_sections": [],
-        "rejected_sections": [],
-        "section_feedback": {},
-        "section_rules": {},
-        "mistakes": [],
-        "revision_count": 0,
-        "auto_approval_count": 0,
-        "human_review_count": 0,
-        "confidence_threshold": 0.8,  # Sections with confidence >= 0.8 are auto-approved
-        "max_regen_attempts": 3,  # Maximum regeneration cycles
-        "feedback": "",
-        "output": ""
-    }
+    # Initial state with configuration (see default_initial_state for every setting)
+    initial_state = default_initial_state(
+        "Write a comprehensive technical guide about Docker containerization for beginners",
+        confidence_threshold=0.8,  # Sections with confidence >= 0.8 are auto-approved
+        max_regen_attempts=3,  # Maximum regeneration cycles
+        render_mode="inline",
+    )
 
     # Configuration for the graph
     config = {
@@ -49,33 +40,36 @@ def main():
     logger.info(f"[INFO] Max Regeneration Attempts: {initial_state['max_regen_attempts']}")
     logger.info("=" * 70)
 
-    # Run the graph with interrupts
+    # Run the graph with interrupts: stream until the graph pauses, ask, resume with the answer
     try:
-        state = initial_state
-        for event in graph.stream(state, config, stream_mode="updates"):
-            logger.debug(f"[STREAM EVENT] {event}")
-
-            # Handle human interrupts
-            if "__interrupt__" in event:
-                interrupt_data = event["__interrupt__"]
-
-                for item in interrupt_data:
-                    # Get the interrupt value (question + details)
-                    interrupt_value = item.get("value", {})
-                    question = interrupt_value.get("question", "")
-                    details = interrupt_value.get("details", "")
+        with tracer.run(config["configurable"]["thread_id"]):
+            value = initial_state
+            while value is not None:
+                pending = None
+                for event in graph.stream(value, config, stream_mode="updates"):
+                    logger.debug(f"[STREAM EVENT] {event}")
+
+                    # Handle human interrupts
+                    if "__interrupt__" in event:
+                        pending = event["__interrupt__"][0].value
+
+                value = None
+                if pending is not None:
+                    question = pending.get("question", "")
+                    details = pending.get("details", "")
 
                     # Display to user
                     if details:
                         print("\n" + details)
 
                     # Get user input
-                    user_response = input(f"\n{question}").strip()
+                    with tracer.span("interrupt_wait", config["configurable"]["thread_id"]):
+                        user_response = input(f"\n{question}").strip()
 
                     # Resume with user's response
-                    state = graph.invoke(Command(resume=user_response), config)
+                    value = Command(resume=user_response)
 
-        logger.info("\n[INFO] Agent execution completed successfully!")
+            logger.info("\n[INFO] Agent execution completed successfully!")
 
     except KeyboardInterrupt:
         logger.warning("\n[INFO] Execution interrupted by user")
@@ -86,5 +80,15 @@ def main():
 # if __name__ == "__main__":
 #     main()
 
-graph = compile_graph()
 
+_graph = None
+
+
+def __getattr__(name: str):
+    # `graph` (the entry point in langgraph.json) is compiled on first access, not at import
+    global _graph
+    if name == "graph":
+        if _graph is None:
+            _graph = compile_graph()
+        return _graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
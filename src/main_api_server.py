@@ -1,21 +1,38 @@
 import asyncio
-from fastapi import FastAPI, APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 # from langfuse import Langfuse, get_client
 # from langfuse.langchain import CallbackHandler
 from pydantic import BaseModel
-from typing import Dict, Any
+from itertools import islice
+from typing import Callable, Dict, Any, List, Literal, Optional
 import uuid
 import json
+import os
+import time
 
 from langgraph.types import Command
 from graph_agent_complex import compile_graph
-from utils.set_logging import logger
-
-from dotenv import load_dotenv
+from src.utils.artifacts import artifact_index
+from src.utils.checkpointing import Durability
+from src.utils.exporters import EXPORTERS, export_title, get_exporter, iter_export
+from src.utils.llm import single_flight
+from src.utils.metrics import INTERRUPT_WAIT, gauge_lines, registry
+from src.utils.render_service import get_render_service
+from src.utils.run_history import get_run_history
+from src.utils import settings
+from src.utils.section_store import diff_versions, get_version, record_versions, section_store
+from src.utils.state import DEFAULT_RENDER_MODE, AgentState, default_initial_state
+from src.utils.tracing import tracer
+from src.utils.usage import summarize_usage
+from utils.set_logging import dropped_records, log_queue_depth, logger, start_logging
 
 # ----------------------------------CONFIGS-------------------------------------
-load_dotenv("../.env")
+# Nothing runs at import: create_app() loads .env, starts logging and runs the warm-up hooks
+# (WARM_UP=0 skips them). Settings are read on first use (see src/utils/settings.py).
 
 # Example Secret keys (Not Valid)
 # Langfuse(
@@ -28,10 +45,21 @@ load_dotenv("../.env")
 #
 # # Initialize the Langfuse handler
 # langfuse_handler = CallbackHandler()
-app = FastAPI(title="LangGraph Agent API")
 router = APIRouter(prefix="/agent", tags=["agent"])
+root_router = APIRouter()
+
+_graph = None
+_graph_lock = threading.Lock()
+
 
-graph = compile_graph()
+def get_graph():
+    """The compiled graph, compiled on first use."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = compile_graph()
+    return _graph
 # ------------------------------------------------------------------------------
 
 
@@ -49,38 +77,37 @@ class StartAgentRequest(BaseModel):
     prompt: str
     confidence_threshold: float = 0.8
     max_regen_attempts: int = 3
+    reflection_mode: Literal["batched", "per_section"] = "batched"
+    reflection_token_budget: int = 12000
+    regeneration_mode: Literal["patch", "full"] = "patch"
+    calibrated_routing: bool = False
+    render_mode: Literal["inline", "pooled"] = DEFAULT_RENDER_MODE
+    export_formats: List[str] = []
+    preview_renders: bool = False
+    durability: Durability = "async"  # checkpoint durability: "sync", "async" or "exit" (interrupts and end only)
+    speculative_candidates: int = 0
+    speculative_max_calls: int = 12
+    token_budget: int = 0  # stop regenerating once the thread used this many tokens (0 = unlimited)
 
 
 class RespondRequest(BaseModel):
     response: str
 
 
-# ------------------------------------------------------------------------------
+class RollbackRequest(BaseModel):
+    section: str
+    version: int
 
 
-# -------------------------HELPER FUNCTIONS-------------------------------------
-def default_initial_state(prompt: str, confidence_threshold: float, max_regen_attempts: int):
-    return {
-        "prompt": prompt,
-        "messages": [],
-        "sections": [],
-        "high_confidence_sections": [],
-        "review_req_sections": [],
-        "approved_sections": [],
-        "rejected_sections": [],
-        "section_feedback": {},
-        "section_rules": {},
-        "mistakes": [],
-        "revision_count": 0,
-        "auto_approval_count": 0,
-        "human_review_count": 0,
-        "confidence_threshold": confidence_threshold,
-        "max_regen_attempts": max_regen_attempts,
-        "feedback": "",
-        "output": ""
-    }
+class ForkRequest(BaseModel):
+    checkpoint_id: Optional[str] = None  # default: the thread's latest checkpoint
+    overrides: Dict[str, Any] = {}  # state values to change in the fork, e.g. confidence_threshold
+
+
+# ------------------------------------------------------------------------------
 
 
+# -------------------------HELPER FUNCTIONS-------------------------------------
 def graph_config(thread_id: str):
     return {
         "configurable": {
@@ -90,6 +117,27 @@ def graph_config(thread_id: str):
     }
 
 
+def record_response(thread_id: str, response: str):
+    """Stores the user's answer to the pending interrupt; the next run of the thread resumes with it."""
+    waiting_since = THREADS[thread_id].pop("waiting_since", None)
+    if waiting_since is not None:
+        INTERRUPT_WAIT.observe(value=time.time() - waiting_since)
+        tracer.record("interrupt_wait", thread_id, waiting_since, time.time())
+
+    THREADS[thread_id]["pending_resume"] = response
+    THREADS[thread_id]["interrupt_event"] = None
+    THREADS[thread_id]["status"] = "ready_to_resume"
+
+
+def update_thread_state(config: dict, update: dict):
+    """Applies a state update; a thread paused at a node (e.g. waiting for review) stays paused there."""
+    pending = get_graph().get_state(config).next
+    if pending:
+        get_graph().update_state(config, Command(update=update, goto=list(pending)), as_node="evaluate_sections")
+    else:
+        get_graph().update_state(config, update)
+
+
 # ------------------------------------------------------------------------------
 
 
@@ -102,6 +150,11 @@ def graph_config(thread_id: str):
 
 @router.post("/start")
 async def start_agent(req: StartAgentRequest):
+    unknown_formats = [fmt for fmt in req.export_formats if fmt not in EXPORTERS]
+    if unknown_formats:
+        raise HTTPException(status_code=400, detail=f"Unknown export format(s) {', '.join(unknown_formats)} "
+                                                    f"(available: {', '.join(EXPORTERS)})")
+
     thread_id = str(uuid.uuid4())
 
     logger.info("=" * 70)
@@ -109,18 +162,21 @@ async def start_agent(req: StartAgentRequest):
     logger.info(f"[API] Task: {req.prompt}")
     logger.info(f"[API] Confidence Threshold: {req.confidence_threshold}")
     logger.info(f"[API] Max Regeneration Attempts: {req.max_regen_attempts}")
+    logger.info(f"[API] Checkpoint Durability: {req.durability}")
     logger.info("=" * 70)
 
     initial_state = default_initial_state(
         req.prompt,
         req.confidence_threshold,
-        req.max_regen_attempts
+        req.max_regen_attempts,
+        **req.model_dump(exclude={"prompt", "confidence_threshold", "max_regen_attempts", "durability"})
     )
 
     THREADS[thread_id] = {
         "status": "created",
         "initial_state": initial_state,
         "pending_resume": None,
+        "durability": req.durability,
     }
 
     logger.info(f"[AGENT] Created thread {thread_id}")
@@ -138,35 +194,41 @@ async def start_agent(req: StartAgentRequest):
 #    - Stops on interrupt
 # ------------------------------------------------------------------------------
 
-@router.get("/stream/{thread_id}")
-async def stream_agent(thread_id: str):
-    if thread_id not in THREADS:
-        raise HTTPException(status_code=404, detail="Invalid thread_id")
-
+async def run_thread_events(thread_id: str, stream_model_output: bool = False):
+    """
+    Starts or resumes a thread and runs it until it pauses or ends, yielding events:
+    update (nodes that ran), interrupt (question for the user), done or error.
+    With stream_model_output, every model response is yielded as an "llm" event.
+    """
     thread = THREADS[thread_id]
     config = graph_config(thread_id)
+    stream_mode = ["updates", "custom"] if stream_model_output else ["updates"]
 
-    if thread["status"] == "completed":
-        return {"status": "completed", "details": "Agent has already completed its execution!"}
-
-    async def event_stream():
-        try:
-            logger.info(f"[AGENT] Streaming execution for {thread_id}")
-
-            if thread["status"] == "created":
-                input_state = thread["initial_state"]
-                thread["started"] = True
-
-            elif thread["status"] == "ready_to_resume":
-                input_state = Command(resume=thread["pending_resume"])
-                thread["pending_resume"] = None
-                thread["status"] = "running"
-
-            else:
-                input_state = None  # normal resume
-            # IMPORTANT:
-            # graph.stream() will automatically resume from checkpoint
-            async for event in graph.astream(input_state, config, stream_mode="updates"):
+    try:
+        logger.info(f"[AGENT] Streaming execution for {thread_id}")
+
+        if thread["status"] == "created":
+            input_state = thread["initial_state"]
+            thread["started"] = True
+
+        elif thread["status"] == "ready_to_resume":
+            input_state = Command(resume=thread["pending_resume"])
+            thread["pending_resume"] = None
+
+        elif thread["status"] == "error" and not get_graph().get_state(config).values:
+            input_state = thread["initial_state"]  # failed before its first checkpoint: start over
+
+        else:
+            input_state = None  # normal resume (after an error: retries from the last checkpoint)
+        thread["status"] = "running"
+        # IMPORTANT:
+        # graph.stream() will automatically resume from checkpoint
+        with tracer.run(thread_id, resumed=not isinstance(input_state, dict)) as run_span:
+            async for mode, event in get_graph().astream(input_state, config, stream_mode=stream_mode,
+                                                         durability=thread.get("durability", "async")):
+                if mode == "custom":
+                    yield event
+                    continue
 
                 # Interrupt detected → return + pause execution
                 if "__interrupt__" in event:
@@ -182,36 +244,55 @@ async def stream_agent(thread_id: str):
                     #         "question": value.get("question"),
                     #         "details": value.get("details")
                     #     })
+                    if run_span is not None:
+                        run_span.status = "interrupted"
 
-                    yield json.dumps({
+                    thread["status"] = "waiting_for_user"
+                    thread["waiting_since"] = time.time()
+                    yield {
                         "type": "interrupt",
                         "data": interrupt_payload
-                    }) + "\n"
-
-                    THREADS[thread_id]["status"] = "waiting_for_user"
+                    }
                     return
 
                 # Normal update
-                yield json.dumps({
+                yield {
                     "type": "update",
                     "data": [e[0] for e in event.items()],
-                }) + "\n"
+                }
 
-                await asyncio.sleep(0.1)  # Prevent overwhelming the client
+        # Completed
+        thread["status"] = "completed"
+        yield {
+            "type": "done",
+            "message": "Agent execution completed"
+        }
 
-            # Completed
-            THREADS[thread_id]["status"] = "completed"
-            yield json.dumps({
-                "type": "done",
-                "message": "Agent execution completed"
-            }) + "\n"
+    except Exception as e:
+        logger.error(f"[AGENT] Error in stream: {e}", exc_info=True)
+        thread["status"] = "error"
+        yield {
+            "type": "error",
+            "message": str(e)
+        }
 
-        except Exception as e:
-            logger.error(f"[AGENT] Error in stream: {e}", exc_info=True)
-            yield json.dumps({
-                "type": "error",
-                "message": str(e)
-            }) + "\n"
+
+@router.get("/stream/{thread_id}")
+async def stream_agent(thread_id: str):
+    if thread_id not in THREADS:
+        raise HTTPException(status_code=404, detail="Invalid thread_id")
+
+    if THREADS[thread_id]["status"] == "completed":
+        return {"status": "completed", "details": "Agent has already completed its execution!"}
+    run_task = THREADS[thread_id].get("run_task")
+    if run_task is not None and not run_task.done():
+        raise HTTPException(status_code=409, detail="Thread is running over its WebSocket")
+
+    async def event_stream():
+        async for event in run_thread_events(thread_id):
+            yield json.dumps(event) + "\n"
+            if event["type"] == "update":
+                await asyncio.sleep(0.1)  # Prevent overwhelming the client
 
     return StreamingResponse(event_stream(), media_type="application/json", headers={
         "Cache-Control": "no-cache",
@@ -232,9 +313,7 @@ async def respond_to_agent(thread_id: str, req: RespondRequest):
     logger.info(f"[AGENT] Resuming thread {thread_id} with user input")
 
     try:
-
-        THREADS[thread_id]["pending_resume"] = req.response
-        THREADS[thread_id]["status"] = "ready_to_resume"
+        record_response(thread_id, req.response)
 
         return {
             "status": "ready_to_resume",
@@ -247,17 +326,484 @@ async def respond_to_agent(thread_id: str, req: RespondRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ------------------------------------------------------------------------------
+# 5. GET /agent/history/*
+#    - Analytics over the run-history store
+# ------------------------------------------------------------------------------
+
+@router.get("/history/summary")
+async def history_summary():
+    """Automation rate, revision distribution and latency percentiles over all recorded runs."""
+    return get_run_history().summary()
+
+
+@router.get("/history/section_types")
+async def history_section_types():
+    """Automation / rejection rates per section type."""
+    return get_run_history().by_section_type()
+
+
+@router.get("/history/simulate")
+async def history_simulate(confidence_threshold: float = 0.8, max_regen_attempts: int = 3):
+    """What-if replay of the recorded history under a different threshold / regeneration limit."""
+    return get_run_history().simulate(confidence_threshold, max_regen_attempts)
+
+
+# ------------------------------------------------------------------------------
+# 6. GET /agent/render/{job_id}
+#    - Status / download of documents rendered by the render service
+# ------------------------------------------------------------------------------
+
+@router.get("/render/{job_id}")
+async def render_status(job_id: str):
+    """Status of a render job (the handle is returned in the thread's `render_job` state)."""
+    job = get_render_service().status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invalid job_id")
+    return job
+
+
+@router.get("/render/{job_id}/download")
+async def render_download(job_id: str):
+    """Downloads a rendered document once its job is done."""
+    job = get_render_service().status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Invalid job_id")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Render job is {job['status']}")
+
+    return FileResponse(
+        job["path"],
+        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        filename=os.path.basename(job["path"])
+    )
+
+
+# ------------------------------------------------------------------------------
+# 7. GET /agent/artifacts
+#    - Index of produced documents
 # ------------------------------------------------------------------------------
 
+@router.get("/artifacts")
+async def list_artifacts(thread_id: Optional[str] = None, limit: int = 100):
+    """Produced artifacts, newest first (optionally filtered by thread)."""
+    return artifact_index.query(thread_id=thread_id, limit=limit)
+
+
+@router.get("/artifacts/{thread_id}")
+async def thread_artifacts(thread_id: str):
+    """All artifacts produced by a thread, newest first."""
+    return artifact_index.query(thread_id=thread_id)
+
 
 # ------------------------------------------------------------------------------
-# Mount router
+# 8. GET /agent/export/{thread_id}
+#    - Streams the thread's current sections in a lightweight format
 # ------------------------------------------------------------------------------
 
-app.include_router(router)
+@router.get("/export/{thread_id}")
+async def export_thread(thread_id: str, format: str = "markdown"):
+    """Streams the document section by section as markdown, html or jsonl."""
+    if thread_id not in THREADS:
+        raise HTTPException(status_code=404, detail="Invalid thread_id")
+    if format not in EXPORTERS:
+        raise HTTPException(status_code=400, detail=f"Unknown format (available: {', '.join(EXPORTERS)})")
 
+    values = get_graph().get_state(graph_config(thread_id)).values
+    return StreamingResponse(
+        iter_export(format, export_title(values.get("prompt")), values.get("sections", [])),
+        media_type=get_exporter(format).media_type
+    )
 
-@app.get('/agent/state/{thread_id}')
+
+# ------------------------------------------------------------------------------
+# 9. /agent/thread/{thread_id}/versions, /diff, /rollback
+#    - Section version history kept in the content-addressed section store
+# ------------------------------------------------------------------------------
+
+def thread_versions(thread_id: str) -> dict:
+    if thread_id not in THREADS:
+        raise HTTPException(status_code=404, detail="Invalid thread_id")
+    return get_graph().get_state(graph_config(thread_id)).values.get("section_versions", {})
+
+
+@router.get("/thread/{thread_id}/versions")
+async def section_versions(thread_id: str):
+    """Content hashes of every version of every section (oldest first) and store statistics."""
+    return {"sections": thread_versions(thread_id), "store": section_store.stats()}
+
+
+@router.get("/thread/{thread_id}/diff")
+async def section_diff(thread_id: str, section: str, from_version: int = -2, to_version: int = -1):
+    """Unified diff between two versions of a section (defaults: previous vs. latest)."""
+    try:
+        return {"section": section, "diff": diff_versions(thread_versions(thread_id), section, from_version, to_version)}
+    except (KeyError, IndexError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/thread/{thread_id}/rollback")
+async def section_rollback(thread_id: str, req: RollbackRequest):
+    """Restores a section's content to an earlier version (recorded as a new version)."""
+    versions = thread_versions(thread_id)
+    try:
+        content = get_version(versions, req.section, req.version)
+    except (KeyError, IndexError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    config = graph_config(thread_id)
+    sections = get_graph().get_state(config).values.get("sections", [])
+    for section in sections:
+        if section["name"] == req.section:
+            section["content"] = content
+
+    # A thread waiting for review is re-asked with the restored content
+    update_thread_state(config, {"sections": sections, "section_versions": record_versions(sections, versions)})
+    logger.info(f"[API] Rolled back '{req.section}' of thread {thread_id} to version {req.version}")
+    return {"status": "rolled_back", "section": req.section, "version": req.version}
+
+
+# ------------------------------------------------------------------------------
+# 10. /agent/thread/{thread_id}/checkpoints, /fork, DELETE /agent/thread/{thread_id}
+#    - Variants of a thread from any of its checkpoints, without regenerating
+#    - Deleting a thread frees its checkpoints and the section content only it used
+# ------------------------------------------------------------------------------
+
+@router.get("/thread/{thread_id}/checkpoints")
+async def thread_checkpoints(thread_id: str, limit: int = 50):
+    """Checkpoints of a thread, newest first (ids can be passed to /fork)."""
+    if thread_id not in THREADS:
+        raise HTTPException(status_code=404, detail="Invalid thread_id")
+
+    return [{
+        "checkpoint_id": snapshot.config["configurable"]["checkpoint_id"],
+        "step": snapshot.metadata.get("step"),
+        "source": snapshot.metadata.get("source"),
+        "next": list(snapshot.next),
+        "revision_count": snapshot.values.get("revision_count", 0),
+        "created_at": snapshot.created_at,
+    } for snapshot in get_graph().get_state_history(graph_config(thread_id), limit=limit)]
+
+
+def reroute_sections(values: dict, threshold: float) -> dict:
+    """Re-applies a changed confidence threshold to sections not reviewed by a human yet."""
+    sections = values.get("sections", [])
+    high_confidence, review_required = [], []
+    auto_delta = 0
+
+    for section in sections:
+        if section["status"] == "human_reviewed":
+            continue
+        if section["confidence"] >= threshold:
+            high_confidence.append(section["name"])
+            auto_delta += section["status"] != "auto_approved"
+            section["status"] = "auto_approved"
+        else:
+            review_required.append(section["name"])
+            auto_delta -= section["status"] == "auto_approved"
+            section["status"] = "pending_review"
+
+    return {
+        "sections": sections,
+        "high_confidence_sections": high_confidence,
+        "review_req_sections": review_required,
+        "auto_approval_count": values.get("auto_approval_count", 0) + auto_delta,
+    }
+
+
+@router.post("/thread/{thread_id}/fork")
+async def fork_agent_thread(thread_id: str, req: ForkRequest):
+    """
+    Starts a new thread from a checkpoint of an existing one (default: the latest),
+    optionally with changed state values. The fork shares the parent's checkpoint
+    history and continues from that point with /agent/stream/{new_thread_id}.
+    """
+    if thread_id not in THREADS:
+        raise HTTPException(status_code=404, detail="Invalid thread_id")
+    unknown = set(req.overrides) - set(AgentState.__annotations__)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown state field(s): {', '.join(sorted(unknown))}")
+
+    new_thread_id = str(uuid.uuid4())
+    checkpoint_id = get_graph().checkpointer.fork_thread(thread_id, new_thread_id, req.checkpoint_id)
+    if checkpoint_id is None and req.checkpoint_id is None:
+        raise HTTPException(status_code=409, detail="Thread has no checkpoint yet; run it before forking")
+    if checkpoint_id is None:
+        raise HTTPException(status_code=404, detail="Invalid checkpoint_id")
+
+    config = graph_config(new_thread_id)
+    values = get_graph().get_state(config).values
+    overrides = dict(req.overrides)
+    if "confidence_threshold" in overrides and "sections" not in overrides:
+        overrides.update(reroute_sections(values, overrides["confidence_threshold"]))
+    if values.get("streamed_sections") and "streamed_sections" not in overrides:
+        # The in-progress export files belong to the parent; the fork writes its own from the first section
+        overrides["streamed_sections"] = []
+    if overrides:
+        update_thread_state(config, overrides)
+
+    snapshot = get_graph().get_state(config)
+    if any(task.interrupts for task in snapshot.tasks):
+        status = "waiting_for_user"
+    else:
+        status = "forked" if snapshot.next else "completed"
+
+    THREADS[new_thread_id] = {
+        "status": status,
+        "initial_state": None,
+        "pending_resume": None,
+        "durability": THREADS[thread_id].get("durability", "async"),
+        "forked_from": {"thread_id": thread_id, "checkpoint_id": checkpoint_id},
+    }
+    if status == "waiting_for_user":
+        THREADS[new_thread_id]["waiting_since"] = time.time()
+
+    logger.info(f"[API] Forked thread {thread_id} at {checkpoint_id} into {new_thread_id} "
+                f"(overrides: {', '.join(req.overrides) or 'none'})")
+
+    return {
+        "thread_id": new_thread_id,
+        "status": status,
+        "forked_from": THREADS[new_thread_id]["forked_from"],
+        "next_nodes": list(snapshot.next),
+    }
+
+
+@router.delete("/thread/{thread_id}")
+async def delete_agent_thread(thread_id: str):
+    """Forgets a thread: its registry entry, its checkpoints and the interned section content only it used."""
+    if thread_id not in THREADS:
+        raise HTTPException(status_code=404, detail="Invalid thread_id")
+    run_task = THREADS[thread_id].get("run_task")
+    if THREADS[thread_id]["status"] == "running" or (run_task is not None and not run_task.done()):
+        raise HTTPException(status_code=409, detail="Thread is running; delete it once it pauses or ends")
+
+    del THREADS[thread_id]
+    # Forks keep their own references to the section content they share with this thread
+    get_graph().checkpointer.delete_thread(thread_id)
+    logger.info(f"[API] Deleted thread {thread_id}")
+    return {"status": "deleted", "thread_id": thread_id}
+
+
+# ------------------------------------------------------------------------------
+# 11. GET /agent/llm/stats
+#    - LLM call coalescing across threads
+# ------------------------------------------------------------------------------
+
+@router.get("/llm/stats")
+async def llm_stats():
+    """Model calls made, identical in-flight requests served by another call, abandoned waits and errors."""
+    return single_flight.stats()
+
+
+# ------------------------------------------------------------------------------
+# 12. GET /metrics
+#    - Prometheus text exposition: node and model call latency, outcomes, tokens,
+#      threads by status, interrupt waits and queue depths
+# ------------------------------------------------------------------------------
+
+@registry.collector
+def thread_metrics():
+    counts: Dict[str, int] = {}
+    for thread in list(THREADS.values()):
+        counts[thread["status"]] = counts.get(thread["status"], 0) + 1
+    now = time.time()
+    waits = [now - t["waiting_since"] for t in list(THREADS.values()) if t.get("waiting_since")]
+    return (gauge_lines("agent_threads", "Threads in the registry by status.",
+                        {(("status", status),): n for status, n in counts.items()})
+            + gauge_lines("agent_interrupt_oldest_wait_seconds", "Longest current wait for a human response.",
+                          {(): max(waits, default=0.0)}))
+
+
+@registry.collector
+def queue_metrics():
+    llm = single_flight.stats()
+    lines = (gauge_lines("agent_llm_in_flight", "Distinct model calls queued or running.", {(): llm["in_flight"]})
+             + gauge_lines("agent_llm_queue_depth", "Model calls waiting for a free connection slot.",
+                           {(): single_flight.queue_depth()})
+             + gauge_lines("agent_log_queue_depth", "Log records waiting to be written.",
+                           {(): log_queue_depth()})
+             + gauge_lines("agent_log_records_dropped_total", "Log records dropped because the log queue was full.",
+                           {(): dropped_records()}, kind="counter"))
+    render_service = get_render_service(start=False)
+    if render_service is not None:
+        jobs = list(render_service.jobs.values())
+        lines += gauge_lines("agent_render_jobs", "Render jobs by status (queued is the queue depth).",
+                             {(("status", s),): sum(job["status"] == s for job in jobs) for s in ("queued", "rendering")})
+    return lines
+
+
+@root_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+# ------------------------------------------------------------------------------
+# 13. WebSocket /agent/ws/{thread_id}
+#    - One connection per thread: the server pushes updates, model outputs and
+#      interrupts, the client answers each interrupt with one "resume" message
+#    - Runs belong to the thread, not to the connection: a client reconnecting with
+#      ?last_seq=N gets the events it missed from the thread's replay buffer
+#    - Backpressure: runs publish into the bounded buffer and never wait for clients,
+#      each connection sends at its own pace; one that falls behind the buffer gets
+#      a "gap" message and the pending interrupt
+# ------------------------------------------------------------------------------
+
+# Settings: WS_HEARTBEAT_S (ping interval, 15), WS_IDLE_TIMEOUT_S (closes silent connections, 60),
+# WS_REPLAY_EVENTS (events kept per thread for replay, 1000)
+
+
+class ThreadEvents:
+    """Numbered events of one thread; the last WS_REPLAY_EVENTS are kept for replay."""
+
+    def __init__(self, maxlen: Optional[int] = None):
+        self.events = deque(maxlen=maxlen or settings.get_int("WS_REPLAY_EVENTS", 1000))
+        self.last_seq = 0
+        self._published = asyncio.Event()
+
+    def publish(self, event: dict) -> dict:
+        self.last_seq += 1
+        event = {**event, "seq": self.last_seq}
+        self.events.append(event)
+        # Wake every waiting connection, later waits get a fresh event
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+        return event
+
+    def since(self, seq: int):
+        """Events after seq, and how many of them were already dropped from the buffer."""
+        first = self.events[0]["seq"] if self.events else self.last_seq + 1
+        missed = max(0, first - seq - 1)
+        return missed, list(islice(self.events, max(0, seq + 1 - first), None))
+
+    async def wait(self, seq: int):
+        """Returns once there are events after seq."""
+        while self.last_seq <= seq:
+            await self._published.wait()
+
+
+def thread_events(thread_id: str) -> ThreadEvents:
+    return THREADS[thread_id].setdefault("events", ThreadEvents())
+
+
+def pending_interrupt(thread_id: str) -> Optional[dict]:
+    """The interrupt the thread is waiting on, as sent to clients."""
+    thread = THREADS[thread_id]
+    if thread["status"] != "waiting_for_user":
+        return None
+    if thread.get("interrupt_event") is None:
+        # Forked threads start waiting without having streamed their interrupt
+        snapshot = get_graph().get_state(graph_config(thread_id))
+        values = [item.value for task in snapshot.tasks for item in task.interrupts]
+        if not values:
+            return None
+        thread["interrupt_event"] = thread_events(thread_id).publish({
+            "type": "interrupt",
+            "data": [{"question": values[0]["question"], "details": values[0]["details"]}],
+        })
+    return thread["interrupt_event"]
+
+
+def start_thread_run(thread_id: str) -> asyncio.Task:
+    """Runs the thread in the background until it pauses or ends; a no-op while it runs."""
+    thread = THREADS[thread_id]
+    task = thread.get("run_task")
+    if task is not None and not task.done():
+        return task
+    events = thread_events(thread_id)
+
+    async def run():
+        async for event in run_thread_events(thread_id, stream_model_output=True):
+            event = events.publish(event)
+            if event["type"] == "interrupt":
+                thread["interrupt_event"] = event
+
+    thread["run_task"] = asyncio.create_task(run())
+    return thread["run_task"]
+
+
+@router.websocket("/ws/{thread_id}")
+async def agent_websocket(websocket: WebSocket, thread_id: str, last_seq: int = 0):
+    """
+    Client messages: {"type": "resume", "response": "..."}, {"type": "ping"}, {"type": "pong"}.
+    Server messages: session, update, llm, interrupt, done, error (with their seq), gap, ping, pong.
+    """
+    await websocket.accept()
+    if thread_id not in THREADS:
+        await websocket.close(code=4404, reason="Invalid thread_id")
+        return
+
+    thread = THREADS[thread_id]
+    events = thread_events(thread_id)
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def push_events(seq: int):
+        while True:
+            missed, pending = events.since(seq)
+            if missed:
+                await send({"type": "gap", "missed": missed})
+                interrupt = pending_interrupt(thread_id)
+                if interrupt is not None and interrupt["seq"] < pending[0]["seq"]:
+                    await send(interrupt)
+            for event in pending:
+                await send(event)
+                seq = event["seq"]
+            await events.wait(seq)
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(settings.get_float("WS_HEARTBEAT_S", 15))
+            await send({"type": "ping", "time": time.time()})
+
+    await send({"type": "session", "thread_id": thread_id, "status": thread["status"], "last_seq": events.last_seq})
+    if thread["status"] == "waiting_for_user":
+        pending_interrupt(thread_id)
+    elif thread["status"] in ("created", "ready_to_resume", "forked", "error"):
+        start_thread_run(thread_id)
+
+    logger.info(f"[API] WebSocket connected to thread {thread_id} (last_seq={last_seq})")
+    tasks = [asyncio.create_task(push_events(last_seq)), asyncio.create_task(heartbeat())]
+    idle_timeout = settings.get_float("WS_IDLE_TIMEOUT_S", 60)
+    try:
+        while True:
+            try:
+                message = json.loads(await asyncio.wait_for(websocket.receive_text(), idle_timeout))
+            except asyncio.TimeoutError:
+                logger.info(f"[API] WebSocket for thread {thread_id} idle, closing")
+                async with send_lock:
+                    await websocket.close(code=1001, reason="Idle timeout")
+                break
+            except json.JSONDecodeError:
+                await send({"type": "error", "message": "Messages must be JSON"})
+                continue
+
+            if message.get("type") == "resume":
+                if thread["status"] != "waiting_for_user":
+                    await send({"type": "error",
+                                "message": f"Thread is not waiting for a response ({thread['status']})"})
+                    continue
+                record_response(thread_id, str(message.get("response", "")))
+                start_thread_run(thread_id)
+            elif message.get("type") == "ping":
+                await send({"type": "pong", "time": message.get("time")})
+            elif message.get("type") != "pong":
+                await send({"type": "error", "message": f"Unknown message type: {message.get('type')}"})
+
+    except WebSocketDisconnect:
+        logger.info(f"[API] WebSocket disconnected from thread {thread_id}")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# ------------------------------------------------------------------------------
+
+
+@root_router.get('/agent/state/{thread_id}')
 async def get_thread_state(thread_id: str):
     """
     Get the full state of a thread.
@@ -272,11 +818,12 @@ async def get_thread_state(thread_id: str):
             }
         }
 
-        state_snapshot = graph.get_state(config)
+        state_snapshot = get_graph().get_state(config)
 
         return {
             "thread_id": thread_id,
             "values": state_snapshot.values,
+            "usage": summarize_usage(state_snapshot.values.get("token_usage")),
             "next_nodes": state_snapshot.next,
             "metadata": state_snapshot.metadata
         }
@@ -286,7 +833,7 @@ async def get_thread_state(thread_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get('/')
+@root_router.get('/')
 async def check():
     """
     Health check endpoint.
@@ -294,8 +841,90 @@ async def check():
     return {"status": "healthy", "active_threads": len(THREADS)}
 
 
+# ------------------------------------------------------------------------------
+# App factory and warm-up
+#    - Warm-up hooks run once at startup, before the first request, so the first
+#      thread does not pay for graph compilation, imports or connection setup
+# ------------------------------------------------------------------------------
+
+WARM_UP_HOOKS: List[Callable[[], Any]] = []
+
+
+def on_warm_up(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Registers a function to run when the app starts (if warm-up is enabled)."""
+    WARM_UP_HOOKS.append(fn)
+    return fn
+
+
+@on_warm_up
+def compile_agent_graph():
+    get_graph()
+
+
+@on_warm_up
+def load_docx_template():
+    from src.utils.doc_builder import get_template
+
+    get_template().base_package()
+
+
+@on_warm_up
+def open_model_client():
+    # Imports the provider (langchain_openai) and builds the HTTP client (connection pool) shared by its models
+    from src.utils.llm import chat_model
+
+    chat_model(model="gpt-4o-mini")
+
+
+@on_warm_up
+def start_render_service():
+    get_render_service()
+
+
+def run_warm_up():
+    for hook in WARM_UP_HOOKS:
+        start = time.perf_counter()
+        try:
+            hook()
+        except Exception as e:
+            # A failed warm-up only makes the first request slower
+            logger.warning(f"[API] Warm-up '{hook.__name__}' failed: {e}")
+            continue
+        logger.info(f"[API] Warm-up '{hook.__name__}' took {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def create_app(warm_up: Optional[bool] = None) -> FastAPI:
+    """Builds the API: loads .env, starts logging and, unless disabled (WARM_UP=0), warms up on startup."""
+    settings.load_env()
+    start_logging()
+    warm_up = settings.get_flag("WARM_UP", True) if warm_up is None else warm_up
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        if warm_up:
+            await asyncio.to_thread(run_warm_up)
+        yield
+
+    api = FastAPI(title="LangGraph Agent API", lifespan=lifespan)
+    api.include_router(router)
+    api.include_router(root_router)
+    return api
+
+
+_app = None
+
+
+def __getattr__(name: str):
+    # `app` (e.g. `uvicorn main_api_server:app`) is created on first access, not at import
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
     import uvicorn
 
-    app.include_router(router)
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    uvicorn.run(create_app(), host="127.0.0.1", port=8000)
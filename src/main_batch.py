@@ -0,0 +1,320 @@
+"""
+Batch runner: generates one document per prompt of a JSONL file, several at a time.
+
+Each input line is {"id": "...", "prompt": "...", ...settings}, where settings are
+initial state values (confidence_threshold, max_regen_attempts, regeneration_mode,
+render_mode, ...). "id" defaults to the line number.
+
+Review questions are answered according to --review:
+  - auto:     every section sent to review is approved
+  - scripted: ScriptedReviewer (--reject-rate, --max-rounds, --feedback)
+  - file:     deferred. Questions are appended to OUT/reviews.jsonl and the document
+              waits. Answer by appending {"key": ..., "response": ...} lines to the
+              same file (a copy of the question line with "response" added will do),
+              then run the same command again.
+
+Everything under --out makes the run resumable. Running the same command again
+skips finished documents and continues the others from their last saved checkpoint:
+  - progress.jsonl:  one line per document per state change (done, failed, waiting_for_review)
+  - checkpoints.pkl: graph checkpoints of unfinished documents, saved every SAVE_INTERVAL_S
+                     and whenever a document waits for review; section content is in sections/
+  - manifest.json:   per-document results and timings, written at the end of every run
+  - outputs/:        the documents and their artifacts.jsonl index
+
+Thread ids combine the directory name with a hash of its resolved path, so runs in
+different directories with the same name never share threads.
+
+Run from the repository root:
+    python -m src.main_batch prompts.jsonl --out batch_runs/guides --workers 4 --review scripted
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langgraph.types import Command
+
+from src.graph_agent_complex import compile_graph
+from src.utils import settings
+from src.utils.artifacts import artifact_index, set_output_root
+from src.utils.checkpoint_serde import CompactSerializer
+from src.utils.checkpointing import DURABILITY_MODES, FileSaver
+from src.utils.reviewer import ScriptedReviewer
+from src.utils.section_store import InterningSerializer, section_store
+from src.utils.set_logging import logger, start_logging
+from src.utils.state import AgentState, default_initial_state
+from src.utils.usage import summarize_usage
+
+REVIEW_MODES = ("auto", "scripted", "file")
+SAVE_INTERVAL_S = 5.0  # at most this much work per unfinished document is lost in a crash
+
+
+# -------------------------------INPUT------------------------------------------
+def load_prompts(path: Path) -> List[dict]:
+    """Prompt lines with their settings; fails on unknown settings and duplicate ids."""
+    docs, seen = [], set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            doc = json.loads(line)
+            doc_id = str(doc.pop("id", line_no))
+            if doc_id in seen:
+                raise ValueError(f"{path}:{line_no}: duplicate id '{doc_id}'")
+            if not doc.get("prompt"):
+                raise ValueError(f"{path}:{line_no}: missing prompt")
+            unknown = set(doc) - set(AgentState.__annotations__)
+            if unknown:
+                raise ValueError(f"{path}:{line_no}: unknown setting(s): {', '.join(sorted(unknown))}")
+            seen.add(doc_id)
+            docs.append({"id": doc_id, "line": line_no, "settings": doc})
+    return docs
+
+
+class JsonLines:
+    """Append-only JSONL file shared by the workers."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def read(self) -> List[dict]:
+        if not self.path.exists():
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def append(self, entry: dict):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+# -------------------------------REVIEWS----------------------------------------
+def question_key(thread_id: str, checkpoint_id: str, question: dict) -> str:
+    """Stable id of a review question: the same pending question gets the same key after a restart."""
+    text = f"{thread_id}|{checkpoint_id}|{question.get('question', '')}|{question.get('details', '')}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ReviewFile(JsonLines):
+    """Deferred reviews: question lines written by the runner, answer lines added by reviewers."""
+
+    def answer(self, key: str) -> Optional[str]:
+        answers = {e["key"]: e["response"] for e in self.read() if e.get("response") is not None}
+        return answers.get(key)
+
+    def ask(self, doc_id: str, key: str, question: dict):
+        if not any(e.get("key") == key for e in self.read()):
+            self.append({"id": doc_id, "key": key, "question": question.get("question", ""),
+                         "details": question.get("details", ""), "asked_at": time.time()})
+
+
+# -------------------------------RUNNER-----------------------------------------
+class BatchRunner:
+    def __init__(self, out_dir: Path, workers: int = 4, review: str = "auto", reject_rate: float = 0.5,
+                 max_rounds: int = 1, feedback: str = "Add a concrete example.", durability: str = "async"):
+        self.out_dir = Path(out_dir).resolve()
+        self.workers = workers
+        self.review = review
+        self.reject_rate = reject_rate
+        self.max_rounds = max_rounds
+        self.feedback = feedback
+        self.durability = durability
+
+        out_dir = self.out_dir
+        out_dir.mkdir(parents=True, exist_ok=True)
+        # Checkpoints keep section content as hashes: the content has to survive restarts too
+        section_store.mirror_to(str(out_dir / "sections"))
+        set_output_root(out_dir / "outputs")
+        self.saver = FileSaver(out_dir / "checkpoints.pkl", serde=InterningSerializer(CompactSerializer()))
+        self.graph = compile_graph(self.saver)
+        self.progress = JsonLines(out_dir / "progress.jsonl")
+        self.reviews = ReviewFile(out_dir / "reviews.jsonl")
+        self._save_lock = threading.Lock()
+        self.run_id = f"{out_dir.name}-{hashlib.blake2b(str(out_dir).encode('utf-8'), digest_size=4).hexdigest()}"
+
+    def thread_id(self, doc: dict) -> str:
+        return f"{self.run_id}-{doc['id']}"
+
+    def save_checkpoints(self):
+        with self._save_lock:
+            self.saver.save()
+
+    def save_periodically(self, stop: threading.Event):
+        while not stop.wait(SAVE_INTERVAL_S):
+            try:
+                self.save_checkpoints()
+            except Exception as e:
+                logger.error(f"[BATCH] Saving checkpoints failed: {e}")
+
+    def reviewer(self, doc: dict) -> Optional[ScriptedReviewer]:
+        if self.review == "auto":
+            return ScriptedReviewer(reject_rate=0.0)
+        if self.review == "scripted":
+            return ScriptedReviewer(self.reject_rate, self.max_rounds, self.feedback, seed=doc["line"])
+        return None
+
+    def result(self, doc: dict, status: str, values: dict, previous: dict, timings: dict, **extra) -> dict:
+        usage = summarize_usage(values.get("token_usage"))["total"]
+        thread_id = self.thread_id(doc)
+        return {
+            "id": doc["id"],
+            "thread_id": thread_id,
+            "status": status,
+            "prompt": doc["settings"]["prompt"],
+            "output": values.get("output", ""),
+            "documents": [a["path"] for a in artifact_index.query(thread_id)][::-1],
+            "sections": len(values.get("sections", [])),
+            "revisions": values.get("revision_count", 0),
+            "auto_approved": values.get("auto_approval_count", 0),
+            "human_reviewed": values.get("human_review_count", 0),
+            "questions": previous.get("questions", 0) + timings["questions"],
+            "runs": previous.get("runs", 0) + 1,
+            "tokens": usage["total_tokens"],
+            "cost_usd": round(usage["cost_usd"], 6),
+            "timings": {
+                "started_at": previous.get("timings", {}).get("started_at", timings["started_at"]),
+                "finished_at": time.time() if status == "done" else None,
+                "queued_s": round(timings["queued_s"], 3),
+                "run_s": round(previous.get("timings", {}).get("run_s", 0.0) + timings["run_s"], 3),
+                "review_s": round(previous.get("timings", {}).get("review_s", 0.0) + timings["review_s"], 3),
+            },
+            **extra,
+        }
+
+    def run_document(self, doc: dict, previous: dict, batch_started: float) -> dict:
+        """Runs one document until it is finished or waits for a deferred review."""
+        config = {"configurable": {"thread_id": self.thread_id(doc)}}
+        reviewer = self.reviewer(doc)
+        timings = {"started_at": time.time(), "queued_s": time.perf_counter() - batch_started,
+                   "run_s": 0.0, "review_s": 0.0, "questions": 0}
+
+        # A saved checkpoint is continued (at its pending question, if any); only documents
+        # without one start from the prompt
+        snapshot = self.graph.get_state(config)
+        value, run_graph = None, not snapshot.values
+        if snapshot.values:
+            logger.info(f"[BATCH] Resuming {doc['id']} from checkpoint")
+            if reviewer is not None:
+                # Rounds with rejections so far, including one in progress (answered "n", not yet reflected)
+                pending = [item.value for task in snapshot.tasks for item in task.interrupts]
+                in_round = "reflect_and_learn" in snapshot.next or bool(
+                    pending and not pending[0].get("question", "").startswith("Review complete"))
+                reviewer.rounds = snapshot.values.get("revision_count", 0) + in_round
+        else:
+            doc_settings = dict(doc["settings"])
+            value = default_initial_state(doc_settings.pop("prompt"), doc_settings.pop("confidence_threshold", 0.8),
+                                          doc_settings.pop("max_regen_attempts", 3),
+                                          **{"render_mode": "inline", **doc_settings})
+
+        try:
+            while True:
+                if run_graph:
+                    start = time.perf_counter()
+                    for _ in self.graph.stream(value, config, stream_mode="updates", durability=self.durability):
+                        pass
+                    timings["run_s"] += time.perf_counter() - start
+                    snapshot = self.graph.get_state(config)
+
+                if not snapshot.next:
+                    return self.result(doc, "done", snapshot.values, previous, timings)
+                pending = [item.value for task in snapshot.tasks for item in task.interrupts]
+                if not pending:  # stopped between steps (a crash before the last save): continue
+                    value, run_graph = None, True
+                    continue
+
+                start = time.perf_counter()
+                if reviewer is not None:
+                    response = reviewer.answer(pending[0])
+                else:
+                    key = question_key(config["configurable"]["thread_id"],
+                                       snapshot.config["configurable"]["checkpoint_id"], pending[0])
+                    response = self.reviews.answer(key)
+                    if response is None:
+                        self.save_checkpoints()
+                        self.reviews.ask(doc["id"], key, pending[0])
+                        return self.result(doc, "waiting_for_review", snapshot.values, previous, timings,
+                                           review_key=key)
+                timings["review_s"] += time.perf_counter() - start
+                timings["questions"] += 1
+                value, run_graph = Command(resume=response), True
+
+        except Exception as e:
+            logger.error(f"[BATCH] {doc['id']} failed: {e}", exc_info=True)
+            return self.result(doc, "failed", snapshot.values, previous, timings, error=str(e))
+
+    def run(self, docs: List[dict]) -> List[dict]:
+        """Runs every unfinished document; returns the latest result of every document."""
+        latest: Dict[str, dict] = {entry["id"]: entry for entry in self.progress.read()}
+        todo = [doc for doc in docs if latest.get(doc["id"], {}).get("status") != "done"]
+        logger.info(f"[BATCH] {len(docs)} documents, {len(docs) - len(todo)} already done, "
+                    f"{len(todo)} to run with {self.workers} workers ({self.review} review)")
+
+        batch_started = time.perf_counter()
+        stop_saving = threading.Event()
+        threading.Thread(target=self.save_periodically, args=(stop_saving,), name="checkpoint-saver",
+                         daemon=True).start()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.run_document, doc, latest.get(doc["id"], {}), batch_started): doc
+                       for doc in todo}
+            for finished, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                latest[result["id"]] = result
+                self.progress.append(result)
+                if result["status"] == "done":
+                    # Finished documents are recorded, their checkpoints are not needed to resume any more
+                    self.saver.delete_thread(result["thread_id"])
+                print(f"[{finished}/{len(todo)}] {result['id']}: {result['status']} "
+                      f"({result['timings']['run_s']:.1f}s run, {result['questions']} questions)")
+        stop_saving.set()
+        self.save_checkpoints()
+
+        results = [latest[doc["id"]] for doc in docs if doc["id"] in latest]
+        self.write_manifest(results, time.perf_counter() - batch_started)
+        return results
+
+    def write_manifest(self, results: List[dict], wall_s: float):
+        counts: Dict[str, int] = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        manifest = {"documents": len(results), "by_status": counts, "wall_s": round(wall_s, 3),
+                    "review": self.review, "workers": self.workers, "results": results}
+        with open(self.out_dir / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate documents for every prompt of a JSONL file")
+    parser.add_argument("prompts", type=Path, help="JSONL file: one {\"id\", \"prompt\", ...settings} per line")
+    parser.add_argument("--out", type=Path, default=Path("batch_runs/default"),
+                        help="progress, checkpoints, reviews and manifest (reuse it to resume)")
+    parser.add_argument("--workers", type=int, default=4, help="documents generated at the same time")
+    parser.add_argument("--review", choices=REVIEW_MODES, default="auto")
+    parser.add_argument("--reject-rate", type=float, default=0.5, help="scripted review: share of sections rejected")
+    parser.add_argument("--max-rounds", type=int, default=1, help="scripted review: rounds with rejections")
+    parser.add_argument("--feedback", default="Add a concrete example.", help="scripted review: feedback given")
+    parser.add_argument("--durability", choices=DURABILITY_MODES, default="async")
+    args = parser.parse_args()
+
+    settings.load_env()
+    start_logging()
+
+    runner = BatchRunner(args.out, args.workers, args.review, args.reject_rate, args.max_rounds, args.feedback,
+                         args.durability)
+    results = runner.run(load_prompts(args.prompts))
+
+    waiting = sum(result["status"] == "waiting_for_review" for result in results)
+    print(f"{sum(result['status'] == 'done' for result in results)}/{len(results)} documents done, "
+          f"{sum(result['status'] == 'failed' for result in results)} failed, {waiting} waiting for review")
+    if waiting:
+        print(f"answer the questions in {runner.reviews.path} and run the same command again")
+    print(f"manifest written to {args.out / 'manifest.json'}")
+
+
+if __name__ == "__main__":
+    main()
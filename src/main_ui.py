@@ -1,65 +1,129 @@
 import json
+import threading
+from collections import deque
 
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 
 API_BASE = "http://localhost:8000/agent"
+MAX_THREADS = 8         # threads watched at once (each open stream holds a pooled connection)
+MAX_EVENTS = 500        # events kept per thread; older ones are dropped
+LOG_VIEW_LINES = 200    # log lines shown per thread
+REFRESH_S = 1.0         # how often the thread panels pick up new events
 
 st.set_page_config(page_title="LangGraph Human-in-the-Loop Demo", layout="wide")
 
 # ---------------------------------------------------------------------
-# Session State
+# HTTP Session
 # ---------------------------------------------------------------------
 
-if "thread_id" not in st.session_state:
-    st.session_state.thread_id = None
-
-if "waiting_for_user" not in st.session_state:
-    st.session_state.waiting_for_user = False
-
-if "interrupt_data" not in st.session_state:
-    st.session_state.interrupt_data = None
-
-if "logs" not in st.session_state:
-    st.session_state.logs = []
+@st.cache_resource
+def http_session() -> requests.Session:
+    """One keep-alive connection pool shared by every rerun and reader thread."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_THREADS + 2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 # ---------------------------------------------------------------------
-# Helpers
+# Thread Watchers
 # ---------------------------------------------------------------------
 
-def log(msg):
-    st.session_state.logs.append(msg)
-
-def stream_agent():
-    url = f"{API_BASE}/stream/{st.session_state.thread_id}"
-
-    try:
-        with requests.get(url, stream=True) as r:
-            for line in r.iter_lines():
-                if not line:
-                    continue
-
-                event = json.loads(line.decode("utf-8"))
-                event_type = event["type"]
-
-                if event_type == "update":
-                    log(event["data"])
-
-                elif event_type == "interrupt":
-                    st.session_state.waiting_for_user = True
-                    st.session_state.interrupt_data = event["data"]
-                    return  # ⛔ stop streaming
+def format_event(event: dict) -> str:
+    if event["type"] == "update":
+        return f"▶️ {', '.join(event['data'])}"
+    if event["type"] == "interrupt":
+        return f"❓ {event['data'][0]['question']}"
+    if event["type"] == "done":
+        return "✅ Agent execution completed"
+    if event["type"] == "error":
+        return f"❌ {event['message']}"
+    return str(event)
+
+
+class ThreadWatcher:
+    """
+    Streams one agent thread in a background thread. Streamlit reruns never wait on the
+    stream, they read the lines collected so far (formatted once, as they arrive).
+    """
+
+    def __init__(self, thread_id: str, prompt: str):
+        self.thread_id = thread_id
+        self.prompt = prompt
+        self.status = "created"
+        self.interrupt = None
+        self.lines = deque([f"🧵 Thread created: {thread_id}"], maxlen=MAX_EVENTS)
+        self.received = 1  # lines ever added
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def log(self, line: str):
+        with self._lock:
+            self.lines.append(line)
+            self.received += 1
+
+    def tail(self, n: int = LOG_VIEW_LINES) -> list:
+        with self._lock:
+            return list(self.lines)[-n:]
+
+    @property
+    def running(self) -> bool:
+        return self._reader is not None and self._reader.is_alive()
+
+    def run(self):
+        """Starts (or resumes) the thread; a no-op while it is already streaming."""
+        if self.running or self.status in ("waiting_for_user", "completed"):
+            return
+        self.status = "running"
+        self._reader = threading.Thread(target=self._read_stream, name=f"stream-{self.thread_id[:8]}", daemon=True)
+        self._reader.start()
+
+    def respond(self, response: str):
+        http_session().post(f"{API_BASE}/respond/{self.thread_id}", json={"response": response},
+                            timeout=30).raise_for_status()
+        self.interrupt = None
+        self.status = "ready_to_resume"
+        self.log(f"User responded: {response}")
+        self.run()
+
+    def _read_stream(self):
+        try:
+            with http_session().get(f"{API_BASE}/stream/{self.thread_id}", stream=True, timeout=(5, None)) as r:
+                r.raise_for_status()
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line.decode("utf-8"))
+                    if "type" not in event:  # the thread had already completed
+                        self.status = "completed"
+                        return
+                    self.log(format_event(event))
+
+                    if event["type"] == "interrupt":
+                        self.interrupt = event["data"][0]
+                        self.status = "waiting_for_user"
+                        return
+                    if event["type"] == "done":
+                        self.status = "completed"
+                        return
+                    if event["type"] == "error":
+                        self.status = "error"
+                        return
+            self.status = "stopped"
+        except Exception as e:
+            self.log(f"❌ An Error has occured : {e}")
+            self.status = "error"
 
-                elif event_type == "done":
-                    log("✅ Agent execution completed")
-                    return
+# ---------------------------------------------------------------------
+# Session State
+# ---------------------------------------------------------------------
 
-                elif event_type == "error":
-                    log(f"❌ {event['message']}")
-                    return
-    except Exception as e:
-        st.error(f"An Error has occured : {e}")
+if "watchers" not in st.session_state:
+    st.session_state.watchers = {}
 
+watchers = st.session_state.watchers
 
 # ---------------------------------------------------------------------
 # UI
@@ -82,84 +146,88 @@ with st.sidebar:
     confidence = st.slider("Confidence Threshold", 0.0, 1.0, 0.8)
     max_regen = st.number_input("Max Regeneration Attempts", 1, 10, 3)
 
-    if st.button("Start Agent"):
-        res = requests.post(
-            f"{API_BASE}/start",
-            json={
-                "prompt": prompt,
-                "confidence_threshold": confidence,
-                "max_regen_attempts": max_regen,
-            },
-        ).json()
-
-        st.session_state.thread_id = res["thread_id"]
-        st.session_state.logs = []
-        st.session_state.waiting_for_user = False
-
-        log(f"🧵 Thread created: {st.session_state.thread_id}")
+    if st.button("Start Agent", disabled=len(watchers) >= MAX_THREADS):
+        try:
+            res = http_session().post(
+                f"{API_BASE}/start",
+                json={
+                    "prompt": prompt,
+                    "confidence_threshold": confidence,
+                    "max_regen_attempts": max_regen,
+                },
+                timeout=30,
+            ).json()
+            watcher = ThreadWatcher(res["thread_id"], prompt)
+            watchers[watcher.thread_id] = watcher
+            watcher.run()
+        except Exception as e:
+            st.error(f"An Error has occured : {e}")
+
+    if watchers:
+        st.divider()
+        st.header("Threads")
+        for thread_id, watcher in list(watchers.items()):
+            if st.button(f"✖ {thread_id[:8]} ({watcher.status})", key=f"close-{thread_id}"):
+                del watchers[thread_id]  # a running reader finishes on its own
+                st.rerun()
 
 # ---------------------------------------------------------------------
-# Execution Controls
+# Thread Panels
+#    - Each panel is a fragment refreshed every REFRESH_S: only the panel reruns,
+#      not the whole script, and it draws lines its reader already formatted
 # ---------------------------------------------------------------------
 
-if st.session_state.thread_id:
-
+@st.fragment(run_every=REFRESH_S)
+def thread_panel(watcher: ThreadWatcher):
     col1, col2 = st.columns([1, 1])
 
     with col1:
-        if st.button("▶️ Run / Resume Agent"):
-            stream_agent()
+        if st.button("▶️ Run / Resume Agent", key=f"run-{watcher.thread_id}", disabled=watcher.running):
+            watcher.run()
 
     with col2:
-        st.code(st.session_state.thread_id, language="text")
-
-# ---------------------------------------------------------------------
-# Interrupt UI
-# ---------------------------------------------------------------------
-
-if st.session_state.waiting_for_user and st.session_state.interrupt_data:
-    st.divider()
-    st.subheader("Human Feedback Required")
-
-    interrupt = st.session_state.interrupt_data[0]
-
-    if interrupt.get("details"):
-        st.markdown("**Details**")
-        st.info(interrupt["details"])
-
-    choice1 = st.radio(
-        interrupt.get("question", "Choose an option"),
-        ["y", "n", ""],
-        horizontal=True,
-    )
-
-    choice2 = st.text_input(label="Enter option")
-
-    choice = choice2 if choice2 else choice1
-
-
-    if st.button("Submit Feedback and Continue"):
-        requests.post(
-            f"{API_BASE}/respond/{st.session_state.thread_id}",
-            json={"response": choice},
+        st.code(watcher.thread_id, language="text")
+        st.caption(f"Status: {watcher.status}")
+
+    # Interrupt UI
+    interrupt = watcher.interrupt
+    if watcher.status == "waiting_for_user" and interrupt:
+        st.divider()
+        st.subheader("Human Feedback Required")
+
+        if interrupt.get("details"):
+            st.markdown("**Details**")
+            st.info(interrupt["details"])
+
+        # Keyed by the lines received, so each new question starts with a fresh answer
+        choice1 = st.radio(
+            interrupt.get("question", "Choose an option"),
+            ["y", "n", ""],
+            horizontal=True,
+            key=f"choice-{watcher.thread_id}-{watcher.received}",
         )
 
-        st.session_state.waiting_for_user = False
-        st.session_state.interrupt_data = None
-
-        stream_agent()
+        choice2 = st.text_input(label="Enter option", key=f"option-{watcher.thread_id}-{watcher.received}")
 
-        log(f"User responded: {choice}")
+        choice = choice2 if choice2 else choice1
 
-        st.rerun()
+        if st.button("Submit Feedback and Continue", key=f"submit-{watcher.thread_id}"):
+            try:
+                watcher.respond(choice)
+            except Exception as e:
+                st.error(f"An Error has occured : {e}")
+            st.rerun(scope="fragment")
 
+    # Logs: the last LOG_VIEW_LINES lines as one element
+    st.divider()
+    st.subheader("📜 Execution Log")
+    st.text("\n".join(watcher.tail()))
 
-# ---------------------------------------------------------------------
-# Logs
-# ---------------------------------------------------------------------
-
-st.divider()
-st.subheader("📜 Execution Log")
 
-for entry in st.session_state.logs:
-    st.write(entry)
+if not watchers:
+    st.info("Start an agent from the sidebar.")
+else:
+    tabs = st.tabs([f"{thread_id[:8]} · {watcher.prompt[:30]}" for thread_id, watcher in watchers.items()])
+    for tab, watcher in zip(tabs, list(watchers.values())):
+        with tab:
+            thread_panel(watcher)
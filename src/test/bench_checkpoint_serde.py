@@ -0,0 +1,100 @@
+"""
+Checkpoint serializer throughput and stored size on realistic agent states:
+the default JsonPlusSerializer vs. CompactSerializer (zlib / zstd) and the graph's
+default stack (InterningSerializer over CompactSerializer).
+
+Run from the repository root:
+    python -m src.test.bench_checkpoint_serde
+"""
+import random
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.utils.checkpoint_serde import CompactSerializer, SCHEMA_VERSION
+from src.utils.section_store import InterningSerializer, section_store
+
+SIZES = [(6, 4), (12, 8), (40, 12)]  # (sections, paragraphs per section)
+ROUNDS = 200
+
+WORDS = ("container image layer cache build registry volume network port compose service deploy "
+         "runtime kernel namespace cgroup filesystem snapshot tag push pull environment variable secret "
+         "health check restart policy overlay bridge host entrypoint command argument dockerfile stage").split()
+
+
+def prose(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_state(n_sections: int, n_paragraphs: int) -> dict:
+    rng = random.Random(n_sections)
+    sections = [{
+        "name": f"Section {i}",
+        "content": "\n\n".join(prose(rng, 60) for _ in range(n_paragraphs)),
+        "confidence": 0.72 + (i % 5) * 0.05,
+        "initial_confidence": 0.7,
+        "reasoning": "Requirements are clear but the section depends on the reader's platform.",
+        "status": "auto_approved" if i % 3 else "human_reviewed",
+        "reviewed": i % 3 == 0,
+    } for i in range(n_sections)]
+
+    return {
+        "prompt": "Write a practical guide to Docker for backend developers",
+        "sections": sections,
+        "messages": [HumanMessage(content="Write a guide"), AIMessage(content=f"Generated {n_sections} sections")],
+        "mistakes": ["Use concrete commands", "Avoid marketing language"],
+        "section_rules": {f"Section {i}": ["Add an example"] for i in range(0, n_sections, 3)},
+        "section_feedback": {"Section 0": "Too vague, add a docker-compose example."},
+        "high_confidence_sections": [s["name"] for s in sections if s["status"] == "auto_approved"],
+        "review_req_sections": [],
+        "revision_count": 2,
+        "confidence_threshold": 0.8,
+    }
+
+
+def measure(serde, state):
+    data = serde.dumps_typed(state)
+    assert serde.loads_typed(data)["sections"][0]["content"] == state["sections"][0]["content"]
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        data = serde.dumps_typed(state)
+    dumps_s = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        serde.loads_typed(data)
+    loads_s = (time.perf_counter() - start) / ROUNDS
+    return len(data[1]), dumps_s, loads_s
+
+
+def main():
+    serializers = [
+        ("JsonPlusSerializer", JsonPlusSerializer()),
+        ("Compact zlib", CompactSerializer(compression="zlib")),
+        ("Compact zstd", CompactSerializer(compression="zstd")),
+        ("Interning+Compact", InterningSerializer(CompactSerializer())),
+    ]
+
+    print(f"schema version {SCHEMA_VERSION}, {ROUNDS} rounds per measurement")
+    print(f"{'state':>10} | {'serializer':<20} | {'KiB':>7} | {'dumps MB/s':>10} | {'loads MB/s':>10}")
+    for n_sections, n_paragraphs in SIZES:
+        state = make_state(n_sections, n_paragraphs)
+        raw = len(JsonPlusSerializer().dumps_typed(state)[1])
+        for label, serde in serializers:
+            size, dumps_s, loads_s = measure(serde, state)
+            # Throughput relative to the state's plain msgpack size, so rows are comparable
+            print(f"{n_sections:>3}x{n_paragraphs:<2} par | {label:<20} | {size / 1024:>7.1f} | "
+                  f"{raw / dumps_s / 1e6:>10.0f} | {raw / loads_s / 1e6:>10.0f}")
+
+    # Interned content lives in the section store (once per distinct text)
+    print(f"section store: {section_store.stats()}")
+
+    # Payloads written by the plain serializer load as schema version 1 and are migrated
+    legacy = JsonPlusSerializer().dumps_typed([{"name": "Intro", "content": "x", "confidence": 0.9, "status": "auto_approved"}])
+    print(f"migrated v1 section: {CompactSerializer().loads_typed(legacy)[0]}")
+
+
+if __name__ == "__main__":
+    main()
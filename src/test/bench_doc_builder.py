@@ -0,0 +1,93 @@
+"""
+Documents/second and allocations for 50-section documents:
+the previous python-docx path (Document() + add_paragraph per line) vs. DocumentBuilder.
+
+Run from the repository root:
+    python -m src.test.bench_doc_builder
+"""
+import io
+import time
+import tracemalloc
+
+from docx import Document
+
+from src.utils.doc_builder import get_template
+from src.utils.doc_cache import fragment_cache
+from src.utils.write_to_doc import render_sections
+
+SECTIONS = 50
+LINES = 12
+ROUNDS = 20
+
+
+def legacy_render_sections(title, sections, stream):
+    """The python-docx rendering path used before DocumentBuilder."""
+    doc = Document()
+    doc.add_heading(title, level=1)
+
+    total_sections = len(sections)
+    auto_approved = sum(1 for s in sections if s.get("status") == "auto_approved")
+    human_reviewed = sum(1 for s in sections if s.get("status") == "human_reviewed")
+
+    metadata = doc.add_paragraph()
+    metadata.add_run("Document Statistics:\n").bold = True
+    metadata.add_run(f"Total Sections: {total_sections}\n")
+    metadata.add_run(f"Auto-approved: {auto_approved}\n")
+    metadata.add_run(f"Human-reviewed: {human_reviewed}\n")
+    metadata.add_run(f"Efficiency: {(auto_approved/total_sections*100):.1f}% automated\n\n")
+
+    for section in sections:
+        doc.add_heading(section["name"], level=2)
+        doc.add_paragraph().add_run(f"Auto-approved (Confidence: {section['confidence']:.2f})").italic = True
+        for line in section["content"].split("\n"):
+            line = line.strip()
+            if line:
+                doc.add_paragraph(line)
+        doc.add_paragraph()
+
+    doc.save(stream)
+
+
+def make_sections():
+    return [{
+        "name": f"Section {i}",
+        "content": "\n".join(f"Line {j}: images are built from layered, cacheable filesystem diffs." for j in range(LINES)),
+        "confidence": 0.9,
+        "status": "auto_approved",
+    } for i in range(SECTIONS)]
+
+
+def measure(render, sections):
+    render(sections)  # warm up (template parse / imports)
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        render(sections)
+    per_doc = (time.perf_counter() - start) / ROUNDS
+
+    tracemalloc.start()
+    render(sections)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return 1 / per_doc, peak / 1024, current / 1024
+
+
+def main():
+    sections = make_sections()
+    get_template()
+
+    variants = [
+        ("python-docx (previous)", lambda s: legacy_render_sections("Bench", s, io.BytesIO())),
+        # Cold render: every section misses the fragment cache (see bench_incremental_render)
+        ("DocumentBuilder", lambda s: (fragment_cache.clear(), render_sections("Bench", s, io.BytesIO()))),
+    ]
+
+    print(f"{SECTIONS} sections x {LINES} lines per document")
+    print(f"{'path':<24} | {'docs/s':>7} | {'peak KiB':>8} | {'retained KiB':>12}")
+    for label, render in variants:
+        docs_per_s, peak_kib, retained_kib = measure(render, sections)
+        print(f"{label:<24} | {docs_per_s:>7.1f} | {peak_kib:>8.0f} | {retained_kib:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Run latency and throughput per checkpoint durability mode, with and without write
+coalescing of routing-only supersteps.
+
+Every thread runs the full refinement loop against the stub model (one review
+round, one regeneration) with a scripted reviewer. Checkpoint writes get a simulated
+latency, as with a networked checkpoint store.
+
+Run from the repository root:
+    python -m src.test.bench_durability
+"""
+import json
+import re
+import time
+from types import SimpleNamespace
+
+from langgraph.types import Command
+
+import src.graph_agent_complex as agent
+from src.test.stub_model import StubChatModel
+from src.utils.checkpoint_serde import CompactSerializer
+from src.utils.checkpointing import DURABILITY_MODES, CoalescingSaver
+from src.utils.llm import set_model_provider
+from src.utils.section_store import InterningSerializer
+
+WRITE_LATENCY_S = 0.002
+THREADS = 20
+ANSWERS = ["n", "all", "Add an example.", "Add an example.", "y", "y", "y"]
+
+
+class SlowSaver(CoalescingSaver):
+    """Checkpoint writes take WRITE_LATENCY_S."""
+
+    def _write(self, config, checkpoint, metadata, new_versions):
+        time.sleep(WRITE_LATENCY_S)
+        return super()._write(config, checkpoint, metadata, new_versions)
+
+
+def respond(prompt: str) -> str:
+    if "User request:" in prompt:
+        return json.dumps({"sections": [
+            {"name": f"Section {i}", "content": "\n\n".join(f"Paragraph {j}." for j in range(4)),
+             "confidence": 0.5 if i < 2 else 0.95, "reasoning": "draft"} for i in range(8)]})
+    if "### Section:" in prompt:
+        names = re.findall(r"### Section: (.+)", prompt)
+        return json.dumps({"global_rules": ["Be concrete"],
+                           "section_rules": [{"section": n, "rules": ["Add an example"]} for n in names]})
+    if "Available edit operations" in prompt:
+        return json.dumps({"edits": [{"op": "replace", "index": 1, "text": "Revised."}], "confidence": 0.9})
+    return json.dumps({"content": "regenerated", "confidence": 0.9, "reasoning": "x"})
+
+
+def run_thread(graph, thread_id: str, durability: str):
+    config = {"configurable": {"thread_id": thread_id}}
+    value = {"prompt": "Write a guide about Docker", "confidence_threshold": 0.8, "max_regen_attempts": 3,
+             "revision_count": 0, "mistakes": [], "section_rules": {}, "messages": []}
+    answers = list(ANSWERS)
+    while True:
+        interrupted = False
+        for event in graph.stream(value, config, stream_mode="updates", durability=durability):
+            if "__interrupt__" in event:
+                interrupted = True
+                break
+        if not interrupted:
+            return graph.get_state(config).values
+        value = Command(resume=answers.pop(0))
+
+
+def main():
+    model = StubChatModel(responder=respond, call_latency=0.0, output_token_latency=0.0)
+    set_model_provider(lambda **kw: model)
+    agent.write_sections_to_doc = SimpleNamespace(invoke=lambda args: "skipped")
+    agent.get_run_history = lambda: SimpleNamespace(record_run=lambda *a, **kw: None)
+
+    print(f"{THREADS} threads, {WRITE_LATENCY_S * 1000:.0f} ms per checkpoint write")
+    print(f"{'durability':<10} | {'coalesce':<8} | {'ms/run':>7} | {'runs/s':>6} | {'written':>7} | {'coalesced':>9}")
+    reference = None
+    for durability in DURABILITY_MODES:
+        for coalesce in (False, True):
+            saver = SlowSaver(serde=InterningSerializer(CompactSerializer()), coalesce=coalesce)
+            graph = agent.compile_graph(checkpointer=saver)
+
+            start = time.perf_counter()
+            for i in range(THREADS):
+                values = run_thread(graph, f"{durability}-{coalesce}-{i}", durability)
+            elapsed = time.perf_counter() - start
+
+            # Every mode must end in the same final state
+            outcome = (values["output"], [(s["name"], s["status"], s["content"]) for s in values["sections"]])
+            reference = reference or outcome
+            assert outcome == reference, f"{durability}/{coalesce} diverged"
+
+            print(f"{durability:<10} | {str(coalesce):<8} | {elapsed / THREADS * 1000:>7.1f} | "
+                  f"{THREADS / elapsed:>6.1f} | {saver.written / THREADS:>7.1f} | {saver.coalesced / THREADS:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
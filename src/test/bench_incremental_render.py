@@ -0,0 +1,58 @@
+"""
+Preview render time after a regeneration round: full re-render vs. incremental
+assembly from the section fragment cache, for different numbers of changed sections.
+
+Run from the repository root:
+    python -m src.test.bench_incremental_render
+"""
+import io
+import time
+
+from src.utils.doc_builder import get_template
+from src.utils.doc_cache import fragment_cache
+from src.utils.write_to_doc import render_sections
+
+SECTIONS = 200
+LINES = 12
+CHANGED = [0, 1, 5, 20, 200]
+ROUNDS = 10
+
+
+def make_sections(revision: int = 0, changed: int = 0):
+    return [{
+        "name": f"Section {i}",
+        "content": "\n".join(
+            f"Line {j} (r{revision if i < changed else 0}): images are built from layered filesystem diffs."
+            for j in range(LINES)),
+        "confidence": 0.9,
+        "status": "auto_approved",
+    } for i in range(SECTIONS)]
+
+
+def per_render_ms(changed: int, cached: bool) -> float:
+    total = 0.0
+    for revision in range(1, ROUNDS + 1):
+        fragment_cache.clear()
+        if cached:
+            render_sections("Bench", make_sections(), io.BytesIO())  # previous revision
+
+        sections = make_sections(revision, changed)
+        start = time.perf_counter()
+        render_sections("Bench", sections, io.BytesIO())
+        total += time.perf_counter() - start
+    return total / ROUNDS * 1000
+
+
+def main():
+    get_template().base_package()
+
+    print(f"{SECTIONS} sections x {LINES} lines per document")
+    print(f"{'changed':>7} | {'full ms':>8} | {'incremental ms':>14} | {'speedup':>7}")
+    for changed in CHANGED:
+        full = per_render_ms(changed, cached=False)
+        incremental = per_render_ms(changed, cached=True)
+        print(f"{changed:>7} | {full:>8.1f} | {incremental:>14.1f} | {full / incremental:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
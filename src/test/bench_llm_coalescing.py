@@ -0,0 +1,102 @@
+"""
+Load test for cross-thread LLM call coalescing.
+
+Simulates a batch import: REQUESTS threads arrive over ARRIVAL_WINDOW_S seconds,
+drawing their prompt from DISTINCT_PROMPTS, and run ai_generate_with_confidence
+concurrently against the stub model. Reports model calls made, calls saved and
+request latency with coalescing off and on, then checks that a waiter that drops
+out (timeout) does not cancel the shared call for the others.
+
+Run from the repository root:
+    python -m src.test.bench_llm_coalescing
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import src.graph_agent_complex as agent
+from src.test.stub_model import StubChatModel
+from src.utils import llm
+
+REQUESTS = 200
+DISTINCT_PROMPTS = 20
+ARRIVAL_WINDOW_S = 2.0
+CALL_LATENCY_S = 0.5
+
+
+def respond(prompt: str) -> str:
+    return json.dumps({"sections": [
+        {"name": f"Section {i}", "content": "Content.", "confidence": 0.9, "reasoning": "clear"} for i in range(5)]})
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(coalesce: bool):
+    os.environ["LLM_COALESCE"] = "1" if coalesce else "0"
+    llm.single_flight = llm.SingleFlight()
+    model = StubChatModel(responder=respond, call_latency=CALL_LATENCY_S, output_token_latency=0.0)
+    llm.set_model_provider(lambda **kw: model)
+
+    rng = random.Random(0)
+    arrivals = sorted((rng.uniform(0, ARRIVAL_WINDOW_S), f"Write a guide about topic {rng.randrange(DISTINCT_PROMPTS)}")
+                      for _ in range(REQUESTS))
+    latencies = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def request(at, prompt):
+        time.sleep(max(0.0, at - (time.perf_counter() - start)))
+        begin = time.perf_counter()
+        result = agent.ai_generate_with_confidence({"prompt": prompt, "mistakes": [], "section_rules": {}, "messages": []})
+        assert len(result["sections"]) == 5
+        with lock:
+            latencies.append(time.perf_counter() - begin)
+
+    with ThreadPoolExecutor(max_workers=REQUESTS) as executor:
+        list(executor.map(lambda a: request(*a), arrivals))
+
+    return model.stats()["calls"], time.perf_counter() - start, latencies, llm.single_flight.stats()
+
+
+def check_abandoned_waiter():
+    """One waiter times out; the shared call still completes for the other."""
+    llm.single_flight = llm.SingleFlight()
+    model = StubChatModel(responder=respond, call_latency=0.3, output_token_latency=0.0)
+    results = {}
+
+    def waiter(name, timeout):
+        try:
+            results[name] = llm.invoke_model(model, "same prompt", coalesce=True, timeout=timeout).content[:12]
+        except TimeoutError:
+            results[name] = "timed out"
+
+    threads = [threading.Thread(target=waiter, args=("impatient", 0.05)),
+               threading.Thread(target=waiter, args=("patient", None))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, model.stats()["calls"], llm.single_flight.stats()
+
+
+def main():
+    print(f"{REQUESTS} requests over {ARRIVAL_WINDOW_S:.0f}s, {DISTINCT_PROMPTS} distinct prompts, "
+          f"{CALL_LATENCY_S * 1000:.0f} ms per call")
+    print(f"{'coalescing':<10} | {'calls':>5} | {'saved':>6} | {'p50 ms':>6} | {'p99 ms':>6} | {'wall s':>6}")
+    for coalesce in (False, True):
+        calls, wall, latencies, _ = run(coalesce)
+        print(f"{'on' if coalesce else 'off':<10} | {calls:>5} | {1 - calls / REQUESTS:>6.0%} | "
+              f"{percentile(latencies, 0.5) * 1000:>6.0f} | {percentile(latencies, 0.99) * 1000:>6.0f} | {wall:>6.2f}")
+
+    results, calls, stats = check_abandoned_waiter()
+    print(f"abandoned waiter: {results}, model calls: {calls}, stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
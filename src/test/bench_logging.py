@@ -0,0 +1,150 @@
+"""
+Logging overhead per graph node: the previous synchronous RotatingFileHandler vs
+the queued JSON pipeline, on a normal and a slow disk.
+
+Every setup runs the full refinement loop against the stub model; the overhead is
+the run time above the same runs with logging disabled, divided by the nodes run.
+"Slow disk" adds SLOW_WRITE_S to every record written, as with a loaded or
+network disk. Also reports the cost of a single log call, with an eager f-string
+vs lazy arguments and with a large payload.
+
+Run from the repository root:
+    python -m src.test.bench_logging
+"""
+import logging
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from types import SimpleNamespace
+
+import src.graph_agent_complex as agent
+from src.test.bench_durability import respond, run_thread
+from src.test.stub_model import StubChatModel
+from src.utils import metrics
+from src.utils.llm import set_model_provider
+from src.utils.set_logging import JsonFormatter, flush_logs, logger, start_logging
+
+THREADS = 30
+ROUNDS = 5
+SLOW_WRITE_S = 0.0005
+CALLS = 20_000
+
+
+class SlowFileHandler(RotatingFileHandler):
+    def emit(self, record):
+        time.sleep(SLOW_WRITE_S)
+        super().emit(record)
+
+
+def file_handler(directory: Path, name: str, slow: bool, formatter: logging.Formatter) -> logging.Handler:
+    handler = (SlowFileHandler if slow else RotatingFileHandler)(directory / name, maxBytes=1_000_000, backupCount=5)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def configure(setup: str, directory: Path):
+    """Points the agent logger at the handlers of a setup; returns a function restoring the queued pipeline."""
+    queue_handler, listener = logger._queue_handler, logger._listener
+    original = listener.handlers
+    logger.disabled = setup == "off"
+    slow = setup.endswith("slow disk")
+    if setup.startswith("sync"):
+        # The previous setup: formatting and file I/O on the calling thread
+        logger.removeHandler(queue_handler)
+        logger.addHandler(file_handler(directory, f"{setup}.log", slow, logging.Formatter(
+            "%(asctime)s | %(levelname)-5s | %(name)s | %(message)s")))
+    elif setup.startswith("queue"):
+        listener.handlers = (file_handler(directory, f"{setup}.log", slow, JsonFormatter()),)
+
+    def restore():
+        flush_logs(timeout=60)
+        for handler in list(logger.handlers):
+            if handler is not queue_handler:
+                logger.removeHandler(handler)
+                handler.close()
+        if queue_handler not in logger.handlers:
+            logger.addHandler(queue_handler)
+        listener.handlers = original
+        logger.disabled = False
+
+    return restore
+
+
+def run_round(tag: str) -> float:
+    graph = agent.compile_graph()
+    start = time.perf_counter()
+    for i in range(THREADS):
+        run_thread(graph, f"{tag}-{i}", "async")
+    return time.perf_counter() - start
+
+
+def nodes_per_run() -> float:
+    before = sum(metrics.NODE_DURATION.count(*labels) for labels in list(metrics.NODE_DURATION._values))
+    run_round("count")
+    after = sum(metrics.NODE_DURATION.count(*labels) for labels in list(metrics.NODE_DURATION._values))
+    return (after - before) / THREADS
+
+
+def call_cost(directory: Path):
+    """
+    Microseconds per log call, eager f-string vs lazy arguments: for the old handler
+    (caller does everything), the queued pipeline's caller side alone (listener not
+    writing), and the queued pipeline until every record is written.
+    """
+    payload = "x" * 20_000
+    name, confidence = "Troubleshooting", 0.8123
+    calls = (
+        ("f-string", lambda: logger.info(f"[AGENT] Section '{name}' needs review (confidence: {confidence:.2f})")),
+        ("lazy", lambda: logger.info("[AGENT] Section '%s' needs review (confidence: %.2f)", name, confidence)),
+        ("20 KB payload", lambda: logger.error("[ERROR] Response was: %s", payload)),
+    )
+    results = {}
+    for setup in ("sync file", "queue, caller only", "queue, until written"):
+        restore = configure("sync file" if setup == "sync file" else "queue", directory)
+        if setup == "queue, caller only":
+            logger._listener.handlers = ()
+        for style, call in calls:
+            start = time.perf_counter()
+            for _ in range(CALLS):
+                call()
+            flush_logs(timeout=60)
+            results[(setup, style)] = (time.perf_counter() - start) / CALLS * 1e6
+        restore()
+    return results
+
+
+def main():
+    start_logging()
+    model = StubChatModel(responder=respond, call_latency=0.0, output_token_latency=0.0)
+    set_model_provider(lambda **kw: model)
+    agent.write_sections_to_doc = SimpleNamespace(invoke=lambda args: "skipped")
+    agent.get_run_history = lambda: SimpleNamespace(record_run=lambda *a, **kw: None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        nodes = nodes_per_run()
+        setups = ("off", "sync file", "queue", "sync file, slow disk", "queue, slow disk")
+        best = {}
+        for r in range(ROUNDS):
+            for setup in setups:
+                restore = configure(setup, directory)
+                try:
+                    elapsed = run_round(f"{r}-{setup}")
+                finally:
+                    restore()
+                best[setup] = min(best.get(setup, float("inf")), elapsed)
+
+        print(f"{THREADS} runs per setup, {nodes:.0f} nodes per run, best of {ROUNDS}")
+        print(f"{'setup':<22} | {'ms/run':>7} | {'overhead us/node':>16}")
+        for setup in setups:
+            per_node = (best[setup] - best["off"]) / THREADS / nodes * 1e6
+            print(f"{setup:<22} | {best[setup] / THREADS * 1000:>7.2f} | {per_node:>16.1f}")
+
+        print(f"\ncaller cost per log call ({CALLS} calls)")
+        for (setup, style), us in call_cost(directory).items():
+            print(f"{setup:<20} | {style:<13} | {us:>6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
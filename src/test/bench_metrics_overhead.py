@@ -0,0 +1,87 @@
+"""
+Overhead of metrics recording on agent runs.
+
+Runs the full refinement loop (review, reflection, regeneration, finalize) against
+the stub model and reports the cost of recording: metric updates per run times the
+cost of one update, relative to the run time. The stub model answers instantly, so
+this is measured against graph execution alone; with a real model it is smaller
+still. Rounds with METRICS_ENABLED off and on are also timed (alternating order, a
+fresh checkpointer per round) as a wall-clock cross-check, which on a shared
+machine is dominated by noise.
+
+Run from the repository root:
+    python -m src.test.bench_metrics_overhead
+"""
+import time
+from types import SimpleNamespace
+
+from src.test.bench_durability import respond, run_thread
+import src.graph_agent_complex as agent
+from src.test.stub_model import StubChatModel
+from src.utils import metrics
+from src.utils.llm import set_model_provider
+
+THREADS = 30
+ROUNDS = 8
+OBSERVATIONS = 200_000
+
+
+def run_round(tag: str) -> float:
+    graph = agent.compile_graph()  # fresh checkpointer, so rounds do not slow down as threads accumulate
+    start = time.perf_counter()
+    for i in range(THREADS):
+        run_thread(graph, f"{tag}-{i}", "async")
+    return time.perf_counter() - start
+
+
+def observation_cost() -> float:
+    histogram = metrics.Histogram("bench_seconds", "bench", ("node", "outcome"))
+    start = time.perf_counter()
+    for i in range(OBSERVATIONS):
+        histogram.observe("node", "ok", value=0.01 * (i % 100))
+    return (time.perf_counter() - start) / OBSERVATIONS
+
+
+def updates_recorded() -> float:
+    """Metric updates made so far: node and model call observations, call outcomes and token counts."""
+    histograms = (metrics.NODE_DURATION, metrics.LLM_CALL_DURATION)
+    observations = sum(h.count(*labels) for h in histograms for labels in list(h._values))
+    outcomes = sum(metrics.LLM_CALLS._values.values())
+    tokens = 2 * sum(v for (_, outcome), v in metrics.LLM_CALLS._values.items() if outcome == "ok")
+    return observations + outcomes + tokens
+
+
+def main():
+    model = StubChatModel(responder=respond, call_latency=0.0, output_token_latency=0.0)
+    set_model_provider(lambda **kw: model)
+    agent.write_sections_to_doc = SimpleNamespace(invoke=lambda args: "skipped")
+    agent.get_run_history = lambda: SimpleNamespace(record_run=lambda *a, **kw: None)
+
+    run_round("warmup")
+    before = updates_recorded()
+    run_round("count")
+    per_run = (updates_recorded() - before) / THREADS
+
+    times = {False: [], True: []}
+    for r in range(ROUNDS):
+        for enabled in ((False, True) if r % 2 else (True, False)):
+            metrics.set_metrics_enabled(enabled)
+            times[enabled].append(run_round(f"{r}-{enabled}") / THREADS)
+    metrics.set_metrics_enabled(None)
+
+    off = min(times[False])
+    paired = sorted((on - off_) / off_ for on, off_ in zip(times[True], times[False]))
+    cost = observation_cost()
+    print(f"{THREADS} runs per round, {ROUNDS} rounds per setting")
+    print(f"{'metrics':<8} | {'best ms/run':>11} | {'median ms/run':>13}")
+    for enabled in (False, True):
+        print(f"{'on' if enabled else 'off':<8} | {min(times[enabled]) * 1000:>11.2f} | "
+              f"{sorted(times[enabled])[ROUNDS // 2] * 1000:>13.2f}")
+    print(f"wall-clock difference, median of paired rounds: {paired[ROUNDS // 2]:+.2%} "
+          f"(spread {paired[0]:+.1%} .. {paired[-1]:+.1%}, machine noise)")
+    print(f"recording: {per_run:.0f} metric updates per run x {cost * 1e6:.2f} us = {per_run * cost * 1000:.3f} ms/run "
+          f"= {per_run * cost / off:.2%} of a run (target < 1%)")
+
+
+if __name__ == "__main__":
+    main()
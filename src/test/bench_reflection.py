@@ -0,0 +1,73 @@
+"""
+Latency / token comparison of the reflect_and_learn modes against a stub model.
+
+Run from the repository root:
+    python -m src.test.bench_reflection
+"""
+import json
+import re
+import time
+
+import src.graph_agent_complex as agent
+from src.test.stub_model import StubChatModel
+from src.utils.llm import set_model_provider
+
+SECTION_COUNTS = [1, 3, 6, 10]
+
+
+def respond(prompt: str) -> str:
+    names = re.findall(r"### Section: (.+)", prompt)
+    if names:
+        return json.dumps({
+            "global_rules": ["Use simpler language"],
+            "section_rules": [{"section": name, "rules": [f"Include a worked example in {name}"]} for name in names],
+        })
+    name = re.search(r"Section: (.+)", prompt).group(1)
+    return f"GLOBAL: Use simpler language\nSPECIFIC: Include a worked example in {name}"
+
+
+def make_state(n_sections: int, mode: str) -> dict:
+    sections = [{
+        "name": f"Section {i}",
+        "content": "Docker containers package an application with its dependencies. " * 20,
+        "confidence": 0.6,
+        "status": "pending_review",
+    } for i in range(n_sections)]
+    return {
+        "sections": sections,
+        "rejected_sections": [s["name"] for s in sections],
+        "section_feedback": {s["name"]: "Too abstract, add a concrete example" for s in sections},
+        "section_rules": {},
+        "mistakes": [],
+        "revision_count": 0,
+        "reflection_mode": mode,
+        "reflection_token_budget": 12000,
+    }
+
+
+def run(model: StubChatModel, n_sections: int, mode: str, concurrency: int) -> dict:
+    agent.REFLECTION_MAX_CONCURRENCY = concurrency
+    model.reset()
+    start = time.perf_counter()
+    agent.reflect_and_learn(make_state(n_sections, mode))
+    elapsed = time.perf_counter() - start
+    return {"latency_s": round(elapsed, 3), **model.stats()}
+
+
+def main():
+    model = StubChatModel(responder=respond)
+    set_model_provider(lambda **kwargs: model)
+
+    print(f"{'sections':>8} | {'mode':<22} | {'latency_s':>9} | {'calls':>5} | {'in_tok':>6} | {'out_tok':>7}")
+    for n in SECTION_COUNTS:
+        for label, mode, concurrency in [
+            ("per_section (serial)", "per_section", 1),
+            ("per_section (4 conc.)", "per_section", 4),
+            ("batched", "batched", 4),
+        ]:
+            r = run(model, n, mode, concurrency)
+            print(f"{n:>8} | {label:<22} | {r['latency_s']:>9} | {r['calls']:>5} | {r['input_tokens']:>6} | {r['output_tokens']:>7}")
+
+
+if __name__ == "__main__":
+    main()
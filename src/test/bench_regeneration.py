@@ -0,0 +1,81 @@
+"""
+Output-token / latency comparison of regenerate_sections in "patch" vs "full" mode
+on a fixture corpus of long sections where the feedback targets a single paragraph.
+
+Run from the repository root:
+    python -m src.test.bench_regeneration
+"""
+import json
+import re
+import time
+
+import src.graph_agent_complex as agent
+from src.test.stub_model import StubChatModel
+from src.utils.llm import set_model_provider
+
+PARAGRAPH_COUNTS = [3, 6, 12, 24]
+SECTIONS_PER_RUN = 4
+
+PARAGRAPH = ("Containers share the host kernel while isolating processes, filesystems and networking. "
+             "This makes them much lighter than virtual machines and quick to start. ") * 3
+REVISED = "Revised paragraph with a concrete `docker run -p 8080:80 nginx` example and its expected output."
+
+
+def respond(prompt: str) -> str:
+    if "Available edit operations" in prompt:
+        return json.dumps({
+            "edits": [{"op": "replace", "index": 1, "text": REVISED}],
+            "confidence": 0.9,
+            "reasoning": "Feedback addressed",
+        })
+
+    content = re.search(r"Original content:\n(.*?)\n\nHuman feedback:", prompt, re.S).group(1)
+    paragraphs = content.split("\n\n")
+    paragraphs[1] = REVISED
+    return json.dumps({"content": "\n\n".join(paragraphs), "confidence": 0.9, "reasoning": "Feedback addressed"})
+
+
+def make_state(n_paragraphs: int, mode: str) -> dict:
+    sections = [{
+        "name": f"Section {i}",
+        "content": "\n\n".join(f"{j}. {PARAGRAPH}" for j in range(n_paragraphs)),
+        "confidence": 0.6,
+        "status": "pending_review",
+    } for i in range(SECTIONS_PER_RUN)]
+    return {
+        "sections": sections,
+        "rejected_sections": [s["name"] for s in sections],
+        "section_feedback": {s["name"]: "The second paragraph needs a concrete example" for s in sections},
+        "section_rules": {},
+        "mistakes": [],
+        "revision_count": 1,
+        "max_regen_attempts": 3,
+        "confidence_threshold": 0.8,
+        "regeneration_mode": mode,
+    }
+
+
+def run(model: StubChatModel, n_paragraphs: int, mode: str) -> dict:
+    model.reset()
+    start = time.perf_counter()
+    agent.regenerate_sections(make_state(n_paragraphs, mode))
+    elapsed = time.perf_counter() - start
+    return {"latency_s": round(elapsed, 3), **model.stats()}
+
+
+def main():
+    model = StubChatModel(responder=respond, output_token_latency=0.001)
+    set_model_provider(lambda **kwargs: model)
+
+    print(f"{'paragraphs':>10} | {'mode':<5} | {'latency_s':>9} | {'in_tok':>6} | {'out_tok':>7} | {'out_tok saved':>13}")
+    for n in PARAGRAPH_COUNTS:
+        full = run(model, n, "full")
+        patch = run(model, n, "patch")
+        saved = 1 - patch["output_tokens"] / full["output_tokens"]
+        for label, r in [("full", full), ("patch", patch)]:
+            saved_text = f"{saved:.0%}" if label == "patch" else "-"
+            print(f"{n:>10} | {label:<5} | {r['latency_s']:>9} | {r['input_tokens']:>6} | {r['output_tokens']:>7} | {saved_text:>13}")
+
+
+if __name__ == "__main__":
+    main()
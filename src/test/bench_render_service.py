@@ -0,0 +1,93 @@
+"""
+Latency seen by other threads while large documents are rendered,
+inline (executor thread, like a graph node) vs. on the render service worker pool.
+
+"Other threads" are simulated by an asyncio stream loop that emits an event every 10 ms;
+the benchmark reports how late those events are (p50 / p99).
+
+Run from the repository root:
+    python -m src.test.bench_render_service
+"""
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.render_service import RenderService
+from src.utils.write_to_doc import render_sections
+
+DOCUMENTS = 4
+SECTIONS = 150
+PARAGRAPHS = 20
+TICK_S = 0.01
+
+
+def large_document():
+    return [{
+        "name": f"Section {i}",
+        "content": "\n".join(f"Paragraph {j} of section {i}, describing container images and layers." for j in range(PARAGRAPHS)),
+        "confidence": 0.9,
+        "status": "auto_approved",
+    } for i in range(SECTIONS)]
+
+
+async def stream_ticks(done: asyncio.Event, lateness: list):
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_S)
+        lateness.append(time.perf_counter() - start - TICK_S)
+
+
+async def run_inline(directory: Path, sections):
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[
+        loop.run_in_executor(None, render_sections, "Bench", sections, directory / f"inline_{i}.docx")
+        for i in range(DOCUMENTS)
+    ])
+
+
+async def run_pooled(service: RenderService, directory: Path, sections):
+    jobs = [service.submit("Bench", sections, directory / f"pooled_{i}.docx") for i in range(DOCUMENTS)]
+    while any(service.status(job)["status"] in ("queued", "rendering") for job in jobs):
+        await asyncio.sleep(0.05)
+
+
+async def measure(render):
+    done = asyncio.Event()
+    lateness = []
+    ticker = asyncio.create_task(stream_ticks(done, lateness))
+    start = time.perf_counter()
+    await render()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker
+    ms = np.array(lateness) * 1000
+    return elapsed, np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main():
+    sections = large_document()
+    service = RenderService()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        # Warm up worker processes (python-docx import)
+        service.wait(service.submit("warmup", sections[:1], directory / "warmup.docx"))
+
+        print(f"{DOCUMENTS} documents x {SECTIONS} sections x {PARAGRAPHS} paragraphs")
+        print(f"{'mode':<8} | {'wall_s':>6} | {'tick p50 ms':>11} | {'tick p99 ms':>11}")
+        for label, render in [
+            ("idle", lambda: asyncio.sleep(2)),
+            ("inline", lambda: run_inline(directory, sections)),
+            ("pooled", lambda: run_pooled(service, directory, sections)),
+        ]:
+            elapsed, p50, p99 = asyncio.run(measure(render))
+            print(f"{label:<8} | {elapsed:>6.2f} | {p50:>11.2f} | {p99:>11.2f}")
+
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Analytics / what-if timings of the columnar run-history store on a synthetic history.
+
+Run from the repository root:
+    python -m src.test.bench_run_history [n_runs]
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.utils.run_history import RunHistory
+
+SECTIONS_PER_RUN = 8
+
+
+def populate(history: RunHistory, n_runs: int):
+    rng = np.random.default_rng(0)
+    n = n_runs * SECTIONS_PER_RUN
+
+    run_ids = np.repeat(np.arange(n_runs), SECTIONS_PER_RUN)
+    confidence = rng.beta(6, 2, n).astype(np.float32)
+    auto = confidence >= 0.8
+    rejections = np.where(auto, 0, rng.poisson(0.6, n)).astype(np.int16)
+
+    history.sections.append({
+        "run_id": run_ids,
+        "section_type": rng.integers(0, 12, n),
+        "initial_confidence": confidence,
+        "final_confidence": np.maximum(confidence, 0.8),
+        "status": np.where(auto, 0, 1),
+        "reviewed": ~auto,
+        "rejections": rejections,
+    })
+    run_cycles = np.zeros(n_runs, dtype=np.int16)
+    np.maximum.at(run_cycles, run_ids, rejections)
+    history.runs.append({
+        "run_id": np.arange(n_runs),
+        "finished_at": np.full(n_runs, time.time()),
+        "latency_s": rng.lognormal(4, 1, n_runs),
+        "sections": np.full(n_runs, SECTIONS_PER_RUN),
+        "auto_approved": np.bincount(run_ids, weights=auto),
+        "human_reviewed": np.bincount(run_ids, weights=~auto),
+        "revisions": run_cycles,
+        "confidence_threshold": np.full(n_runs, 0.8),
+        "max_regen_attempts": np.full(n_runs, 3),
+    })
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    fn()
+    print(f"{label:<34} {(time.perf_counter() - start) * 1000:>8.1f} ms")
+
+
+def main():
+    n_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 250_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        history = RunHistory(directory)
+        timed(f"append {n_runs * SECTIONS_PER_RUN:,} sections", lambda: populate(history, n_runs))
+        timed("summary", history.summary)
+        timed("by_section_type", history.by_section_type)
+        for threshold in (0.7, 0.8, 0.9):
+            timed(f"simulate(threshold={threshold}, max_regen=2)", lambda: history.simulate(threshold, 2))
+        print(history.simulate(0.7, 2))
+
+
+if __name__ == "__main__":
+    main()
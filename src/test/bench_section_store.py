@@ -0,0 +1,124 @@
+"""
+Checkpoint bytes stored per thread across 5 revision cycles: the default checkpoint
+serializer vs. InterningSerializer (section content stored once in the section store).
+
+The graph runs against the stub model; every cycle the reviewer rejects the same
+3 of 12 sections and the patch touches one paragraph of each.
+
+Run from the repository root:
+    python -m src.test.bench_section_store
+"""
+import json
+import re
+from types import SimpleNamespace
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.types import Command
+
+import src.graph_agent_complex as agent
+from src.test.stub_model import StubChatModel
+from src.utils.llm import set_model_provider
+from src.utils.section_store import InterningSerializer, SectionStore
+import src.utils.section_store as store_module
+
+SECTIONS = 12
+PARAGRAPHS = 8
+REJECTED = 3
+CYCLES = 5
+
+
+def paragraph(section: int, index: int) -> str:
+    return (f"Paragraph {index} of section {section}: container images are built from layered, "
+            "content-addressed filesystem diffs that are cached and shared between images. ") * 3
+
+
+def respond(prompt: str) -> str:
+    if "User request:" in prompt:
+        return json.dumps({"sections": [{
+            "name": f"Section {i}",
+            "content": "\n\n".join(paragraph(i, j) for j in range(PARAGRAPHS)),
+            "confidence": 0.5 if i < REJECTED else 0.95,
+            "reasoning": "draft",
+        } for i in range(SECTIONS)]})
+    if "### Section:" in prompt:
+        names = re.findall(r"### Section: (.+)", prompt)
+        return json.dumps({"global_rules": ["Be concrete"],
+                           "section_rules": [{"section": n, "rules": ["Add an example"]} for n in names]})
+    if "Available edit operations" in prompt:
+        cycle = respond.patches // REJECTED
+        respond.patches += 1
+        return json.dumps({"edits": [{"op": "replace", "index": cycle % PARAGRAPHS, "text": f"Revised in cycle {cycle}."}],
+                           "confidence": 0.5})
+    return json.dumps({"content": "regenerated", "confidence": 0.5, "reasoning": "x"})
+
+
+def answer(question: str, cycle: int) -> str:
+    if question.startswith("Review complete"):
+        return "y" if cycle > CYCLES else "n"
+    if question.startswith("Enter section"):
+        return "all"
+    return "Needs a concrete example."
+
+
+def saver_bytes(saver: InMemorySaver) -> int:
+    total = sum(len(data) for _, data in saver.blobs.values())
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    for writes in saver.writes.values():
+        total += sum(len(w[2][1]) for w in writes.values())
+    return total
+
+
+def run(saver: InMemorySaver) -> int:
+    respond.patches = 0
+    graph = agent.compile_graph(checkpointer=saver)
+    config = {"configurable": {"thread_id": "bench"}}
+    state = {
+        "prompt": "Write a guide about Docker", "confidence_threshold": 0.8, "max_regen_attempts": CYCLES + 1,
+        "revision_count": 0, "mistakes": [], "section_rules": {}, "messages": [],
+    }
+
+    cycle, value = 0, state
+    while True:
+        question = None
+        for event in graph.stream(value, config, stream_mode="updates"):
+            if "__interrupt__" in event:
+                question = event["__interrupt__"][0].value["question"]
+                break
+        if question is None:
+            return graph.get_state(config).values["revision_count"]
+        if question.startswith("Review complete"):
+            cycle += 1
+        value = Command(resume=answer(question, cycle))
+
+
+def main():
+    model = StubChatModel(responder=respond, call_latency=0.0, output_token_latency=0.0)
+    set_model_provider(lambda **kw: model)
+    # Documents are not needed for the measurement
+    agent.write_sections_to_doc = SimpleNamespace(invoke=lambda args: "skipped")
+
+    default = InMemorySaver()
+    revisions = run(default)
+    default_bytes = saver_bytes(default)
+
+    store_module.section_store = SectionStore(directory=None)
+    interned = InMemorySaver(serde=InterningSerializer())
+    run(interned)
+    store = store_module.section_store.stats()
+    interned_bytes = saver_bytes(interned) + store["stored_bytes"]
+
+    print(f"{SECTIONS} sections x {PARAGRAPHS} paragraphs, {REJECTED} rejected per cycle, {revisions} revisions")
+    print(f"{'serializer':<22} | {'checkpoint KiB':>14} | {'blob KiB':>8} | {'total KiB':>9}")
+    print(f"{'default':<22} | {default_bytes / 1024:>14.1f} | {0:>8.1f} | {default_bytes / 1024:>9.1f}")
+    print(f"{'InterningSerializer':<22} | {(interned_bytes - store['stored_bytes']) / 1024:>14.1f} | "
+          f"{store['stored_bytes'] / 1024:>8.1f} | {interned_bytes / 1024:>9.1f}")
+    print(f"section store: {store['blobs']} blobs, {store['raw_bytes'] / 1024:.1f} KiB raw, "
+          f"{store['compression']} compressed to {store['stored_bytes'] / 1024:.1f} KiB")
+    print(f"reduction: {default_bytes / interned_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
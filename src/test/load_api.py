@@ -0,0 +1,306 @@
+"""
+Load test of the HTTP API the way clients use it.
+
+Starts the mock OpenAI-compatible server (src/test/mock_openai_server.py) and the
+API server (pointed at the mock through OPENAI_BASE_URL), then runs CLIENTS
+simulated clients concurrently. Each client runs full threads:
+
+    POST /agent/start -> GET /agent/stream -> (think) POST /agent/respond -> GET /agent/stream ...
+
+answering every review question with a scripted reviewer after an exponentially
+distributed think time. Clients start evenly over --ramp seconds.
+
+The JSON report (--report) has the throughput, latency percentiles and error rate
+per endpoint (the stream endpoint: until its first line and until the segment
+ends) and the API server's RSS over time. --api-url tests an already running
+server instead (no RSS then, unless --api-pid is given).
+
+Run from the repository root:
+    python -m src.test.load_api --clients 1000 --ramp 60 --think 2.0 --report load_report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from src.utils.reviewer import ScriptedReviewer
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+PROMPT = "Write a comprehensive technical guide about Docker containerization for beginners"
+ENDPOINTS = ("start", "stream_first_line", "stream", "respond")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size from /proc (Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+        self.error_samples: List[str] = []
+        self.threads_completed = 0
+        self.threads_failed = 0
+
+    def ok(self, endpoint: str, seconds: float):
+        self.latencies[endpoint].append(seconds)
+
+    def error(self, endpoint: str, message: str):
+        self.errors[endpoint] += 1
+        if len(self.error_samples) < 20:
+            self.error_samples.append(f"{endpoint}: {message}"[:300])
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name in ENDPOINTS:
+            values = self.latencies[name]
+            total = len(values) + self.errors[name]
+            endpoints[name] = {
+                "requests": total,
+                "errors": self.errors[name],
+                "error_rate": round(self.errors[name] / total, 4) if total else 0.0,
+                "throughput_rps": round(total / elapsed, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                "max_ms": round(max(values, default=0.0) * 1000, 1),
+            }
+        return endpoints
+
+
+class StreamError(Exception):
+    pass
+
+
+async def read_stream(client: httpx.AsyncClient, thread_id: str, recorder: Recorder) -> dict:
+    """One stream segment; returns its last event (interrupt, done)."""
+    start = time.perf_counter()
+    last = None
+    try:
+        async with client.stream("GET", f"/agent/stream/{thread_id}") as response:
+            if response.status_code >= 400:
+                raise StreamError(f"HTTP {response.status_code}")
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                if last is None:
+                    recorder.ok("stream_first_line", time.perf_counter() - start)
+                last = json.loads(line)
+                if last.get("type") == "error":
+                    raise StreamError(last.get("message", "error event"))
+    except (httpx.HTTPError, StreamError, json.JSONDecodeError) as e:
+        if last is None:
+            recorder.error("stream_first_line", repr(e))
+        recorder.error("stream", repr(e))
+        raise StreamError(repr(e)) from e
+    if last is None:
+        recorder.error("stream_first_line", "empty stream")
+        recorder.error("stream", "empty stream")
+        raise StreamError("empty stream")
+    recorder.ok("stream", time.perf_counter() - start)
+    return last
+
+
+async def timed_post(client: httpx.AsyncClient, endpoint: str, url: str, body: dict, recorder: Recorder) -> dict:
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, json=body)
+    except httpx.HTTPError as e:
+        recorder.error(endpoint, repr(e))
+        raise StreamError(repr(e)) from e
+    if response.status_code >= 400:
+        recorder.error(endpoint, f"HTTP {response.status_code}: {response.text[:200]}")
+        raise StreamError(f"HTTP {response.status_code}")
+    recorder.ok(endpoint, time.perf_counter() - start)
+    return response.json()
+
+
+async def run_client(index: int, client: httpx.AsyncClient, args, recorder: Recorder):
+    rng = random.Random(f"{args.seed}|{index}")
+    await asyncio.sleep(args.ramp * index / max(1, args.clients))
+
+    for n in range(args.threads_per_client):
+        # Identical prompts would be coalesced into one model call (see src/utils/llm.py)
+        variant = rng.randrange(args.distinct_prompts) if args.distinct_prompts else f"{index}-{n}"
+        reviewer = ScriptedReviewer(reject_rate=args.reject_rate, max_rounds=args.max_rounds,
+                                    seed=rng.randrange(1 << 30))
+        try:
+            body = {"prompt": f"{PROMPT} (variant {variant})", "max_regen_attempts": args.max_rounds + 1}
+            started = await timed_post(client, "start", "/agent/start", body, recorder)
+            thread_id = started["thread_id"]
+            while True:
+                event = await read_stream(client, thread_id, recorder)
+                if event.get("type") != "interrupt":
+                    break
+                await asyncio.sleep(rng.expovariate(1 / args.think) if args.think > 0 else 0)
+                answer = reviewer.answer(event["data"][0])
+                await timed_post(client, "respond", f"/agent/respond/{thread_id}", {"response": answer}, recorder)
+            recorder.threads_completed += 1
+        except StreamError:
+            recorder.threads_failed += 1
+
+
+async def sample_rss(pid: Optional[int], interval: float, start: float, samples: List[list], stop: asyncio.Event):
+    while pid is not None and not stop.is_set():
+        rss = rss_bytes(pid)
+        if rss is not None:
+            samples.append([round(time.perf_counter() - start, 2), rss])
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def wait_ready(url: str, path: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(path)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url}{path} did not become ready")
+
+
+def start_servers(args, workdir: Path):
+    """Starts the mock model server and the API server; returns (processes, api_url, api_pid, mock_url)."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(REPO_ROOT), str(REPO_ROOT / "src")])}
+    mock_port, api_port = free_port(), free_port()
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "src.test.mock_openai_server", "--port", str(mock_port), "--ttft", str(args.ttft),
+         "--token-latency", str(args.token_latency), "--malformed-rate", str(args.malformed_rate)],
+        cwd=REPO_ROOT, env=env)
+    api_env = {
+        **env,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{mock_port}/v1",
+        "OPENAI_API_KEY": "load-test",
+        "MODEL_PROVIDER": "openai",
+        "OUTPUT_ROOT": str(workdir / "outputs"),
+        "RUN_HISTORY_DIR": str(workdir / "run_history"),
+        "TRACE_FILE": str(workdir / "spans.jsonl"),
+    }
+    # The API server runs from a scratch directory: its logs go to <workdir>/logs
+    (workdir / "run").mkdir(parents=True, exist_ok=True)
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main_api_server:app", "--port", str(api_port), "--log-level", "warning"],
+        cwd=workdir / "run", env=api_env)
+    return [mock, api], f"http://127.0.0.1:{api_port}", api.pid, f"http://127.0.0.1:{mock_port}"
+
+
+async def run(args) -> dict:
+    processes = []
+    mock_url = None
+    with tempfile.TemporaryDirectory(prefix="agent-load-") as tmp:
+        try:
+            if args.api_url:
+                api_url, api_pid = args.api_url, args.api_pid
+            else:
+                processes, api_url, api_pid, mock_url = start_servers(args, Path(tmp))
+                await wait_ready(mock_url, "/stats")
+            await wait_ready(api_url, "/")
+
+            recorder = Recorder()
+            rss_samples: List[list] = []
+            stop = asyncio.Event()
+            limits = httpx.Limits(max_connections=args.clients * 2, max_keepalive_connections=args.clients)
+            timeout = httpx.Timeout(args.timeout)
+            start = time.perf_counter()
+            sampler = asyncio.create_task(sample_rss(api_pid, args.sample_interval, start, rss_samples, stop))
+            async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=timeout) as client:
+                await asyncio.gather(*(run_client(i, client, args, recorder) for i in range(args.clients)))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await sampler
+
+            mock_stats = None
+            if mock_url:
+                async with httpx.AsyncClient(base_url=mock_url) as client:
+                    mock_stats = (await client.get("/stats")).json()
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=30)
+
+    threads = recorder.threads_completed + recorder.threads_failed
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "report"},
+        "elapsed_s": round(elapsed, 2),
+        "threads": {"completed": recorder.threads_completed, "failed": recorder.threads_failed,
+                    "error_rate": round(recorder.threads_failed / threads, 4) if threads else 0.0,
+                    "throughput_per_s": round(recorder.threads_completed / elapsed, 3)},
+        "endpoints": recorder.summary(elapsed),
+        "server_rss_bytes": {"peak": max((rss for _, rss in rss_samples), default=None), "samples": rss_samples},
+        "model_server": mock_stats,
+        "error_samples": recorder.error_samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the agent HTTP API")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent simulated clients")
+    parser.add_argument("--threads-per-client", type=int, default=1)
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which clients start")
+    parser.add_argument("--think", type=float, default=1.0, help="mean reviewer think time in seconds")
+    parser.add_argument("--distinct-prompts", type=int, default=0,
+                        help="number of different prompts to draw from (0: every thread has its own)")
+    parser.add_argument("--reject-rate", type=float, default=0.5)
+    parser.add_argument("--max-rounds", type=int, default=1, help="review rounds with rejections per thread")
+    parser.add_argument("--ttft", type=float, default=0.4, help="mock model median time to first token")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="mock model seconds per output token")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="HTTP timeout per request")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="seconds between RSS samples")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--api-url", help="test a running API server instead of starting one")
+    parser.add_argument("--api-pid", type=int, help="PID of the running API server, for RSS samples")
+    parser.add_argument("--report", default="load_report.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    Path(args.report).write_text(json.dumps(report, indent=2))
+
+    print(f"{report['threads']['completed']} threads completed, {report['threads']['failed']} failed "
+          f"in {report['elapsed_s']} s ({report['threads']['throughput_per_s']} threads/s)")
+    print(f"{'endpoint':<18} | {'requests':>8} | {'errors':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    for name, row in report["endpoints"].items():
+        print(f"{name:<18} | {row['requests']:>8} | {row['errors']:>6} | {row['p50_ms']:>8} | "
+              f"{row['p95_ms']:>8} | {row['p99_ms']:>8}")
+    if report["server_rss_bytes"]["peak"]:
+        print(f"server RSS peak: {report['server_rss_bytes']['peak'] / 2 ** 20:.0f} MB")
+    print(f"report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
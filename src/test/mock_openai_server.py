@@ -0,0 +1,120 @@
+"""
+Local OpenAI-compatible chat completions server for load tests.
+
+POST /v1/chat/completions answers with the scripted responses of the fake model
+(src/utils/fake_model.py), so the agent runs its normal paths, including
+"stream": true (server-sent events, with usage when stream_options.include_usage).
+Latency is realistic rather than fixed: a log-normally distributed time to first
+token around TTFT_S, then TOKEN_LATENCY_S per output token, streamed in chunks.
+GET /stats returns the calls served.
+
+Run from the repository root:
+    python -m src.test.mock_openai_server --port 8100 --ttft 0.4 --token-latency 0.01
+and point the agent at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1 and any OPENAI_API_KEY.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from src.utils.fake_model import FakeChatModel
+from src.utils.text import estimate_tokens
+
+TTFT_S = 0.4
+TTFT_SIGMA = 0.35  # spread of the log-normal time to first token
+TOKEN_LATENCY_S = 0.01
+TOKENS_PER_CHUNK = 8
+
+
+def create_app(ttft: float = TTFT_S, token_latency: float = TOKEN_LATENCY_S, malformed_rate: float = 0.0,
+               seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI API")
+    stats = {"calls": 0, "streamed": 0, "in_flight": 0, "output_tokens": 0}
+    rng = random.Random(seed)
+
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason=None, usage=None) -> str:
+        body = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        if usage:
+            body["usage"] = usage
+        return f"data: {json.dumps(body)}\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model_name = body.get("model", "gpt-4o-mini")
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        fake = FakeChatModel(model=model_name, temperature=body.get("temperature") or 0.0, seed=seed,
+                             malformed_rate=malformed_rate)
+        text, _ = fake.respond(prompt)
+        usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        first_token = rng.lognormvariate(0.0, TTFT_SIGMA) * ttft
+
+        stats["calls"] += 1
+        stats["output_tokens"] += usage["completion_tokens"]
+
+        if not body.get("stream"):
+            stats["in_flight"] += 1
+            try:
+                await asyncio.sleep(first_token + usage["completion_tokens"] * token_latency)
+            finally:
+                stats["in_flight"] -= 1
+            return {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model_name,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        stats["streamed"] += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        chars_per_chunk = TOKENS_PER_CHUNK * 4  # estimate_tokens counts ~4 characters per token
+
+        async def events():
+            stats["in_flight"] += 1
+            try:
+                await asyncio.sleep(first_token)
+                yield chunk(completion_id, model_name, {"role": "assistant", "content": ""})
+                for at in range(0, len(text), chars_per_chunk):
+                    yield chunk(completion_id, model_name, {"content": text[at:at + chars_per_chunk]})
+                    await asyncio.sleep(TOKENS_PER_CHUNK * token_latency)
+                yield chunk(completion_id, model_name, {}, finish_reason="stop")
+                if include_usage:
+                    yield chunk(completion_id, model_name, {}, usage=usage)
+                yield "data: [DONE]\n\n"
+            finally:
+                stats["in_flight"] -= 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft", type=float, default=TTFT_S, help="median seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=TOKEN_LATENCY_S, help="seconds per output token")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(create_app(args.ttft, args.token_latency, args.malformed_rate, args.seed),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
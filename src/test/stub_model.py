@@ -0,0 +1,65 @@
+"""
+Offline stub chat model used by the benchmark scripts in this folder.
+
+Latency is simulated as a fixed per-call overhead plus a per-output-token cost,
+which roughly matches how hosted chat models behave.
+"""
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from src.utils.text import estimate_tokens
+
+
+class StubChatModel(BaseChatModel):
+    responder: Callable[[str], str]
+    call_latency: float = 0.05
+    output_token_latency: float = 0.0005
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    _input_tokens: int = PrivateAttr(default=0)
+    _output_tokens: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat-model"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        text = self.responder(prompt)
+
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        with self._lock:
+            self._calls += 1
+            self._input_tokens += input_tokens
+            self._output_tokens += output_tokens
+
+        time.sleep(self.call_latency + output_tokens * self.output_token_latency)
+
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def stats(self) -> dict:
+        return {
+            "calls": self._calls,
+            "input_tokens": self._input_tokens,
+            "output_tokens": self._output_tokens,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._calls = 0
+            self._input_tokens = 0
+            self._output_tokens = 0
@@ -0,0 +1,111 @@
+"""
+Output locations and the index of produced documents.
+
+Documents are written under OUTPUT_ROOT/<thread>/ with one file per revision,
+so concurrent threads never write to the same file. <thread> is the thread id with
+unsafe characters replaced, plus a short hash of the raw id, so distinct ids never
+share a directory. Every produced artifact is appended to OUTPUT_ROOT/artifacts.jsonl
+and can be queried per thread. OUTPUT_ROOT defaults to outputs/ under the repository;
+set_output_root() points both somewhere else for the rest of the process (e.g. a batch
+run's --out directory).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from src.utils import settings
+
+
+_output_root: Optional[Path] = None  # set by set_output_root(), overrides OUTPUT_ROOT
+
+
+def output_root() -> Path:
+    """OUTPUT_ROOT (unless set_output_root() was called), read on every call so .env and later changes apply."""
+    if _output_root is not None:
+        return _output_root
+    return settings.get_path("OUTPUT_ROOT", "outputs")
+
+
+def set_output_root(path: Optional[Path]):
+    """Writes documents and the artifact index under path from now on (None: back to OUTPUT_ROOT)."""
+    global _output_root
+    _output_root = Path(path) if path else None
+    artifact_index.reload()
+
+
+def thread_dir_name(thread_id: str) -> str:
+    """Readable directory name for a thread; the hash keeps ids like "a/b" and "a_b" (or "..") apart."""
+    digest = hashlib.blake2b(str(thread_id).encode("utf-8"), digest_size=4).hexdigest()
+    return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', str(thread_id))}-{digest}"
+
+
+def artifact_path(thread_id: str, revision: int, kind: str = "document", ext: str = "docx") -> Path:
+    """Unique output path for a thread and revision, e.g. OUTPUT_ROOT/<thread>/document_r2.docx"""
+    directory = output_root() / thread_dir_name(thread_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{kind}_r{revision}.{ext}"
+
+
+def stream_path(thread_id: str, kind: str = "document", ext: str = "md") -> Path:
+    """In-progress path of a document that is streamed section by section (renamed when finished)."""
+    directory = output_root() / thread_dir_name(thread_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{kind}.{ext}.part"
+
+
+class ArtifactIndex:
+    """Append-only JSONL index of produced artifacts (OUTPUT_ROOT/artifacts.jsonl unless a path is given)."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.fixed_path = Path(path) if path else None
+        self.path = self.fixed_path
+        self._lock = threading.Lock()
+        self._entries: Optional[List[dict]] = None
+
+    def _load(self) -> List[dict]:
+        if self._entries is None:
+            self.path = self.path or output_root() / "artifacts.jsonl"
+            self._entries = []
+            if self.path.exists():
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = [json.loads(line) for line in f if line.strip()]
+        return self._entries
+
+    def reload(self):
+        """Forgets the loaded entries; without a fixed path the index follows output_root() again."""
+        with self._lock:
+            self._entries = None
+            self.path = self.fixed_path
+
+    def record(self, thread_id: str, revision: int, path: str, fmt: str = "docx", **extra) -> dict:
+        """Adds a produced artifact to the index."""
+        entry = {
+            "thread_id": thread_id,
+            "revision": revision,
+            "format": fmt,
+            "path": str(path),
+            "size_bytes": os.path.getsize(path) if os.path.exists(path) else None,
+            "created_at": time.time(),
+            **extra,
+        }
+        with self._lock:
+            self._load().append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def query(self, thread_id: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Artifacts (newest first), optionally for a single thread."""
+        with self._lock:
+            entries = [e for e in self._load() if thread_id is None or e["thread_id"] == thread_id]
+        entries = entries[::-1]
+        return entries[:limit] if limit else entries
+
+
+artifact_index = ArtifactIndex()
@@ -0,0 +1,138 @@
+"""
+Per-section-type confidence calibration learned from human review decisions.
+
+Every decision made in human_selective_review is recorded as
+(section type, reported confidence, approved). For each section type a binned
+calibration curve is fitted with NumPy: the approval rate per confidence bin,
+smoothed towards the bin's reported confidence and made monotone with
+pool-adjacent-violators (isotonic). Types without history keep their raw confidence.
+
+Routing on the calibrated approval probability against confidence_threshold
+bounds the expected rejection rate of auto-approved sections by 1 - threshold.
+"""
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.utils import settings
+
+# Number of equal-width confidence bins in [0, 1]
+CALIBRATION_BINS = 10
+
+# Weight (in pseudo-observations) of the reported confidence prior in each bin
+PRIOR_STRENGTH = 4.0
+
+
+def section_type(section_name: str) -> str:
+    """Normalizes a section name into a section type ("2. Troubleshooting" -> "troubleshooting")."""
+    name = re.sub(r"^[\s\d.)\-:]+", "", section_name.strip().lower())
+    return re.sub(r"\s+", " ", name) or "untitled"
+
+
+def _pool_adjacent_violators(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted isotonic (non-decreasing) regression of values."""
+    blocks = []  # [value, weight, size]
+    for value, weight in zip(values, weights):
+        blocks.append([value, weight, 1])
+        while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+            v2, w2, n2 = blocks.pop()
+            v1, w1, n1 = blocks.pop()
+            w = w1 + w2
+            blocks.append([(v1 * w1 + v2 * w2) / w, w, n1 + n2])
+    return np.concatenate([np.full(n, v) for v, _, n in blocks])
+
+
+class SectionCalibrator:
+    """Binned + isotonic calibration curve for one section type."""
+
+    def __init__(self, confidences: np.ndarray, approved: np.ndarray, bins: int = CALIBRATION_BINS):
+        self.bins = bins
+        self.centers = (np.arange(bins) + 0.5) / bins
+
+        bin_idx = self._bin(confidences)
+        counts = np.bincount(bin_idx, minlength=bins).astype(float)
+        approvals = np.bincount(bin_idx, weights=approved.astype(float), minlength=bins)
+
+        smoothed = (approvals + PRIOR_STRENGTH * self.centers) / (counts + PRIOR_STRENGTH)
+        self.curve = _pool_adjacent_violators(smoothed, counts + PRIOR_STRENGTH)
+        self.observations = int(counts.sum())
+
+    def _bin(self, confidences: np.ndarray) -> np.ndarray:
+        return np.clip((np.asarray(confidences) * self.bins).astype(int), 0, self.bins - 1)
+
+    def probability(self, confidence: float) -> float:
+        """Calibrated approval probability for a reported confidence (interpolated between bins)."""
+        if not self.observations:
+            return float(confidence)
+        return float(np.interp(confidence, self.centers, self.curve))
+
+
+class CalibrationStore:
+    """
+    Process-wide review history with lazily fitted per-type calibrators.
+    If a path is given, observations are appended to (and loaded from) a JSONL file;
+    path_setting names a setting holding the path instead, read on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None, path_setting: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self.path_setting = path_setting
+        self._lock = threading.Lock()
+        self._types = []
+        self._confidences = []
+        self._approved = []
+        self._calibrators: Dict[str, SectionCalibrator] = {}
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path is None and self.path_setting and settings.get_str(self.path_setting):
+            self.path = Path(settings.get_str(self.path_setting))
+        if self.path and self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        self._types.append(row["type"])
+                        self._confidences.append(row["confidence"])
+                        self._approved.append(row["approved"])
+
+    def record(self, section_name: str, confidence: float, approved: bool):
+        """Records one human decision on a reviewed section."""
+        row = {"type": section_type(section_name), "confidence": float(confidence), "approved": bool(approved)}
+        with self._lock:
+            self._load()
+            self._types.append(row["type"])
+            self._confidences.append(row["confidence"])
+            self._approved.append(row["approved"])
+            self._calibrators.pop(row["type"], None)
+            if self.path:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(row) + "\n")
+
+    def calibrator(self, section_name: str) -> SectionCalibrator:
+        kind = section_type(section_name)
+        with self._lock:
+            self._load()
+            if kind not in self._calibrators:
+                types = np.array(self._types, dtype=object)
+                mask = types == kind if len(types) else np.zeros(0, dtype=bool)
+                self._calibrators[kind] = SectionCalibrator(
+                    np.array(self._confidences, dtype=float)[mask],
+                    np.array(self._approved, dtype=bool)[mask]
+                )
+            return self._calibrators[kind]
+
+    def probability(self, section_name: str, confidence: float) -> float:
+        """Calibrated approval probability for a section (the reported confidence if its type has no history)."""
+        return self.calibrator(section_name).probability(confidence)
+
+
+calibration_store = CalibrationStore(path_setting="CALIBRATION_FILE")
@@ -0,0 +1,123 @@
+"""
+Compact checkpoint serialization: msgpack, compression above a size threshold and
+versioned schema evolution for the stored state.
+
+Values are packed by the wrapped serializer (JsonPlusSerializer, which uses
+ormsgpack for states, messages and pydantic objects). Payloads of at least
+COMPRESS_MIN_BYTES are compressed with zstd when installed (zlib otherwise).
+The type tag of every payload records the codec and the schema version it was
+written with, e.g. "msgpack+zstd@2". Payloads written with an older schema
+version are upgraded on load by the registered MIGRATIONS. Untagged payloads
+from the plain serializer load as schema version 1.
+"""
+import threading
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is used instead
+    zstandard = None
+
+# Bump when a stored field of AgentState (src/utils/state.py) changes shape, and add a migration
+SCHEMA_VERSION = 2
+COMPRESS_MIN_BYTES = 4096
+
+
+# --------------------MIGRATIONS----------------------
+def map_sections(value: Any, fn: Callable[[dict], dict]) -> Any:
+    """Applies fn to every section dict inside a stored value (channel value, checkpoint or write)."""
+    if isinstance(value, dict):
+        if "name" in value and ("content" in value or "content_ref" in value):
+            return fn(value)
+        return {k: map_sections(v, fn) for k, v in value.items()}
+    if isinstance(value, list):
+        return [map_sections(v, fn) for v in value]
+    if isinstance(value, tuple):
+        return tuple(map_sections(v, fn) for v in value)
+    return value
+
+
+def _sections_v1_to_v2(value: Any) -> Any:
+    """v2 sections track the first-draft confidence and whether a human reviewed them."""
+    def upgrade(section: dict) -> dict:
+        section = dict(section)
+        section.setdefault("initial_confidence", section.get("confidence", 0.0))
+        section.setdefault("reviewed", section.get("status") == "human_reviewed")
+        return section
+    return map_sections(value, upgrade)
+
+
+# Migration from version N to N + 1
+MIGRATIONS: Dict[int, Callable[[Any], Any]] = {
+    1: _sections_v1_to_v2,
+}
+
+
+def migrate(value: Any, version: int) -> Any:
+    for v in range(version, SCHEMA_VERSION):
+        value = MIGRATIONS[v](value)
+    return value
+
+
+# --------------------SERIALIZER----------------------
+class CompactSerializer(SerializerProtocol):
+    """msgpack + optional compression + schema version tag, wrapping another serializer."""
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None, compression: str = "auto",
+                 compress_min_bytes: int = COMPRESS_MIN_BYTES):
+        self.inner = inner or JsonPlusSerializer()
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "zlib"
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        # zstd (de)compressor objects must not be shared between threads
+        self._local = threading.local()
+
+    def _zstd(self):
+        if not hasattr(self._local, "compressor"):
+            self._local.compressor = zstandard.ZstdCompressor(level=3)
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local
+
+    def _compress(self, data: bytes) -> Tuple[str, bytes]:
+        if self.compression == "none" or len(data) < self.compress_min_bytes:
+            return "raw", data
+        if self.compression == "zstd":
+            return "zstd", self._zstd().compressor.compress(data)
+        return "zlib", zlib.compress(data, 1)
+
+    def _decompress(self, codec: str, data: bytes) -> bytes:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Checkpoint was written with zstd compression, install 'zstandard' to load it")
+            return self._zstd().decompressor.decompress(data)
+        if codec == "zlib":
+            return zlib.decompress(data)
+        if codec == "raw":
+            return data
+        raise ValueError(f"Unknown checkpoint compression codec '{codec}'")
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        codec, data = self._compress(data)
+        return f"{type_}+{codec}@{SCHEMA_VERSION}", data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if "@" not in type_:
+            # Written by the plain serializer
+            return migrate(self.inner.loads_typed(data), 1)
+
+        tag = type_
+        type_, version = type_.rsplit("@", 1)
+        if "+" not in type_ or not version.isdigit():
+            raise ValueError(f"Malformed checkpoint type tag '{tag}'")
+        if int(version) > SCHEMA_VERSION:
+            raise ValueError(f"Checkpoint was written with schema version {version}, newer than {SCHEMA_VERSION}")
+        type_, codec = type_.rsplit("+", 1)
+        value = self.inner.loads_typed((type_, self._decompress(codec, payload)))
+        return migrate(value, int(version))
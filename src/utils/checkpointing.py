@@ -0,0 +1,250 @@
+"""
+Checkpoint durability per thread, write coalescing for routing-only supersteps and
+thread forking.
+
+Durability is LangGraph's per-run `durability` setting, chosen per thread:
+  - "sync":  every superstep's checkpoint is written before the next step starts
+  - "async": checkpoints are written in the background while the next step runs
+  - "exit":  only the state at an interrupt or at the end of the run is written
+
+CoalescingSaver additionally holds back checkpoints of supersteps that only
+routed (e.g. evaluate_sections sending the thread to review, or a disabled
+speculative_drafting). A held checkpoint is dropped when the next checkpoint of
+the thread supersedes it, and written when the thread is read or interrupted
+before that.
+
+The saver marks which thread it is (de)serializing for (section_owner), so the
+sections it interns are released from the section store when the thread is deleted.
+
+FileSaver is a CoalescingSaver whose checkpoints survive a restart: save() writes
+them to a file (atomically) and a new FileSaver on the same file loads them.
+
+CoalescingSaver.fork_thread starts a new thread from any checkpoint of an existing
+one without copying or regenerating anything.
+"""
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Dict, Literal, Optional, Sequence, Tuple, get_args
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.utils.section_store import section_owner, section_store
+
+Durability = Literal["sync", "async", "exit"]
+DURABILITY_MODES = get_args(Durability)
+
+
+def is_routing_only(metadata: dict, new_versions: dict) -> bool:
+    """A loop superstep that changed no state channel, only the branch:to:* routing channels."""
+    return (metadata.get("source") == "loop" and bool(new_versions)
+            and all(channel.startswith("branch:") for channel in new_versions))
+
+
+class CoalescingSaver(InMemorySaver):
+    """InMemorySaver that skips writing checkpoints of routing-only supersteps that get superseded."""
+
+    def __init__(self, *args, coalesce: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.coalesce = coalesce
+        self._held: Dict[Tuple[str, str], dict] = {}
+        self._held_lock = threading.Lock()
+        self.written = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _key(config: RunnableConfig) -> Tuple[str, str]:
+        return config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", "")
+
+    @staticmethod
+    def _owner(config: Optional[RunnableConfig]):
+        return section_owner((config or {}).get("configurable", {}).get("thread_id"))
+
+    def _write(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        self.written += 1
+        with self._owner(config):
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    def _flush(self, config: Optional[RunnableConfig]):
+        """Writes held checkpoints (of one thread, or all) so readers see them."""
+        with self._held_lock:
+            if config is None or "thread_id" not in config.get("configurable", {}):
+                held = list(self._held.values())
+                self._held.clear()
+            else:
+                thread_id = config["configurable"]["thread_id"]
+                keys = [key for key in self._held if key[0] == thread_id]
+                held = [self._held.pop(key) for key in keys]
+
+        for h in held:
+            saved = self._write(h["config"], h["checkpoint"], h["metadata"], h["new_versions"])
+            for writes, task_id, task_path in h["writes"]:
+                with self._owner(saved):
+                    super().put_writes(saved, writes, task_id, task_path)
+
+    # --------------------WRITES----------------------
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        key = self._key(config)
+        with self._held_lock:
+            held = self._held.pop(key, None)
+
+        if held is not None:
+            # The held checkpoint is superseded: chain this one to its parent, keep its channel versions
+            self.coalesced += 1
+            config = held["config"]
+            new_versions = {**held["new_versions"], **new_versions}
+
+        if self.coalesce and is_routing_only(metadata, new_versions):
+            with self._held_lock:
+                self._held[key] = {"config": config, "checkpoint": checkpoint, "metadata": metadata,
+                                   "new_versions": new_versions, "writes": []}
+            return {"configurable": {"thread_id": key[0], "checkpoint_ns": key[1], "checkpoint_id": checkpoint["id"]}}
+
+        return self._write(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        with self._held_lock:
+            held = self._held.get(self._key(config))
+            holding = held is not None and held["checkpoint"]["id"] == config["configurable"].get("checkpoint_id")
+            if holding:
+                held["writes"].append((writes, task_id, task_path))
+        if holding:
+            # The run stops at an interrupt: no checkpoint will supersede the held one
+            if any(channel == "__interrupt__" for channel, _ in writes):
+                self._flush(config)
+            return
+        with self._owner(config):
+            super().put_writes(config, writes, task_id, task_path)
+
+    # --------------------READS----------------------
+    def get_tuple(self, config: RunnableConfig):
+        self._flush(config)
+        with self._owner(config):
+            return super().get_tuple(config)
+
+    def list(self, config, **kwargs):
+        self._flush(config)
+        checkpoints = super().list(config, **kwargs)
+        while True:
+            # Checkpoints are deserialized as the iterator is consumed
+            with self._owner(config):
+                checkpoint = next(checkpoints, None)
+            if checkpoint is None:
+                return
+            yield checkpoint
+
+    def get_delta_channel_history(self, *, config: RunnableConfig, channels):
+        self._flush(config)
+        with self._owner(config):
+            return super().get_delta_channel_history(config=config, channels=channels)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._held_lock:
+            for key in [key for key in self._held if key[0] == thread_id]:
+                del self._held[key]
+        super().delete_thread(thread_id)
+        section_store.release(thread_id)
+
+    # --------------------FORKING----------------------
+    def fork_thread(self, thread_id: str, new_thread_id: str, checkpoint_id: Optional[str] = None,
+                    checkpoint_ns: str = "") -> Optional[str]:
+        """
+        Forks a thread at a checkpoint (default: its latest) into a new thread and returns
+        the checkpoint id the fork starts from, or None if there is no such checkpoint.
+
+        The fork shares the parent's serialized checkpoints, channel blobs and pending
+        writes by reference (they are immutable bytes), so forking copies no state; both
+        threads write their own new checkpoints from then on.
+        """
+        configurable = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        if checkpoint_id:
+            configurable["checkpoint_id"] = checkpoint_id
+        source = self.get_tuple({"configurable": configurable})
+        if source is None:
+            return None
+
+        fork_id = source.config["configurable"]["checkpoint_id"]
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+
+        # The fork point and its ancestors, so the fork keeps the parent's history
+        chain = []
+        cid = fork_id
+        while cid:
+            chain.append(cid)
+            cid = checkpoints[cid][2]
+
+        # Writes at the fork point are the results of the step the parent ran next, which the fork
+        # runs itself; only at the parent's latest checkpoint are they still pending (an interrupt)
+        pending = fork_id == max(checkpoints)
+        target = self.storage[new_thread_id][checkpoint_ns]
+        for cid in chain:
+            target[cid] = checkpoints[cid]
+            writes = self.writes.get((thread_id, checkpoint_ns, cid))
+            if writes and (cid != fork_id or pending):
+                self.writes[(new_thread_id, checkpoint_ns, cid)] = dict(writes)
+
+        for (tid, ns, channel, version), blob in list(self.blobs.items()):
+            if tid == thread_id and ns == checkpoint_ns:
+                self.blobs[(new_thread_id, ns, channel, version)] = blob
+        section_store.share(thread_id, new_thread_id)
+
+        return fork_id
+
+
+class FileSaver(CoalescingSaver):
+    """
+    CoalescingSaver loaded from and saved to a pickle file. Checkpoints are kept in
+    memory as usual; call save() at points worth resuming from (e.g. interrupts).
+    Section content is stored as hashes: mirror the section store to a directory too.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self._io_lock = threading.RLock()
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                storage, writes, blobs = pickle.load(f)
+            for thread_id, by_ns in storage.items():
+                for checkpoint_ns, checkpoints in by_ns.items():
+                    self.storage[thread_id][checkpoint_ns].update(checkpoints)
+            self.writes.update(writes)
+            self.blobs.update(blobs)
+
+    def save(self):
+        """Writes every checkpoint (including held ones) to the file."""
+        self._flush(None)
+        with self._io_lock:
+            # Stored values are immutable, copying the containers is enough
+            storage = {thread_id: {ns: dict(checkpoints) for ns, checkpoints in by_ns.items()}
+                       for thread_id, by_ns in self.storage.items()}
+            writes = {key: dict(value) for key, value in self.writes.items()}
+            blobs = dict(self.blobs)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((storage, writes, blobs), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        with self._io_lock:
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        with self._io_lock:
+            super().put_writes(config, writes, task_id, task_path)
+
+    def _flush(self, config: Optional[RunnableConfig]):
+        with self._io_lock:
+            super()._flush(config)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._io_lock:
+            super().delete_thread(thread_id)
+
+    def fork_thread(self, thread_id: str, new_thread_id: str, checkpoint_id: Optional[str] = None,
+                    checkpoint_ns: str = "") -> Optional[str]:
+        with self._io_lock:
+            return super().fork_thread(thread_id, new_thread_id, checkpoint_id, checkpoint_ns)
@@ -0,0 +1,199 @@
+"""
+Fast DOCX construction from a cached, pre-parsed template.
+
+The template package (the python-docx default, or a corporate template from
+DOCX_TEMPLATE) is read and parsed once per process. New content is built as
+WordprocessingML paragraph elements, serialized, and spliced into the template's
+main document XML at the body's insertion point. Every other template part is
+copied from a pre-built base package, so only word/document.xml is compressed
+per document. Serialized fragments can be cached and spliced in again unchanged
+(see src/utils/doc_cache.py).
+"""
+import importlib.util
+import io
+import os
+import zipfile
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from lxml import etree
+
+from src.utils import settings
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+DOCUMENT_PART = "word/document.xml"
+STYLES_PART = "word/styles.xml"
+
+# Located without importing python-docx, which is only needed by the benchmarks
+DEFAULT_TEMPLATE = os.path.join(importlib.util.find_spec("docx").submodule_search_locations[0],
+                                "templates", "default.docx")
+
+# Deflate level for the written package; parts are large (styles.xml ~430KB) and compress well at level 1
+ZIP_COMPRESSLEVEL = 1
+
+# Fragments are spliced into a document that already declares the w: namespace
+_W_NS_DECLARATION = f' xmlns:w="{W_NS}"'.encode()
+
+# Placeholder comment marking the body's insertion point while the template document is serialized
+_SPLIT_MARKER = "doc-builder-insertion-point"
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+class DocxTemplate:
+    """A template package parsed once: raw part bytes, the body insertion point and the style ids."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with zipfile.ZipFile(path) as package:
+            self.parts: Dict[str, bytes] = {info.filename: package.read(info) for info in package.infolist()}
+
+        self.prefix, self.suffix = self._split_document(self.parts[DOCUMENT_PART])
+        self.style_ids = self._style_ids(self.parts.get(STYLES_PART))
+        self._base_package: Optional[bytes] = None
+
+    @staticmethod
+    def _split_document(document_xml: bytes) -> Tuple[bytes, bytes]:
+        """Splits document.xml where new body content goes: before the body's final sectPr, like python-docx."""
+        root = etree.fromstring(document_xml)
+        if root.nsmap.get("w") != W_NS:
+            # Fragments are spliced in with the w: prefix and no namespace declaration of their own
+            raise ValueError("Template document.xml must bind the 'w' prefix to the WordprocessingML namespace")
+        body = root.find(_w("body"))
+        if body is None:
+            raise ValueError("Template document.xml has no body")
+
+        marker = etree.Comment(_SPLIT_MARKER)
+        if len(body) and body[-1].tag == _w("sectPr"):
+            body[-1].addprevious(marker)
+        else:
+            body.append(marker)
+        serialized = etree.tostring(root.getroottree(), xml_declaration=True, encoding="UTF-8", standalone=True)
+        prefix, suffix = serialized.split(f"<!--{_SPLIT_MARKER}-->".encode())
+        return prefix, suffix
+
+    @staticmethod
+    def _style_ids(styles_xml: Optional[bytes]) -> Dict[str, str]:
+        """Maps lowercase style names ("heading 1", "title") to style ids ("Heading1", "Title")."""
+        if not styles_xml:
+            return {}
+        ids = {}
+        for style in etree.fromstring(styles_xml).iter(_w("style")):
+            name = style.find(_w("name"))
+            if name is not None:
+                ids[name.get(_w("val")).lower()] = style.get(_w("styleId"))
+        return ids
+
+    def style_id(self, style_name: str) -> str:
+        return self.style_ids.get(style_name.lower(), style_name.replace(" ", ""))
+
+    def base_package(self) -> bytes:
+        """Zip of every template part except the main document, compressed once."""
+        if self._base_package is None:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL) as package:
+                for name, data in self.parts.items():
+                    if name != DOCUMENT_PART:
+                        package.writestr(name, data)
+            self._base_package = buffer.getvalue()
+        return self._base_package
+
+
+@lru_cache(maxsize=8)
+def get_template(path: Optional[str] = None) -> DocxTemplate:
+    """Process-wide cached template (DOCX_TEMPLATE, or the python-docx default)."""
+    return DocxTemplate(path or settings.get_str("DOCX_TEMPLATE", DEFAULT_TEMPLATE))
+
+
+class DocumentBuilder:
+    """Builds a document from new paragraph elements and pre-rendered fragments."""
+
+    def __init__(self, template: Optional[DocxTemplate] = None):
+        self.template = template or get_template()
+        self._chunks: List[Union[etree._Element, bytes]] = []
+
+    # --------------------ELEMENTS----------------------
+    def _run(self, paragraph, text: str, bold: bool = False, italic: bool = False):
+        r = etree.SubElement(paragraph, _w("r"))
+        if bold or italic:
+            r_pr = etree.SubElement(r, _w("rPr"))
+            if bold:
+                etree.SubElement(r_pr, _w("b"))
+            if italic:
+                etree.SubElement(r_pr, _w("i"))
+
+        # Line breaks inside a run become <w:br/>, as with python-docx's run.text
+        for i, line in enumerate(text.split("\n")):
+            if i:
+                etree.SubElement(r, _w("br"))
+            if line:
+                t = etree.SubElement(r, _w("t"))
+                t.text = line
+                if line != line.strip():
+                    t.set(f"{{{XML_NS}}}space", "preserve")
+
+    def _paragraph(self, style: Optional[str] = None):
+        p = etree.Element(_w("p"), nsmap={"w": W_NS})
+        if style:
+            p_pr = etree.SubElement(p, _w("pPr"))
+            etree.SubElement(p_pr, _w("pStyle")).set(_w("val"), self.template.style_id(style))
+        self._chunks.append(p)
+        return p
+
+    @staticmethod
+    def _serialize(chunk) -> bytes:
+        if isinstance(chunk, bytes):
+            return chunk
+        return etree.tostring(chunk, encoding="UTF-8").replace(_W_NS_DECLARATION, b"", 1)
+
+    # --------------------API----------------------
+    def heading(self, text: str, level: int = 1):
+        """Adds a heading paragraph (level 0 is the Title style)."""
+        p = self._paragraph("Title" if level == 0 else f"Heading {level}")
+        self._run(p, text)
+
+    def paragraph(self, text: str = "", bold: bool = False, italic: bool = False, style: Optional[str] = None):
+        """Adds a single-run paragraph (an empty text adds an empty paragraph)."""
+        p = self._paragraph(style)
+        if text:
+            self._run(p, text, bold=bold, italic=italic)
+
+    def rich_paragraph(self, runs: Iterable[Tuple[str, bool, bool]]):
+        """Adds a paragraph made of (text, bold, italic) runs."""
+        p = self._paragraph()
+        for text, bold, italic in runs:
+            self._run(p, text, bold=bold, italic=italic)
+
+    def paragraphs(self, lines: Iterable[str]):
+        """Adds one plain paragraph per line in bulk."""
+        for line in lines:
+            self.paragraph(line)
+
+    def fragment(self) -> bytes:
+        """Serializes (and removes) everything added so far, for caching and later splicing."""
+        data = b"".join(self._serialize(chunk) for chunk in self._chunks)
+        self._chunks = []
+        return data
+
+    def splice(self, fragment: bytes):
+        """Adds a pre-rendered fragment (from fragment()) as is."""
+        self._chunks.append(fragment)
+
+    def to_xml(self) -> bytes:
+        body = b"".join(self._serialize(chunk) for chunk in self._chunks)
+        return self.template.prefix + body + self.template.suffix
+
+    def save(self, path_or_stream):
+        """Writes the package: the pre-built base package plus the new word/document.xml."""
+        buffer = io.BytesIO(self.template.base_package())
+        with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL) as package:
+            package.writestr(DOCUMENT_PART, self.to_xml())
+
+        if hasattr(path_or_stream, "write"):
+            path_or_stream.write(buffer.getvalue())
+        else:
+            with open(path_or_stream, "wb") as f:
+                f.write(buffer.getvalue())
@@ -0,0 +1,111 @@
+"""
+Incremental document assembly: sections are rendered once and reused across revisions.
+
+Each section is rendered into a serialized WordprocessingML fragment and cached
+under a content hash of everything that shows up in the output (template, name,
+content, status and displayed confidence). Re-rendering a document after a
+regeneration round only renders the sections that changed; unchanged sections are
+spliced in from the cache as bytes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from src.utils import settings
+from src.utils.doc_builder import DocumentBuilder, DocxTemplate, get_template
+
+
+def section_fingerprint(section: dict, template: DocxTemplate) -> str:
+    """Content hash of a section as rendered (confidence is shown with 2 decimals)."""
+    digest = hashlib.sha1()
+    for part in (
+        template.path,
+        section.get("name", "Untitled Section"),
+        section.get("status", "unknown"),
+        f"{section.get('confidence', 0.0):.2f}",
+        section.get("content", ""),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def render_section_fragment(section: dict, template: DocxTemplate) -> bytes:
+    """Heading, status badge, one paragraph per content line and a spacer, as a fragment."""
+    doc = DocumentBuilder(template)
+
+    section_name = section.get("name", "Untitled Section")
+    content = section.get("content", "")
+    confidence = section.get("confidence", 0.0)
+    status = section.get("status", "unknown")
+
+    # Section heading with status indicator
+    doc.heading(section_name, level=2)
+
+    # Add status badge
+    if status == "auto_approved":
+        doc.paragraph(f"Auto-approved (Confidence: {confidence:.2f})", italic=True)
+    elif status == "human_reviewed":
+        doc.paragraph(f"Human-reviewed (Confidence: {confidence:.2f})", italic=True)
+    else:
+        doc.paragraph(f"Status: {status} (Confidence: {confidence:.2f})", italic=True)
+
+    # Add content
+    doc.paragraphs(line.strip() for line in content.split("\n") if line.strip())
+
+    # Add spacing
+    doc.paragraph()
+
+    return doc.fragment()
+
+
+class FragmentCache:
+    """Thread-safe LRU cache of rendered section fragments keyed by section fingerprint."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries  # None: FRAGMENT_CACHE_SIZE (4096), read on the first insert
+        self._fragments: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fragment(self, section: dict, template: DocxTemplate = None) -> bytes:
+        """The section's fragment, rendered only if this exact content was not rendered before."""
+        template = template or get_template()
+        key = section_fingerprint(section, template)
+
+        with self._lock:
+            cached = self._fragments.get(key)
+            if cached is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        # Render outside the lock; two threads racing on the same section produce identical bytes
+        fragment = render_section_fragment(section, template)
+        with self._lock:
+            if self.max_entries is None:
+                self.max_entries = settings.get_int("FRAGMENT_CACHE_SIZE", 4096)
+            self._fragments[key] = fragment
+            if len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._fragments),
+                "bytes": sum(len(f) for f in self._fragments.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self.hits = self.misses = 0
+
+
+fragment_cache = FragmentCache()
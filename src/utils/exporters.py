@@ -0,0 +1,230 @@
+"""
+Lightweight streaming export backends (Markdown, HTML, JSONL) next to the DOCX output.
+
+Exporters turn one section at a time into text, so a document is never held in
+memory as a whole: sections can be appended to a per-thread file as soon as they
+(and the sections before them) are approved, or streamed to an HTTP response. Section status and confidence are
+kept in every format; document statistics are written as a footer at the end.
+"""
+import html
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Type
+
+from src.utils.artifacts import artifact_index, artifact_path, stream_path
+
+
+def status_label(section: dict) -> str:
+    """Status badge text, same wording as the DOCX output."""
+    status = section.get("status", "unknown")
+    confidence = section.get("confidence", 0.0)
+    if status == "auto_approved":
+        return f"Auto-approved (Confidence: {confidence:.2f})"
+    if status == "human_reviewed":
+        return f"Human-reviewed (Confidence: {confidence:.2f})"
+    return f"Status: {status} (Confidence: {confidence:.2f})"
+
+
+def document_stats(sections: Iterable[dict]) -> dict:
+    total = auto_approved = human_reviewed = 0
+    for section in sections:
+        total += 1
+        auto_approved += section.get("status") == "auto_approved"
+        human_reviewed += section.get("status") == "human_reviewed"
+    return {
+        "total_sections": total,
+        "auto_approved": auto_approved,
+        "human_reviewed": human_reviewed,
+        "automation_rate": auto_approved / total if total else 0.0,
+    }
+
+
+def _lines(content: str) -> List[str]:
+    return [line.strip() for line in content.split("\n") if line.strip()]
+
+
+# --------------------EXPORTERS----------------------
+class SectionExporter:
+    """Base export backend: header, one chunk per section, footer."""
+
+    extension = "txt"
+    media_type = "text/plain"
+
+    def header(self, title: str) -> str:
+        return f"{title}\n\n"
+
+    def section(self, section: dict, index: int) -> str:
+        return f"{section.get('name', 'Untitled Section')}\n{status_label(section)}\n\n{section.get('content', '')}\n\n"
+
+    def footer(self, stats: dict) -> str:
+        return ""
+
+
+class MarkdownExporter(SectionExporter):
+    extension = "md"
+    media_type = "text/markdown"
+
+    def header(self, title: str) -> str:
+        return f"# {title}\n\n"
+
+    def section(self, section: dict, index: int) -> str:
+        body = "\n\n".join(_lines(section.get("content", "")))
+        return f"## {section.get('name', 'Untitled Section')}\n\n*{status_label(section)}*\n\n{body}\n\n"
+
+    def footer(self, stats: dict) -> str:
+        return (
+            "---\n\n**Document Statistics:** "
+            f"Total Sections: {stats['total_sections']} | "
+            f"Auto-approved: {stats['auto_approved']} | "
+            f"Human-reviewed: {stats['human_reviewed']} | "
+            f"Efficiency: {stats['automation_rate'] * 100:.1f}% automated\n"
+        )
+
+
+class HtmlExporter(SectionExporter):
+    extension = "html"
+    media_type = "text/html"
+
+    def header(self, title: str) -> str:
+        title = html.escape(title)
+        return (f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{title}</title></head>\n'
+                f"<body>\n<h1>{title}</h1>\n")
+
+    def section(self, section: dict, index: int) -> str:
+        paragraphs = "".join(f"<p>{html.escape(line)}</p>\n" for line in _lines(section.get("content", "")))
+        return (
+            f'<section data-index="{index}" data-status="{html.escape(str(section.get("status", "unknown")))}" '
+            f'data-confidence="{section.get("confidence", 0.0):.2f}">\n'
+            f"<h2>{html.escape(section.get('name', 'Untitled Section'))}</h2>\n"
+            f'<p class="status"><em>{html.escape(status_label(section))}</em></p>\n'
+            f"{paragraphs}</section>\n"
+        )
+
+    def footer(self, stats: dict) -> str:
+        return (
+            '<footer class="stats">'
+            f"Total Sections: {stats['total_sections']}<br>"
+            f"Auto-approved: {stats['auto_approved']}<br>"
+            f"Human-reviewed: {stats['human_reviewed']}<br>"
+            f"Efficiency: {stats['automation_rate'] * 100:.1f}% automated"
+            "</footer>\n</body>\n</html>\n"
+        )
+
+
+class JsonlExporter(SectionExporter):
+    extension = "jsonl"
+    media_type = "application/x-ndjson"
+
+    def header(self, title: str) -> str:
+        return json.dumps({"type": "document", "title": title}) + "\n"
+
+    def section(self, section: dict, index: int) -> str:
+        return json.dumps({
+            "type": "section",
+            "index": index,
+            "name": section.get("name", "Untitled Section"),
+            "content": section.get("content", ""),
+            "confidence": section.get("confidence", 0.0),
+            "status": section.get("status", "unknown"),
+        }) + "\n"
+
+    def footer(self, stats: dict) -> str:
+        return json.dumps({"type": "summary", **stats}) + "\n"
+
+
+EXPORTERS: Dict[str, Type[SectionExporter]] = {
+    "markdown": MarkdownExporter,
+    "html": HtmlExporter,
+    "jsonl": JsonlExporter,
+}
+
+
+def register_exporter(name: str, exporter: Type[SectionExporter]):
+    """Registers an additional export backend."""
+    EXPORTERS[name] = exporter
+
+
+def get_exporter(name: str) -> SectionExporter:
+    if name not in EXPORTERS:
+        raise ValueError(f"Unknown export format '{name}' (available: {', '.join(EXPORTERS)})")
+    return EXPORTERS[name]()
+
+
+# --------------------STREAMING----------------------
+def iter_export(fmt: str, title: str, sections: Iterable[dict]) -> Iterator[str]:
+    """Yields the document chunk by chunk (header, one chunk per section, footer)."""
+    exporter = get_exporter(fmt)
+    stats = {"total_sections": 0, "auto_approved": 0, "human_reviewed": 0}
+
+    yield exporter.header(title)
+    for index, section in enumerate(sections):
+        stats["total_sections"] += 1
+        stats["auto_approved"] += section.get("status") == "auto_approved"
+        stats["human_reviewed"] += section.get("status") == "human_reviewed"
+        yield exporter.section(section, index)
+
+    stats["automation_rate"] = stats["auto_approved"] / stats["total_sections"] if stats["total_sections"] else 0.0
+    yield exporter.footer(stats)
+
+
+def export_to_file(fmt: str, title: str, sections: Iterable[dict], path) -> str:
+    """Streams a whole export to a file (temp file + atomic rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for chunk in iter_export(fmt, title, sections):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return str(path)
+
+
+def stream_approved_sections(state: dict, thread_id: str, title: str, final: bool = False) -> List[str]:
+    """
+    Appends newly approved sections of a thread to its in-progress export files
+    (one per format in export_formats) and returns the updated streamed_sections list.
+
+    Sections are written in document order: an approved section is held back until
+    every section before it has been written. With final=True all remaining sections
+    are written, the statistics footer is added and every file is atomically renamed
+    to its per-revision name.
+    """
+    formats = state.get("export_formats", [])
+    streamed = list(state.get("streamed_sections", []))
+    if not formats:
+        return streamed
+
+    sections = state.get("sections", [])
+    # Calibrated routing may still send auto-approved sections back to review
+    approved = ("human_reviewed",) if state.get("calibrated_routing", False) else ("auto_approved", "human_reviewed")
+    new = []
+    for i, section in enumerate(sections):
+        if section["name"] in streamed:
+            continue
+        if not final and section.get("status") not in approved:
+            break
+        new.append((i, section))
+
+    for fmt in formats:
+        exporter = get_exporter(fmt)
+        part = stream_path(thread_id, kind="document", ext=exporter.extension)
+
+        with open(part, "a", encoding="utf-8") as f:
+            if f.tell() == 0:
+                f.write(exporter.header(title))
+            for index, section in new:
+                f.write(exporter.section(section, index))
+            if final:
+                f.write(exporter.footer(document_stats(sections)))
+
+        if final:
+            revision = state.get("revision_count", 0)
+            path = artifact_path(thread_id, revision, ext=exporter.extension)
+            os.replace(part, path)
+            artifact_index.record(thread_id, revision, path, fmt=fmt, kind="document")
+
+    return streamed + [s["name"] for _, s in new]
+
+
+def export_title(prompt: Optional[str]) -> str:
+    """Document title derived from the prompt (first 50 characters)."""
+    prompt = prompt or "Generated Document"
+    return prompt[:50] if len(prompt) > 50 else prompt
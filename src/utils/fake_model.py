@@ -0,0 +1,183 @@
+"""
+Deterministic scripted chat model for offline runs, tests and benchmarks
+(MODEL_PROVIDER=fake, see src/utils/llm.py).
+
+Every prompt the graph sends is recognised by its wording and answered in the
+format the node expects: a first draft, batched or per-section reflection rules,
+paragraph patches, full rewrites and speculative candidates. A response depends
+only on the seed, the model settings and the prompt, so runs are reproducible
+however calls interleave across threads.
+
+Confidences are drawn from Beta(a, b) distributions: `confidence` for first drafts,
+`revised_confidence` for rewrites, patches and candidates. A `malformed_rate` share
+of the JSON responses is cut in half (invalid JSON), which exercises the nodes'
+fallbacks. Latency is call_latency plus output_token_latency per output token.
+
+FAKE_LLM_* variables configure the models built by the "fake" provider, e.g.
+    FAKE_LLM_CONFIDENCE=4,4 FAKE_LLM_MALFORMED_RATE=0.1 FAKE_LLM_LATENCY_S=0.2
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, Field, PrivateAttr
+
+from src.utils.text import estimate_tokens
+
+SECTION_NAMES = ["Introduction", "Prerequisites", "Installation", "Configuration", "Core Concepts", "Usage",
+                 "Examples", "Troubleshooting", "Best Practices", "Security", "Performance", "Conclusion"]
+
+GLOBAL_RULES = ["Use simpler language", "Include code examples", "Define terms before using them",
+                "Prefer short paragraphs", "State the prerequisites explicitly"]
+
+SPECIFIC_RULES = ["Add a worked example", "List the commands in order", "Explain why, not only how",
+                  "Mention common mistakes", "Link each step to the expected result"]
+
+_WORDS = ("container image layer volume network service build registry port process runtime host "
+          "command file configuration step example result default option cache update log").split()
+
+
+class FakeChatModel(BaseChatModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    model_name: str = Field(default="gpt-4o-mini", alias="model")
+    temperature: float = 0.0
+    seed: int = 0
+    sections: int = 6
+    paragraphs: int = 4
+    confidence: Tuple[float, float] = (8.0, 2.0)
+    revised_confidence: Tuple[float, float] = (9.0, 1.5)
+    malformed_rate: float = 0.0
+    call_latency: float = 0.0
+    output_token_latency: float = 0.0
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    _malformed: int = PrivateAttr(default=0)
+    _input_tokens: int = PrivateAttr(default=0)
+    _output_tokens: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "temperature": self.temperature, "seed": self.seed}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        text, malformed = self.respond(prompt)
+
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        with self._lock:
+            self._calls += 1
+            self._malformed += malformed
+            self._input_tokens += input_tokens
+            self._output_tokens += output_tokens
+
+        latency = self.call_latency + output_tokens * self.output_token_latency
+        if latency > 0:
+            time.sleep(latency)
+
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    # --------------------SCRIPT----------------------
+    def respond(self, prompt: str) -> Tuple[str, bool]:
+        """The response to a prompt, and whether it was deliberately malformed."""
+        rng = random.Random(f"{self.seed}|{self.model_name}|{self.temperature}|{prompt}")
+
+        if "GLOBAL: <rule" in prompt:
+            # Per-section reflection answers in plain text, never malformed
+            return f"GLOBAL: {rng.choice(GLOBAL_RULES)}\nSPECIFIC: {rng.choice(SPECIFIC_RULES)}", False
+
+        malformed = rng.random() < self.malformed_rate
+        if "Write an alternative version of ONE section" in prompt or "Regenerate the content for section:" in prompt:
+            payload = {"content": self._content(rng, self.paragraphs),
+                       "confidence": self._confidence(rng, self.revised_confidence),
+                       "reasoning": "Rewritten following the feedback"}
+        elif "Available edit operations" in prompt:
+            count = len(re.findall(r"^\[\d+\] ", prompt, re.MULTILINE)) or 1
+            indices = sorted(rng.sample(range(count), min(count, rng.randint(1, 2))))
+            payload = {"edits": [{"op": "replace", "index": i, "text": self._paragraph(rng)} for i in indices],
+                       "confidence": self._confidence(rng, self.revised_confidence),
+                       "reasoning": "Edited the paragraphs the feedback is about"}
+        elif "### Section:" in prompt:
+            names = re.findall(r"^### Section: (.+)$", prompt, re.MULTILINE)
+            payload = {"global_rules": [rng.choice(GLOBAL_RULES)],
+                       "section_rules": [{"section": name, "rules": [rng.choice(SPECIFIC_RULES)]} for name in names]}
+        elif "User request:" in prompt:
+            names = SECTION_NAMES[:self.sections] + [f"Section {i + 1}" for i in range(len(SECTION_NAMES), self.sections)]
+            payload = {"sections": [{"name": name,
+                                     "content": self._content(rng, self.paragraphs),
+                                     "confidence": self._confidence(rng, self.confidence),
+                                     "reasoning": "Scripted draft"} for name in names]}
+        else:
+            return "OK", False
+
+        text = json.dumps(payload)
+        return (text[:len(text) // 2], True) if malformed else (text, False)
+
+    @staticmethod
+    def _confidence(rng: random.Random, shape: Tuple[float, float]) -> float:
+        return round(rng.betavariate(*shape), 2)
+
+    @staticmethod
+    def _paragraph(rng: random.Random) -> str:
+        sentences = [" ".join(rng.choices(_WORDS, k=rng.randint(8, 14))).capitalize() + "."
+                     for _ in range(rng.randint(3, 5))]
+        return " ".join(sentences)
+
+    def _content(self, rng: random.Random, paragraphs: int) -> str:
+        return "\n\n".join(self._paragraph(rng) for _ in range(paragraphs))
+
+    def stats(self) -> dict:
+        return {
+            "calls": self._calls,
+            "malformed": self._malformed,
+            "input_tokens": self._input_tokens,
+            "output_tokens": self._output_tokens,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._calls = 0
+            self._malformed = 0
+            self._input_tokens = 0
+            self._output_tokens = 0
+
+
+def _shape(value: Optional[str], default: Tuple[float, float]) -> Tuple[float, float]:
+    if not value:
+        return default
+    a, b = (float(x) for x in value.split(","))
+    return a, b
+
+
+def fake_model_from_env(**kwargs) -> FakeChatModel:
+    """A FakeChatModel configured from FAKE_LLM_* variables; keyword arguments (model=, temperature=) win."""
+    settings = {
+        "seed": int(os.getenv("FAKE_LLM_SEED", "0")),
+        "sections": int(os.getenv("FAKE_LLM_SECTIONS", "6")),
+        "paragraphs": int(os.getenv("FAKE_LLM_PARAGRAPHS", "4")),
+        "confidence": _shape(os.getenv("FAKE_LLM_CONFIDENCE"), (8.0, 2.0)),
+        "revised_confidence": _shape(os.getenv("FAKE_LLM_REVISED_CONFIDENCE"), (9.0, 1.5)),
+        "malformed_rate": float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0")),
+        "call_latency": float(os.getenv("FAKE_LLM_LATENCY_S", "0")),
+        "output_token_latency": float(os.getenv("FAKE_LLM_TOKEN_LATENCY_S", "0")),
+    }
+    return FakeChatModel(**{**settings, **kwargs})
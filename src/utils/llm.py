@@ -0,0 +1,253 @@
+"""
+LLM call layer shared by the graph nodes.
+
+invoke_model() sends chat model calls through a process-wide single-flight
+coalescer. Concurrent identical requests (same model class, parameters and
+messages) share one in-flight call, and the response is fanned out to every
+caller. Calls run on a dedicated pool, so a caller that stops waiting (timeout,
+interrupted worker) never cancels the call for the others. A call that nobody
+waits for any more is cancelled if it has not started yet.
+
+Every call records its latency, outcome and token usage under a call site label
+(see src/utils/metrics.py); coalesced callers are counted with outcome "coalesced".
+Each caller also gets an "llm" span (see src/utils/tracing.py), and the response
+is written to the graph's "custom" stream when the run streams it (the WebSocket
+endpoint does).
+
+Nodes get their model from chat_model(), built by the selected provider:
+MODEL_PROVIDER ("openai" or the deterministic "fake"), or a factory passed to
+set_model_provider(). langchain_openai is only imported when the first OpenAI
+model is built, so importing the graph stays cheap.
+"""
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from langchain_core.messages import BaseMessage
+from langgraph.config import get_stream_writer
+
+from src.utils import settings
+from src.utils.metrics import LLM_CALL_DURATION, LLM_CALLS, LLM_TOKENS
+from src.utils.tracing import tracer
+from src.utils.usage import record_usage
+
+# Settings (read on first use, see src/utils/settings.py):
+#   MODEL_PROVIDER       "openai" (default) or "fake" (see src/utils/fake_model.py)
+#   LLM_MAX_CONCURRENCY  model calls running at once through the coalescer (32)
+#   LLM_TIMEOUT_S        how long a caller waits for a call; 0 (default): as long as the call takes
+#   LLM_COALESCE         "0" turns coalescing off
+
+
+# --------------------PROVIDERS----------------------
+def ChatOpenAI(**kwargs):
+    """langchain_openai.ChatOpenAI, imported on first use (the import takes over a second)."""
+    from langchain_openai import ChatOpenAI as chat_openai
+
+    return chat_openai(**kwargs)
+
+
+def fake_chat_model(**kwargs):
+    """Deterministic scripted model, configured from FAKE_LLM_* variables."""
+    from src.utils.fake_model import fake_model_from_env
+
+    return fake_model_from_env(**kwargs)
+
+
+# Provider name -> factory called with the node's model settings (model=, temperature=)
+MODEL_PROVIDERS: Dict[str, Callable[..., Any]] = {
+    "openai": ChatOpenAI,
+    "fake": fake_chat_model,
+}
+
+_provider: Optional[Callable[..., Any]] = None
+
+
+def set_model_provider(provider: Union[str, Callable[..., Any], None]):
+    """Selects the model provider by name or factory for the whole process; None restores MODEL_PROVIDER."""
+    global _provider
+    if isinstance(provider, str) and provider not in MODEL_PROVIDERS:
+        raise ValueError(f"Unknown model provider '{provider}', expected one of {sorted(MODEL_PROVIDERS)}")
+    _provider = MODEL_PROVIDERS[provider] if isinstance(provider, str) else provider
+
+
+def chat_model(**kwargs):
+    """The chat model every graph node uses, built by the selected provider."""
+    return (_provider or MODEL_PROVIDERS[settings.get_str("MODEL_PROVIDER", "openai")])(**kwargs)
+
+
+def request_key(model, messages) -> str:
+    """Hash of everything that determines a response: model class, its parameters and the messages."""
+    if isinstance(messages, str):
+        messages = [("human", messages)]
+    payload = {
+        "model": type(model).__name__,
+        "params": getattr(model, "_identifying_params", {}),
+        "messages": [(m.type, m.content) if isinstance(m, BaseMessage) else m for m in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: Future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key into one call."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._queued = 0  # calls submitted and not started yet
+        self.calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.cancelled = 0
+        self.errors = 0
+
+    def _started(self, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._queued -= 1
+        return fn()
+
+    def _finished(self, key: str, flight: _Flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not flight.future.cancelled() and flight.future.exception() is not None:
+                self.errors += 1
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None,
+           on_join: Optional[Callable[[], None]] = None) -> Any:
+        """Result of fn(), shared with every concurrent caller using the same key; on_join runs when sharing."""
+        joined = False
+        with self._lock:
+            flight = self._flights.get(key)
+            # A finished call may not have run its done callback yet; it is not shared any more
+            if flight is None or flight.future.done():
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers or settings.get_int("LLM_MAX_CONCURRENCY", 32),
+                        thread_name_prefix="llm")
+                flight = _Flight(self._executor.submit(self._started, fn))
+                self._queued += 1
+                self._flights[key] = flight
+                self.calls += 1
+            else:
+                self.coalesced += 1
+                joined = True
+            flight.waiters += 1
+        if not joined:
+            # Outside the lock: a call that already finished runs the callback right here
+            flight.future.add_done_callback(lambda _: self._finished(key, flight))
+        if joined and on_join is not None:
+            on_join()
+
+        try:
+            return flight.future.result(timeout)
+        except BaseException:
+            if not flight.future.done():
+                # This caller dropped out; the call keeps running for the remaining waiters
+                with self._lock:
+                    flight.waiters -= 1
+                    self.abandoned += 1
+                    if flight.waiters == 0 and flight.future.cancel():
+                        self._queued -= 1
+                        self.cancelled += 1
+                        self._flights.pop(key, None)
+            raise
+
+    def queue_depth(self) -> int:
+        """Calls waiting for a free worker (LLM_MAX_CONCURRENCY calls run at a time)."""
+        with self._lock:
+            return self._queued
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "abandoned": self.abandoned,
+                "cancelled": self.cancelled,
+                "errors": self.errors,
+                "in_flight": sum(not flight.future.done() for flight in self._flights.values()),
+                "saved_ratio": self.coalesced / (self.calls + self.coalesced) if self.calls + self.coalesced else 0.0,
+            }
+
+
+single_flight = SingleFlight()
+
+
+# --------------------CALLS----------------------
+def _invoke_measured(model, messages, site: str):
+    """model.invoke(messages), recording latency, outcome and token usage for the call site."""
+    start = time.perf_counter()
+    try:
+        response = model.invoke(messages)
+    except BaseException:
+        LLM_CALLS.inc(site, "error")
+        raise
+    finally:
+        LLM_CALL_DURATION.observe(site, value=time.perf_counter() - start)
+    LLM_CALLS.inc(site, "ok")
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        LLM_TOKENS.inc(site, "input", amount=usage.get("input_tokens", 0))
+        LLM_TOKENS.inc(site, "output", amount=usage.get("output_tokens", 0))
+    return response
+
+
+def invoke_model(model, messages, coalesce: Optional[bool] = None, timeout: Optional[float] = None,
+                 site: str = "unknown"):
+    """model.invoke(messages), coalesced with identical in-flight requests (LLM_COALESCE, LLM_TIMEOUT_S by default)."""
+    if coalesce is None:
+        coalesce = settings.get_flag("LLM_COALESCE", True)
+    if timeout is None:
+        timeout = settings.get_float("LLM_TIMEOUT_S", 0) or None
+    joined = []
+
+    def on_join():
+        joined.append(True)
+        LLM_CALLS.inc(site, "coalesced")
+
+    with tracer.span("llm", kind="llm", site=site, model=getattr(model, "model_name", type(model).__name__)) as span:
+        if not coalesce:
+            response = _invoke_measured(model, messages, site)
+        else:
+            response = single_flight.do(request_key(model, messages), lambda: _invoke_measured(model, messages, site),
+                                        timeout, on_join=on_join)
+        record_usage(model, response, coalesced=bool(joined))
+        usage = getattr(response, "usage_metadata", None) or {}
+        if span is not None:
+            span.set(coalesced=bool(joined), input_tokens=usage.get("input_tokens", 0),
+                     output_tokens=usage.get("output_tokens", 0))
+        _emit_model_output(site, response.content, usage.get("output_tokens", 0), bool(joined))
+        return response
+
+
+def _emit_model_output(site: str, content: Any, output_tokens: int, coalesced: bool):
+    """Sends a model response to the run's "custom" stream (no-op unless the run streams it, or outside a graph)."""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"type": "llm", "site": site, "content": content, "output_tokens": output_tokens, "coalesced": coalesced})
+
+
+def batch_model(model, prompts: List[Any], max_concurrency: int, coalesce: Optional[bool] = None,
+                site: str = "unknown") -> List[Any]:
+    """invoke_model over several prompts concurrently; results keep the prompts' order."""
+    # One context copy per call, so their spans nest under the caller's span
+    contexts = [contextvars.copy_context() for _ in prompts]
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return list(executor.map(lambda context, prompt: context.run(invoke_model, model, prompt, coalesce, site=site),
+                                 contexts, prompts))
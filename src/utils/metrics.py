@@ -0,0 +1,196 @@
+"""
+Minimal in-process metrics with Prometheus text exposition (no client library needed).
+
+Counters, gauges and histograms are keyed by label values and updated under one
+short lock per metric, so recording costs about a microsecond. Values that are
+cheap to read but not worth tracking on the hot path (thread counts by status,
+queue depths) are registered as collectors and evaluated only on scrape.
+METRICS_ENABLED=0 turns recording off.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langgraph.errors import GraphInterrupt
+
+from src.utils import settings
+from src.utils.nodes import NodeCall
+
+_enabled: Optional[bool] = None  # METRICS_ENABLED, read on first use
+
+
+def metrics_enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        _enabled = settings.get_flag("METRICS_ENABLED", True)
+    return _enabled
+
+
+def set_metrics_enabled(enabled: Optional[bool]):
+    """Turns recording on or off for the whole process; None goes back to METRICS_ENABLED."""
+    global _enabled
+    _enabled = enabled
+
+# Seconds; node and model call durations range from milliseconds to minutes
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+WAIT_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 14400.0, 86400.0)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        if not metrics_enabled():
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float):
+        if not metrics_enabled():
+            return
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, *labels: str, value: float):
+        if not metrics_enabled():
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(counts), total) for k, (counts, total) in self._values.items()]
+        lines = self.header()
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[str]]):
+        """Registers a function returning exposition lines, evaluated on every scrape."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                lines.extend(collect())
+            except Exception as e:  # a broken collector must not break the scrape
+                lines.append(f"# collector {getattr(collect, '__name__', collect)} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name: str, documentation: str, samples: Dict[Tuple[Tuple[str, str], ...], float],
+                kind: str = "gauge") -> List[str]:
+    """Exposition lines for a gauge (or counter) computed on scrape: {((label, value), ...): sample}."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples.items():
+        lines.append(f"{name}{_labels([k for k, _ in labels], [v for _, v in labels])} {value}")
+    return lines
+
+
+registry = Registry()
+
+# --------------------METRICS----------------------
+NODE_DURATION = registry.register(Histogram(
+    "agent_node_duration_seconds", "Graph node execution time.", ("node", "outcome")))
+LLM_CALL_DURATION = registry.register(Histogram(
+    "agent_llm_call_duration_seconds", "Model call latency (calls actually sent to the provider).", ("site",)))
+LLM_CALLS = registry.register(Counter(
+    "agent_llm_calls_total", "Model calls by call site and outcome (ok, error, coalesced).", ("site", "outcome")))
+LLM_TOKENS = registry.register(Counter(
+    "agent_llm_tokens_total", "Tokens used by call site (kind: input, output).", ("site", "kind")))
+INTERRUPT_WAIT = registry.register(Histogram(
+    "agent_interrupt_wait_seconds", "Time threads waited for a human response.", (), buckets=WAIT_BUCKETS))
+
+
+def node_timing(name: str, state, config, call: NodeCall):
+    """Node middleware (see src/utils/nodes.py): records the node's duration; interrupts have outcome "interrupt"."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        return call()
+    except GraphInterrupt:
+        outcome = "interrupt"
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        NODE_DURATION.observe(name, outcome, value=time.perf_counter() - start)
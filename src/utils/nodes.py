@@ -0,0 +1,34 @@
+"""
+Graph node wrapping shared by the instrumentation concerns (log context, token usage,
+trace spans, duration metrics).
+
+A concern is a middleware `(name, state, config, call) -> result`: it sets up whatever
+it needs around `call()`, which runs the rest of the chain and the node itself, and may
+add to the node's result. wrap_node composes middlewares around a node function in a
+single wrapper.
+"""
+from typing import Any, Callable, Optional
+
+NodeCall = Callable[[], Any]
+Middleware = Callable[[str, dict, dict, NodeCall], Any]
+
+
+def node_thread_id(config) -> Optional[str]:
+    return (config or {}).get("configurable", {}).get("thread_id")
+
+
+def wrap_node(name: str, fn: Callable, *middlewares: Middleware) -> Callable:
+    """Graph node running fn inside the middlewares (the first one is outermost)."""
+    takes_config = fn.__code__.co_argcount > 1
+
+    # Not functools.wraps: LangGraph reads the signature through __wrapped__ and would not pass config
+    def node(state, config):
+        def call(depth: int = 0):
+            if depth == len(middlewares):
+                return fn(state, config) if takes_config else fn(state)
+            return middlewares[depth](name, state, config, lambda: call(depth + 1))
+
+        return call()
+
+    node.__name__ = fn.__name__
+    return node
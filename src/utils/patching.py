@@ -0,0 +1,126 @@
+import json
+import re
+from typing import List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError
+
+from src.utils.text import strip_code_fence
+
+# Sections with fewer paragraphs than this are always rewritten in full
+PATCH_MIN_PARAGRAPHS = 3
+
+
+# --------------------SCHEMAS----------------------
+class ParagraphEdit(BaseModel):
+    op: Literal["replace", "insert_after", "delete"]
+    index: int
+    text: str = ""
+
+
+class SectionPatch(BaseModel):
+    edits: List[ParagraphEdit] = Field(min_length=1)
+    confidence: float
+    reasoning: str = ""
+
+
+# --------------------PARAGRAPHS----------------------
+def split_paragraphs(content: str) -> Tuple[List[str], str]:
+    """
+    Splits section content into paragraphs.
+    Returns (paragraphs, separator) so the patched content can be joined back the same way.
+    """
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", content.strip()) if p.strip()]
+    if len(paragraphs) > 1:
+        return paragraphs, "\n\n"
+
+    lines = [line.strip() for line in content.strip().split("\n") if line.strip()]
+    return lines, "\n"
+
+
+def apply_patch(paragraphs: List[str], edits: List[ParagraphEdit], separator: str = "\n\n") -> str:
+    """
+    Applies paragraph edits to the stored content.
+    All indices refer to the ORIGINAL paragraph numbering; insert_after -1 prepends.
+    """
+    replaced = {}
+    deleted = set()
+    inserts = {}
+
+    for edit in edits:
+        if edit.op == "replace":
+            replaced[edit.index] = edit.text.strip()
+        elif edit.op == "delete":
+            deleted.add(edit.index)
+        else:
+            inserts.setdefault(edit.index, []).append(edit.text.strip())
+
+    result = list(inserts.get(-1, []))
+    for i, paragraph in enumerate(paragraphs):
+        if i not in deleted:
+            result.append(replaced.get(i, paragraph))
+        result.extend(inserts.get(i, []))
+
+    return separator.join(result)
+
+
+# --------------------PROMPT----------------------
+def build_patch_prompt(section_name: str, paragraphs: List[str], feedback: str,
+                       learned_rules: List[str], specific_rules: List[str]) -> str:
+    """Prompt asking the model for targeted paragraph edits instead of a full rewrite."""
+    numbered = "\n\n".join(f"[{i}] {p}" for i, p in enumerate(paragraphs))
+    schema = json.dumps(SectionPatch.model_json_schema())
+
+    return f"""
+Revise the content for section: {section_name}
+
+Only change the paragraphs the feedback is about. Do NOT repeat unchanged paragraphs.
+
+Original content (paragraphs are numbered):
+{numbered}
+
+Human feedback:
+{feedback}
+
+Global rules to follow:
+{chr(10).join('- ' + rule for rule in learned_rules) if learned_rules else '- None'}
+
+Section-specific rules for '{section_name}':
+{chr(10).join('- ' + rule for rule in specific_rules) if specific_rules else '- None'}
+
+Available edit operations (indices refer to the original numbering):
+- "replace": replace paragraph `index` with `text`
+- "insert_after": insert `text` as a new paragraph after paragraph `index` (-1 inserts at the start)
+- "delete": remove paragraph `index`
+
+Respond ONLY with valid JSON matching this JSON schema:
+{schema}
+"""
+
+
+# --------------------VALIDATION----------------------
+def parse_section_patch(response_text: str, paragraph_count: int) -> Optional[SectionPatch]:
+    """
+    Validates a patch response. Returns None when the response is malformed
+    or references paragraphs that do not exist, so callers can fall back to a full rewrite.
+    """
+    try:
+        patch = SectionPatch.model_validate_json(strip_code_fence(response_text))
+    except ValidationError:
+        return None
+
+    touched = set()
+    for edit in patch.edits:
+        lower = -1 if edit.op == "insert_after" else 0
+        if not lower <= edit.index < paragraph_count:
+            return None
+        if edit.op != "delete" and not edit.text.strip():
+            return None
+        if edit.op in ("replace", "delete"):
+            if edit.index in touched:
+                return None
+            touched.add(edit.index)
+
+    if all(edit.op == "delete" for edit in patch.edits) and len(touched) == paragraph_count:
+        return None
+
+    return patch
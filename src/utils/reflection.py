@@ -0,0 +1,118 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError
+
+from src.utils.text import strip_code_fence
+
+
+# --------------------SCHEMAS----------------------
+class SectionReflection(BaseModel):
+    section: str
+    rules: List[str] = Field(default_factory=list)
+
+
+class ReflectionBatch(BaseModel):
+    global_rules: List[str] = Field(default_factory=list)
+    section_rules: List[SectionReflection] = Field(default_factory=list)
+
+
+# --------------------HELPERS----------------------
+def _is_rule(rule: str) -> bool:
+    return bool(rule) and rule.strip().upper() != "NONE"
+
+
+# --------------------PROMPTS----------------------
+def build_section_reflection_prompt(section_name: str, section_content: str, feedback: str) -> str:
+    """Prompt used to reflect on a single rejected section."""
+    return f"""
+Analyze this feedback and extract rules.
+
+Section: {section_name}
+Generated content: {section_content}
+Human feedback: {feedback}
+
+Provide two types of rules:
+1. GLOBAL RULE: A general rule applicable to all sections (if applicable)
+2. SECTION-SPECIFIC RULE: A rule specific to '{section_name}' type sections
+
+Format your response as:
+GLOBAL: <rule or "NONE">
+SPECIFIC: <rule or "NONE">
+
+Rules should be imperative (e.g., "Use simpler language", "Include code examples").
+"""
+
+
+def build_batch_reflection_prompt(items: List[Tuple[str, str, str]]) -> str:
+    """
+    Prompt used to reflect on all rejected sections in a single call.
+    Each item is (section_name, section_content, feedback).
+    """
+    sections_text = ""
+    for section_name, section_content, feedback in items:
+        sections_text += f"\n### Section: {section_name}\n"
+        sections_text += f"Generated content: {section_content}\n"
+        sections_text += f"Human feedback: {feedback}\n"
+
+    schema = json.dumps(ReflectionBatch.model_json_schema())
+
+    return f"""
+Analyze the human feedback on the rejected sections below and extract rules.
+
+Provide two types of rules:
+1. GLOBAL RULES: General rules applicable to all sections (only if applicable)
+2. SECTION-SPECIFIC RULES: Rules specific to each rejected section type
+
+Rules should be imperative (e.g., "Use simpler language", "Include code examples").
+Use the exact section names given below.
+
+Rejected sections:
+{sections_text}
+Respond ONLY with valid JSON matching this JSON schema:
+{schema}
+"""
+
+
+# --------------------PARSING----------------------
+def parse_section_reflection(response_text: str) -> Tuple[List[str], List[str]]:
+    """Parses a GLOBAL:/SPECIFIC: formatted response into (global_rules, specific_rules)."""
+    global_rules = []
+    specific_rules = []
+
+    for line in response_text.strip().split("\n"):
+        if line.startswith("GLOBAL:"):
+            rule = line.replace("GLOBAL:", "").strip()
+            if _is_rule(rule):
+                global_rules.append(rule)
+
+        elif line.startswith("SPECIFIC:"):
+            rule = line.replace("SPECIFIC:", "").strip()
+            if _is_rule(rule):
+                specific_rules.append(rule)
+
+    return global_rules, specific_rules
+
+
+def parse_batch_reflection(response_text: str, section_names: List[str]) -> Optional[Tuple[List[str], Dict[str, List[str]]]]:
+    """
+    Validates a batched reflection response against the ReflectionBatch schema.
+    Returns (global_rules, {section_name: rules}) or None if the response is invalid.
+    Rules for sections that were not part of the batch are dropped.
+    """
+    try:
+        result = ReflectionBatch.model_validate_json(strip_code_fence(response_text))
+    except ValidationError:
+        return None
+
+    global_rules = [rule.strip() for rule in result.global_rules if _is_rule(rule)]
+
+    specific_rules = {}
+    for entry in result.section_rules:
+        if entry.section not in section_names:
+            continue
+        rules = [rule.strip() for rule in entry.rules if _is_rule(rule)]
+        if rules:
+            specific_rules.setdefault(entry.section, []).extend(rules)
+
+    return global_rules, specific_rules
@@ -0,0 +1,252 @@
+"""
+Pooled DOCX rendering service.
+
+python-docx builds the whole XML tree while holding the GIL, so rendering a large
+document inline stalls every other graph thread in the process. The service keeps a
+pool of persistent worker processes (`python -m src.utils.write_to_doc --serve`) fed with
+JSON lines over their stdin/stdout pipes. Each worker has a dispatcher thread in this
+process that waits for the reply without holding the GIL; a job that exceeds its
+timeout gets its worker killed and replaced. If a worker cannot be started, the jobs
+it takes fail until a later start succeeds.
+
+Every dispatcher has its own queue. Jobs submitted with the same affinity key (e.g. a
+thread's previews and its final document) go to the same worker, whose fragment cache
+already holds the sections that did not change; other jobs go to the shortest queue.
+
+Finished jobs are kept for RENDER_JOB_TTL_S seconds, and at most RENDER_MAX_JOBS of
+them, so their status can be polled.
+"""
+import atexit
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from src.utils import settings
+from src.utils.set_logging import logger
+
+# Repository root, so workers can run `python -m src.utils.write_to_doc --serve`
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Worker:
+    """One persistent render process and a reader thread for its replies."""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "src.utils.write_to_doc", "--serve"],
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")]))},
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self.replies = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            try:
+                reply = json.loads(line)
+            except json.JSONDecodeError:
+                # Out of step with the worker: fail the pending job now, the dispatcher replaces the worker
+                self.replies.put({"status": "failed", "error": f"Render worker sent an invalid reply: {line[:200]!r}"})
+                return
+            self.replies.put(reply)
+        self.replies.put(None)  # EOF: worker exited
+
+    def request(self, job: dict, timeout: float) -> Optional[dict]:
+        """Sends a job and waits for its reply. Raises queue.Empty on timeout, returns None if the worker died."""
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+        return self.replies.get(timeout=timeout)
+
+    def stop(self, force: bool = False):
+        if not force:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+
+class RenderService:
+    """Persistent process pool that renders section documents in the background."""
+
+    def __init__(self, workers: Optional[int] = None, timeout: Optional[float] = None):
+        workers = workers or settings.get_int("RENDER_WORKERS", 2)
+        self.timeout = timeout or settings.get_float("RENDER_TIMEOUT_S", 120)
+        self.job_ttl = settings.get_float("RENDER_JOB_TTL_S", 3600)
+        self.max_jobs = settings.get_int("RENDER_MAX_JOBS", 1000)
+        self.jobs: Dict[str, dict] = {}
+        self._finished: Deque[str] = deque()  # ids of finished jobs, oldest first
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._lock = threading.Lock()
+        self._dispatchers = []
+        self._closed = False
+
+        for i, jobs in enumerate(self._queues):
+            dispatcher = threading.Thread(target=self._dispatch, args=(jobs,), name=f"render-dispatcher-{i}",
+                                          daemon=True)
+            dispatcher.start()
+            self._dispatchers.append(dispatcher)
+
+    @staticmethod
+    def _start_worker() -> Optional[_Worker]:
+        try:
+            return _Worker()
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.error(f"[RENDER] Could not start a render worker: {e}")
+            return None
+
+    def _dispatch(self, jobs: queue.Queue):
+        worker = self._start_worker()
+        while True:
+            job_id = jobs.get()
+            if job_id is None:
+                if worker is not None:
+                    worker.stop()
+                return
+
+            job = self.jobs[job_id]
+            job["status"] = "rendering"
+            job["started_at"] = time.time()
+
+            if worker is None:
+                # Retried for every job, so the service recovers once workers can start again
+                worker = self._start_worker()
+            if worker is None:
+                self._finish(job_id, "failed", "Render worker could not be started")
+                continue
+
+            try:
+                reply = worker.request(
+                    {"title": job["title"], "sections": job["sections"], "path": job["path"]},
+                    job["timeout"]
+                )
+            except queue.Empty:
+                reply = {"status": "timed_out", "error": f"Rendering exceeded {job['timeout']}s"}
+            except OSError:
+                # Broken pipe: the worker is gone
+                reply = None
+
+            if reply is None:
+                reply = {"status": "failed", "error": "Render worker crashed"}
+
+            if reply["status"] == "ok":
+                job["rendered_sections"] = reply.get("rendered_sections")
+                self._finish(job_id, "done")
+            else:
+                # The worker is stuck or gone; replace it
+                if reply["status"] != "error":
+                    worker.stop(force=True)
+                    worker = self._start_worker()
+                self._finish(job_id, "failed" if reply["status"] == "error" else reply["status"], reply["error"])
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None):
+        job = self.jobs[job_id]
+        job["finished_at"] = time.time()
+        job["error"] = error
+        # Sections are only needed while rendering
+        job.pop("sections", None)
+        with self._lock:
+            self._finished.append(job_id)
+            self._prune()
+        # Set last, so a job seen finished is already counted for pruning
+        job["status"] = status
+
+        on_done = job.pop("on_done", None)
+        if on_done is not None:
+            try:
+                on_done(self.status(job_id))
+            except Exception:
+                logger.exception(f"[RENDER] on_done callback of job {job_id} failed")
+
+    def _prune(self):
+        """Forgets finished jobs past their TTL or beyond max_jobs (call with the lock held)."""
+        expired = time.time() - self.job_ttl
+        while self._finished and (len(self._finished) > self.max_jobs
+                                  or self.jobs[self._finished[0]]["finished_at"] < expired):
+            self.jobs.pop(self._finished.popleft(), None)
+
+    def submit(self, title: str, sections: List[dict], path: str, timeout: Optional[float] = None,
+               on_done: Optional[Callable[[dict], None]] = None, affinity: Optional[str] = None) -> str:
+        """
+        Queues a render job and returns its handle (job id) immediately.
+        on_done is called from the dispatcher thread with the job status once it finishes.
+        Jobs with the same affinity key are rendered by the same worker.
+        """
+        if self._closed:
+            raise RuntimeError("Render service is shut down")
+
+        with self._lock:
+            self._prune()
+        job_id = str(uuid.uuid4())
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "title": title,
+            "sections": sections,
+            "path": str(path),
+            "timeout": timeout or self.timeout,
+            "submitted_at": time.time(),
+            "error": None,
+            "on_done": on_done,
+        }
+        if affinity is not None:
+            jobs = self._queues[zlib.crc32(affinity.encode("utf-8")) % len(self._queues)]
+        else:
+            jobs = min(self._queues, key=lambda q: q.qsize())
+        jobs.put(job_id)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """Public view of a job (None if unknown)."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return {k: v for k, v in job.items() if k not in ("sections", "title", "on_done")}
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Blocks until the job leaves the queue/rendering states (or timeout)."""
+        deadline = time.time() + timeout if timeout else None
+        while self.jobs.get(job_id, {}).get("status") in ("queued", "rendering"):
+            if deadline and time.time() > deadline:
+                break
+            time.sleep(0.01)
+        return self.status(job_id)
+
+    def shutdown(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for jobs in self._queues:
+            jobs.put(None)
+        for dispatcher in self._dispatchers:
+            dispatcher.join(timeout=10)
+
+
+_render_service: Optional[RenderService] = None
+_render_service_lock = threading.Lock()
+
+
+def get_render_service(start: bool = True) -> Optional[RenderService]:
+    """Process-wide render service, started on first use (None if not started and start is False)."""
+    global _render_service
+    with _render_service_lock:
+        if _render_service is None and start:
+            _render_service = RenderService()
+            atexit.register(_render_service.shutdown)
+        return _render_service
@@ -0,0 +1,68 @@
+"""
+Scripted reviewer answering the human_selective_review interrupts without a human.
+
+In every review round each section under review is rejected with probability
+`reject_rate` (deterministic per seed, section and round) and gets `feedback`.
+After `max_rounds` rounds with rejections everything is approved, so a thread
+always finishes. reject_rate=0 approves everything at the first review.
+
+run_with_reviewer() drives a thread to the end with a reviewer:
+    values = run_with_reviewer(graph, initial_state, config, ScriptedReviewer(reject_rate=0.5))
+"""
+import random
+import re
+from typing import List
+
+from langgraph.types import Command
+
+
+class ScriptedReviewer:
+    """Answers the review questions of one thread; keep one instance per thread."""
+
+    def __init__(self, reject_rate: float = 0.5, max_rounds: int = 1,
+                 feedback: str = "Add a concrete example.", seed: int = 0):
+        self.reject_rate = reject_rate
+        self.max_rounds = max_rounds
+        self.feedback = feedback
+        self.seed = seed
+        self.rounds = 0
+        self.answers = 0
+        self._rejected: List[str] = []
+
+    def answer(self, interrupt: dict) -> str:
+        question = interrupt.get("question", "")
+        self.answers += 1
+
+        if question.startswith("Review complete"):
+            self._rejected = [] if self.rounds >= self.max_rounds else self._pick(interrupt, self.rounds)
+            if not self._rejected:
+                return "y"
+            self.rounds += 1
+            return "n"
+
+        if question.startswith("Enter section name"):
+            if not self._rejected:  # resumed in the middle of a round: the same sections are picked again
+                self._rejected = self._pick(interrupt, self.rounds - 1)
+            return ", ".join(self._rejected)
+
+        if question.startswith("What's wrong"):
+            return self.feedback
+
+        return "y"
+
+    def _pick(self, interrupt: dict, round_no: int) -> List[str]:
+        under_review = re.findall(r"^ Section: (.+)$", interrupt.get("details", ""), re.MULTILINE)
+        return [name for name in under_review
+                if random.Random(f"{self.seed}|{round_no}|{name}").random() < self.reject_rate]
+
+
+def run_with_reviewer(graph, value, config: dict, reviewer: ScriptedReviewer, **stream_kwargs) -> dict:
+    """Runs a thread until it finishes, answering every interrupt with the reviewer; returns the final values."""
+    while True:
+        pending = None
+        for event in graph.stream(value, config, stream_mode="updates", **stream_kwargs):
+            if "__interrupt__" in event:
+                pending = event["__interrupt__"][0].value
+        if pending is None:
+            return graph.get_state(config).values
+        value = Command(resume=reviewer.answer(pending))
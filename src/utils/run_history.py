@@ -0,0 +1,243 @@
+"""
+Append-only columnar store of per-run and per-section outcomes, with vectorized analytics.
+
+Each column is a raw binary file of a fixed NumPy dtype. Appends write to the end of
+every column file; reads map the files with np.memmap, so analytics over millions
+of sections only touch the pages they need and never parse anything.
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.utils import settings
+
+STATUS_CODES = {"auto_approved": 0, "human_reviewed": 1}
+STATUS_OTHER = 2
+
+RUN_COLUMNS = {
+    "run_id": np.int64,
+    "finished_at": np.float64,
+    "latency_s": np.float32,
+    "sections": np.int32,
+    "auto_approved": np.int32,
+    "human_reviewed": np.int32,
+    "revisions": np.int16,
+    "confidence_threshold": np.float32,
+    "max_regen_attempts": np.int16,
+}
+
+SECTION_COLUMNS = {
+    "run_id": np.int64,
+    "section_type": np.uint32,
+    "initial_confidence": np.float32,
+    "final_confidence": np.float32,
+    "status": np.int8,
+    "reviewed": np.bool_,
+    "rejections": np.int16,
+}
+
+
+class ColumnarTable:
+    """Append-only table stored as one binary file per column."""
+
+    def __init__(self, directory: Path, schema: Dict[str, type]):
+        self.directory = Path(directory)
+        self.schema = {name: np.dtype(dtype) for name, dtype in schema.items()}
+        self._lock = threading.Lock()
+
+    def _path(self, column: str) -> Path:
+        return self.directory / f"{column}.bin"
+
+    def append(self, rows: Dict[str, list]):
+        """Appends equally sized column lists; all columns of the schema are required."""
+        arrays = {name: np.asarray(rows[name], dtype=dtype) for name, dtype in self.schema.items()}
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Drop the partial row a crash mid-append may have left, so every column stays aligned
+            n = len(self)
+            for name, dtype in self.schema.items():
+                path = self._path(name)
+                if path.exists() and path.stat().st_size > n * dtype.itemsize:
+                    os.truncate(path, n * dtype.itemsize)
+            for name, array in arrays.items():
+                with open(self._path(name), "ab") as f:
+                    array.tofile(f)
+
+    def __len__(self) -> int:
+        lengths = []
+        for name, dtype in self.schema.items():
+            path = self._path(name)
+            lengths.append(path.stat().st_size // dtype.itemsize if path.exists() else 0)
+        # A crash mid-append can leave columns of different lengths; only complete rows count
+        return min(lengths) if lengths else 0
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory-mapped view of a column (complete rows only)."""
+        n = len(self)
+        if n == 0:
+            return np.zeros(0, dtype=self.schema[name])
+        return np.memmap(self._path(name), dtype=self.schema[name], mode="r", shape=(n,))
+
+    def columns(self, *names: str) -> List[np.ndarray]:
+        return [self.column(name) for name in names]
+
+
+def _type_id(section_type: str) -> int:
+    return zlib.crc32(section_type.encode("utf-8"))
+
+
+class RunHistory:
+    """Run-history store (runs + sections tables) and the analytics API on top of it."""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory) if directory else settings.get_path("RUN_HISTORY_DIR", "run_history")
+        self.runs = ColumnarTable(self.directory / "runs", RUN_COLUMNS)
+        self.sections = ColumnarTable(self.directory / "sections", SECTION_COLUMNS)
+        self._types_path = self.directory / "section_types.json"
+        self._lock = threading.Lock()
+
+    # --------------------WRITE----------------------
+    def record_run(self, state: dict, section_types: List[str]) -> int:
+        """Appends one finished run (from the final AgentState) and returns its run id."""
+        sections = state.get("sections", [])
+        started_at = state.get("started_at") or time.time()
+
+        with self._lock:
+            run_id = len(self.runs)
+            self._register_types(section_types)
+
+            self.sections.append({
+                "run_id": [run_id] * len(sections),
+                "section_type": [_type_id(t) for t in section_types],
+                "initial_confidence": [s.get("initial_confidence", s.get("confidence", 0.0)) for s in sections],
+                "final_confidence": [s.get("confidence", 0.0) for s in sections],
+                "status": [STATUS_CODES.get(s.get("status"), STATUS_OTHER) for s in sections],
+                "reviewed": [s.get("reviewed", False) for s in sections],
+                "rejections": [s.get("rejections", 0) for s in sections],
+            })
+            self.runs.append({
+                "run_id": [run_id],
+                "finished_at": [time.time()],
+                "latency_s": [time.time() - started_at],
+                "sections": [len(sections)],
+                "auto_approved": [sum(1 for s in sections if s.get("status") == "auto_approved")],
+                "human_reviewed": [sum(1 for s in sections if s.get("status") == "human_reviewed")],
+                "revisions": [state.get("revision_count", 0)],
+                "confidence_threshold": [state.get("confidence_threshold", 0.8)],
+                "max_regen_attempts": [state.get("max_regen_attempts", 3)],
+            })
+        return run_id
+
+    def _register_types(self, section_types: List[str]):
+        names = self.section_type_names()
+        new = {str(_type_id(t)): t for t in section_types if str(_type_id(t)) not in names}
+        if new:
+            names.update(new)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self._types_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(names), encoding="utf-8")
+            os.replace(tmp, self._types_path)
+
+    def section_type_names(self) -> Dict[str, str]:
+        if self._types_path.exists():
+            return json.loads(self._types_path.read_text(encoding="utf-8"))
+        return {}
+
+    # --------------------ANALYTICS----------------------
+    def summary(self, percentiles=(50, 90, 95, 99)) -> dict:
+        """Automation rate, revision distribution and latency percentiles over the whole history."""
+        status, = self.sections.columns("status")
+        revisions, latency = self.runs.columns("revisions", "latency_s")
+
+        total = len(status)
+        auto = int(np.count_nonzero(status == STATUS_CODES["auto_approved"]))
+
+        return {
+            "runs": len(revisions),
+            "sections": total,
+            "automation_rate": auto / total if total else 0.0,
+            "revision_distribution": np.bincount(revisions.astype(np.int64)).tolist() if len(revisions) else [],
+            "latency_percentiles_s": dict(zip(
+                [f"p{p}" for p in percentiles],
+                np.percentile(latency, percentiles).round(3).tolist() if len(latency) else [None] * len(percentiles)
+            )),
+        }
+
+    def by_section_type(self) -> Dict[str, dict]:
+        """Per section type: count, automation rate and rejection rate of reviewed sections."""
+        type_ids, status, reviewed, rejections = self.sections.columns("section_type", "status", "reviewed", "rejections")
+        if not len(type_ids):
+            return {}
+
+        unique, inverse = np.unique(type_ids, return_inverse=True)
+        counts = np.bincount(inverse)
+        auto = np.bincount(inverse, weights=status == STATUS_CODES["auto_approved"])
+        n_reviewed = np.bincount(inverse, weights=reviewed)
+        rejected = np.bincount(inverse, weights=rejections > 0)
+
+        names = self.section_type_names()
+        return {
+            names.get(str(type_id), str(type_id)): {
+                "sections": int(count),
+                "automation_rate": float(a / count),
+                "review_rejection_rate": float(r / n) if n else None,
+            }
+            for type_id, count, a, n, r in zip(unique, counts, auto, n_reviewed, rejected)
+        }
+
+    def simulate(self, confidence_threshold: float, max_regen_attempts: int) -> dict:
+        """
+        What-if replay of the history under a different threshold / regeneration limit.
+
+        A section is auto-approved if its initial confidence clears the threshold; otherwise
+        it is reviewed and needs as many cycles as it was historically rejected (capped at
+        max_regen_attempts). Sections that were never reviewed are assumed to be approved
+        on first review (reported as unobserved_reviews).
+        """
+        run_ids, confidence, reviewed, rejections = self.sections.columns(
+            "run_id", "initial_confidence", "reviewed", "rejections")
+        total = len(run_ids)
+        if not total:
+            return {"sections": 0}
+
+        auto = confidence >= confidence_threshold
+        needs_review = ~auto
+        cycles = np.where(needs_review, np.minimum(rejections, max_regen_attempts), 0)
+
+        # Revision cycles per run = most cycles any of its sections needed
+        # (a run's sections are appended together, so each run is one contiguous block)
+        starts = np.flatnonzero(np.r_[True, run_ids[1:] != run_ids[:-1]])
+        run_cycles = np.maximum.reduceat(cycles, starts).astype(np.int64)
+
+        # Rejection rate of auto-approved sections, where the human outcome is known
+        auto_observed = auto & reviewed
+        auto_rejected = auto_observed & (rejections > 0)
+
+        return {
+            "confidence_threshold": confidence_threshold,
+            "max_regen_attempts": max_regen_attempts,
+            "sections": total,
+            "automation_rate": float(auto.mean()),
+            "human_reviews": int(needs_review.sum()),
+            "unobserved_reviews": int((needs_review & ~reviewed).sum()),
+            "mean_revision_cycles": float(run_cycles.mean()),
+            "revision_distribution": np.bincount(run_cycles).tolist(),
+            "auto_approved_rejection_rate": float(auto_rejected.sum() / auto_observed.sum()) if auto_observed.any() else None,
+        }
+
+
+_run_history: Optional[RunHistory] = None
+
+
+def get_run_history() -> RunHistory:
+    """Process-wide run-history store (created lazily under RUN_HISTORY_DIR)."""
+    global _run_history
+    if _run_history is None:
+        _run_history = RunHistory()
+    return _run_history
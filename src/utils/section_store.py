@@ -0,0 +1,304 @@
+"""
+Content-addressed store for section text, with per-section version history.
+
+Section content is interned once under its hash (blake2b, 32 hex chars), compressed
+with zstd when available (zlib otherwise) above COMPRESS_MIN_BYTES. A thread keeps
+only the list of content hashes per section (`section_versions`), which gives the
+full version history for a few bytes per revision, diffs between any two versions
+and rollback. The checkpointer stores section content as hashes too, through
+InterningSerializer, so unchanged sections are not stored again on every superstep.
+
+Blobs are referenced per thread: content stored or read while the checkpointer works
+for a thread (see section_owner), or by a graph node of the thread, is held by it. When a thread is deleted its
+references are released, and blobs no thread references any more leave memory (files
+in the mirror directory are kept).
+"""
+import contextvars
+import difflib
+import hashlib
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.runnables.config import var_child_runnable_config
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.utils import settings
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is used instead
+    zstandard = None
+
+COMPRESS_MIN_BYTES = 256
+
+# One-byte codec tag in front of every stored blob
+_RAW, _ZLIB, _ZSTD = b"r", b"z", b"s"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+_owner: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("section_owner", default=None)
+
+
+def _current_owner() -> Optional[str]:
+    """Thread set by section_owner, else the thread of the graph node being run (record_versions)."""
+    owner = _owner.get()
+    if owner is None:
+        config = var_child_runnable_config.get()
+        if config:
+            owner = config.get("configurable", {}).get("thread_id")
+    return owner
+
+
+@contextmanager
+def section_owner(thread_id: Optional[str]):
+    """Blobs stored or read in the block are held by the thread until it is released."""
+    token = _owner.set(thread_id)
+    try:
+        yield
+    finally:
+        _owner.reset(token)
+
+
+class SectionStore:
+    """
+    Thread-safe hash -> text blob store (in memory, optionally mirrored to a directory).
+    directory_setting names a setting holding the directory instead, read on first use.
+    """
+
+    def __init__(self, directory: Optional[str] = None, compression: str = "auto",
+                 directory_setting: Optional[str] = None):
+        self.directory = Path(directory) if directory else None
+        self.directory_setting = directory_setting
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "zlib"
+        self.compression = compression
+        self._blobs: Dict[str, bytes] = {}
+        self._owned: Dict[str, Set[str]] = {}  # thread id -> hashes it references
+        self._holders: Dict[str, int] = {}  # hash -> number of threads referencing it
+        self._lock = threading.Lock()
+        # zstd (de)compressor objects must not be shared between threads
+        self._local = threading.local()
+        self.raw_bytes = 0
+        self.evicted = 0
+
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def mirror_to(self, directory: str):
+        """Mirrors blobs to a directory from now on (blobs already stored are written too)."""
+        with self._lock:
+            self.directory = Path(directory)
+            self.directory_setting = None
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for key, blob in self._blobs.items():
+                path = self._blob_path(key)
+                if not path.exists():
+                    path.parent.mkdir(exist_ok=True)
+                    path.write_bytes(blob)
+
+    def _configure(self):
+        if self.directory_setting is None:
+            return
+        with self._lock:
+            if self.directory_setting is not None:
+                directory = settings.get_str(self.directory_setting)
+                self.directory_setting = None
+                if directory:
+                    self.directory = Path(directory)
+                    self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _zstd(self):
+        if not hasattr(self._local, "compressor"):
+            self._local.compressor = zstandard.ZstdCompressor(level=3)
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local
+
+    def _encode(self, data: bytes) -> bytes:
+        if len(data) < COMPRESS_MIN_BYTES or self.compression == "none":
+            return _RAW + data
+        if self.compression == "zstd":
+            return _ZSTD + self._zstd().compressor.compress(data)
+        return _ZLIB + zlib.compress(data, 6)
+
+    def _decode(self, blob: bytes) -> str:
+        codec, data = blob[:1], blob[1:]
+        if codec == _ZSTD:
+            data = self._zstd().decompressor.decompress(data)
+        elif codec == _ZLIB:
+            data = zlib.decompress(data)
+        return data.decode("utf-8")
+
+    def _blob_path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def put(self, text: str) -> str:
+        """Stores the text (once) and returns its hash."""
+        self._configure()
+        key = content_hash(text)
+        with self._lock:
+            if key in self._blobs:
+                self._hold(key)
+                return key
+
+        data = text.encode("utf-8")
+        blob = self._encode(data)
+        with self._lock:
+            if key not in self._blobs:
+                self._blobs[key] = blob
+                self.raw_bytes += len(data)
+                if self.directory:
+                    path = self._blob_path(key)
+                    path.parent.mkdir(exist_ok=True)
+                    path.write_bytes(blob)
+            self._hold(key)
+        return key
+
+    def get(self, key: str) -> str:
+        self._configure()
+        with self._lock:
+            blob = self._blobs.get(key)
+        if blob is None and self.directory and self._blob_path(key).exists():
+            blob = self._blob_path(key).read_bytes()
+            with self._lock:
+                self._blobs[key] = blob
+        if blob is None:
+            raise KeyError(f"Unknown section content hash '{key}'")
+        if _current_owner() is not None:
+            with self._lock:
+                self._hold(key)
+        return self._decode(blob)
+
+    # --------------------REFERENCES----------------------
+    def _hold(self, key: str):
+        """Records that the current owner thread references the blob (call with the lock held)."""
+        owner = _current_owner()
+        if owner is None:
+            return
+        keys = self._owned.setdefault(owner, set())
+        if key not in keys:
+            keys.add(key)
+            self._holders[key] = self._holders.get(key, 0) + 1
+
+    def share(self, thread_id: str, new_thread_id: str):
+        """The new thread (a fork) references everything the thread references."""
+        with self._lock:
+            keys = self._owned.setdefault(new_thread_id, set())
+            for key in self._owned.get(thread_id, ()):
+                if key not in keys:
+                    keys.add(key)
+                    self._holders[key] = self._holders.get(key, 0) + 1
+
+    def release(self, thread_id: str) -> int:
+        """Drops a deleted thread's references; returns how many blobs left memory as a result."""
+        evicted = 0
+        with self._lock:
+            for key in self._owned.pop(thread_id, ()):
+                self._holders[key] -= 1
+                if self._holders[key]:
+                    continue
+                del self._holders[key]
+                blob = self._blobs.pop(key, None)
+                if blob is not None:
+                    self.raw_bytes -= len(self._decode(blob).encode("utf-8"))
+                    evicted += 1
+            self.evicted += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "blobs": len(self._blobs),
+                "raw_bytes": self.raw_bytes,
+                "stored_bytes": sum(len(b) for b in self._blobs.values()),
+                "threads": len(self._owned),
+                "evicted": self.evicted,
+                "compression": self.compression,
+            }
+
+
+section_store = SectionStore(directory_setting="SECTION_STORE_DIR")  # unset: blobs are kept in memory only
+
+
+# --------------------VERSION HISTORY----------------------
+def record_versions(sections: List[dict], versions: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Interns the current content of every section; a new hash is appended only if the content changed."""
+    versions = {name: list(hashes) for name, hashes in versions.items()}
+    for section in sections:
+        key = section_store.put(section.get("content", ""))
+        history = versions.setdefault(section["name"], [])
+        if not history or history[-1] != key:
+            history.append(key)
+    return versions
+
+
+def get_version(versions: Dict[str, List[str]], section_name: str, version: int) -> str:
+    """Content of a section at a version index (negative indices count from the latest)."""
+    history = versions.get(section_name)
+    if not history:
+        raise KeyError(f"No version history for section '{section_name}'")
+    return section_store.get(history[version])
+
+
+def diff_versions(versions: Dict[str, List[str]], section_name: str, from_version: int = -2, to_version: int = -1) -> str:
+    """Unified diff between two versions of a section."""
+    old = get_version(versions, section_name, from_version)
+    new = get_version(versions, section_name, to_version)
+    return "".join(difflib.unified_diff(
+        old.splitlines(keepends=True), new.splitlines(keepends=True),
+        fromfile=f"{section_name}@v{from_version}", tofile=f"{section_name}@v{to_version}"
+    ))
+
+
+# --------------------CHECKPOINT SERDE----------------------
+def _is_section(value: Any) -> bool:
+    return isinstance(value, dict) and "name" in value and isinstance(value.get("content"), str)
+
+
+def intern_sections(value: Any) -> Any:
+    """Copy of a value where every section dict carries `content_ref` (a hash) instead of `content`."""
+    if _is_section(value):
+        interned = {k: v for k, v in value.items() if k != "content"}
+        interned["content_ref"] = section_store.put(value["content"])
+        return interned
+    if isinstance(value, dict):
+        return {k: intern_sections(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [intern_sections(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(intern_sections(v) for v in value)
+    return value
+
+
+def resolve_sections(value: Any) -> Any:
+    """Inverse of intern_sections."""
+    if isinstance(value, dict):
+        if "content_ref" in value and "name" in value:
+            resolved = {k: v for k, v in value.items() if k != "content_ref"}
+            resolved["content"] = section_store.get(value["content_ref"])
+            return resolved
+        return {k: resolve_sections(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_sections(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(resolve_sections(v) for v in value)
+    return value
+
+
+class InterningSerializer(SerializerProtocol):
+    """Checkpoint serializer that stores section content as content hashes (wraps another serializer)."""
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None):
+        self.inner = inner or JsonPlusSerializer()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.inner.dumps_typed(intern_sections(obj))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return resolve_sections(self.inner.loads_typed(data))
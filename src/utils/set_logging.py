@@ -1,30 +1,252 @@
+"""
+Non-blocking structured logging.
+
+Callers only put records on a bounded in-memory queue (QueueHandler); a listener
+thread formats them and does the disk I/O and rotation, writing whatever has queued
+up with one write and one flush. When the queue is full, records are dropped and
+counted (dropped_records()) instead of blocking graph workers.
+
+Records are JSON lines with the bound context (thread_id, node) attached
+automatically; bind_log_context() binds it for a block. %-style arguments that are
+plain values are formatted on the listener thread, so
+    logger.info("[AGENT] Patched '%s'", name)
+costs the caller almost nothing. Messages longer than LOG_MAX_MESSAGE_CHARS are
+truncated. LOG_FORMAT=text writes the previous plain-text lines instead.
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Optional
 
-import logging
-from logging.handlers import RotatingFileHandler
+from src.utils import settings
+from src.utils.nodes import NodeCall, node_thread_id
 
 # -------------------------LOGGING---------------------------------
-LOG_DIR = Path("../logs")
-LOG_DIR.mkdir(exist_ok=True)
+# Settings, read on first use: LOG_DIR (logs/ under the repository), LOG_FORMAT ("json" or
+# "text"), LOG_QUEUE_SIZE (10000), LOG_MAX_MESSAGE_CHARS (2000)
+
+
+def log_dir() -> Path:
+    return settings.get_path("LOG_DIR", "logs")
+
+
+# Values that cannot change after the call, so formatting them later is safe
+_PLAIN = (str, int, float, bool, type(None))
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that drains the queue in batches and writes each batch to a file handler at once."""
+    max_batch = 512
+    processed = 0
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.max_batch and batch[-1] is not self._sentinel:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            records = [r for r in batch if r is not self._sentinel]
+            if records:
+                for handler in self.handlers:
+                    self._write(handler, records)
+            self.processed += len(records)
+            if batch[-1] is self._sentinel:
+                return
+
+    @staticmethod
+    def _write(handler: logging.Handler, records):
+        if not isinstance(handler, logging.FileHandler) or handler.stream is None:
+            for record in records:
+                handler.handle(record)
+            return
+        try:
+            text = "".join(handler.format(record) + handler.terminator for record in records)
+            with handler.lock:
+                # One size check per batch instead of RotatingFileHandler's per-record check
+                if isinstance(handler, RotatingFileHandler) and handler.maxBytes > 0 \
+                        and handler.stream.tell() + len(text) >= handler.maxBytes and handler.stream.tell() > 0:
+                    handler.doRollover()
+                handler.stream.write(text)
+                handler.stream.flush()
+        except Exception:
+            handler.handleError(records[-1])
 
-LOG_FILE = LOG_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
 
 logger = logging.getLogger("langgraph-agent")
-logger.setLevel(logging.DEBUG)
-
-file_handler = RotatingFileHandler(
-    LOG_FILE,
-    maxBytes=1_000_000,  # 1MB
-    backupCount=5
-)
-
-formatter = logging.Formatter(
-    "%(asctime)s | %(levelname)-5s | %(name)s | %(message)s"
-)
-file_handler.setFormatter(formatter)
-
-logger.addHandler(file_handler)
-logger.propagate = False
-logger.info("[INFO] Logging started.")
+
+# The module can be imported as both utils.set_logging and src.utils.set_logging; both copies
+# share the context variable and the handler, which are kept on the logger
+if not hasattr(logger, "_log_context"):
+    logger._log_context = contextvars.ContextVar("log_context", default={})
+_log_context: contextvars.ContextVar[dict] = logger._log_context
+
+
+@contextmanager
+def bind_log_context(**fields):
+    """Adds fields (e.g. thread_id, node) to every record logged in the block."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def truncate(text: str, limit: Optional[int] = None) -> str:
+    if limit is None:
+        limit = settings.get_int("LOG_MAX_MESSAGE_CHARS", 2000)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, max_chars: Optional[int] = None):
+        super().__init__()
+        self.max_chars = max_chars or settings.get_int("LOG_MAX_MESSAGE_CHARS", 2000)
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": truncate(record.getMessage(), self.max_chars),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, max_chars: Optional[int] = None):
+        super().__init__("%(asctime)s | %(levelname)-5s | %(name)s | %(message)s")
+        self.max_chars = max_chars or settings.get_int("LOG_MAX_MESSAGE_CHARS", 2000)
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.msg, record.args = truncate(record.getMessage(), self.max_chars), None
+        line = super().format(record)
+        context = getattr(record, "context", None)
+        return f"{line} | {json.dumps(context, default=str)}" if context else line
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Enqueues without blocking: binds the context, drops the record when the queue is full."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: Optional[int] = None):
+        super().__init__(log_queue)
+        self.max_size = max_size  # None: LOG_QUEUE_SIZE, read on the first record
+        self.dropped = 0
+        self._enqueued = itertools.count(1)
+        self.enqueued = 0
+
+    def handle(self, record: logging.LogRecord):
+        # No handler lock: preparing a record touches no shared state and SimpleQueue is thread-safe
+        if self.filter(record):
+            self.emit(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.context = _log_context.get()
+        if record.args and not all(isinstance(a, _PLAIN) for a in
+                                   (record.args.values() if isinstance(record.args, dict) else record.args)):
+            # Arguments may be mutated after the call returns; format them now
+            record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.max_size is None:
+            self.max_size = settings.get_int("LOG_QUEUE_SIZE", 10000)
+        # SimpleQueue (C, lock-free put) has no maxsize; the bound is checked here and is approximate
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put(record)
+        self.enqueued = next(self._enqueued)
+
+
+# Importing has no side effects: the log directory, file and writer thread are created by
+# start_logging(), called by the entry points only. Records logged before that wait in the
+# queue (up to LOG_QUEUE_SIZE) and are written once logging starts
+if not hasattr(logger, "_queue_handler"):
+    logger.setLevel(logging.DEBUG)
+    logger._queue_handler = BoundedQueueHandler(queue.SimpleQueue())
+    logger._listener = None
+    logger._start_lock = threading.Lock()
+    logger.addHandler(logger._queue_handler)
+    logger.propagate = False
+
+
+def start_logging(handler: Optional[logging.Handler] = None):
+    """
+    Starts the writer thread (no-op if already started). Records go to a new file in LOG_DIR,
+    or to the given handler instead (tests pass logging.NullHandler() to write no files).
+    """
+    with logger._start_lock:
+        if logger._listener is not None:
+            return
+        if handler is None:
+            directory = log_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                directory / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.log",
+                maxBytes=1_000_000,  # 1MB
+                backupCount=5
+            )
+            handler.setFormatter(JsonFormatter() if settings.get_str("LOG_FORMAT", "json") == "json"
+                                 else TextFormatter())
+
+        listener = BatchingQueueListener(logger._queue_handler.queue, handler)
+        listener.start()
+        logger._listener = listener
+        atexit.register(stop_logging)
+    logger.info("[INFO] Logging started.")
+
+
+def dropped_records() -> int:
+    """Records dropped because the log queue was full."""
+    return logger._queue_handler.dropped
+
+
+def log_queue_depth() -> int:
+    """Records waiting to be written."""
+    return logger._queue_handler.queue.qsize()
+
+
+def flush_logs(timeout: float = 5.0):
+    """Waits until the listener has written every queued record (or timeout)."""
+    if logger._listener is None:
+        return
+    target = logger._queue_handler.enqueued
+    deadline = time.monotonic() + timeout
+    while logger._listener.processed < target and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def stop_logging():
+    """Writes the queued records and stops the listener thread."""
+    listener = logger._listener
+    if listener is None or listener._thread is None:
+        return
+    listener.queue.put(listener._sentinel)
+    listener._thread.join()
+    listener._thread = None
+
+
+def log_context(name: str, state, config, call: NodeCall):
+    """Node middleware (see src/utils/nodes.py): everything the node logs carries the thread id and node name."""
+    with bind_log_context(thread_id=node_thread_id(config), node=name):
+        return call()
 # -----------------------------------------------------------------
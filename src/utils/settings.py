@@ -0,0 +1,59 @@
+"""
+Settings from the environment, read when they are first used rather than at import.
+
+Every getter loads the repository's .env first (once per process, without overriding
+variables that are already set; ENV_FILE points at another file), so a setting gets
+its .env value whichever entry point started the process and in whatever order the
+modules were imported.
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Repository root (src/utils/settings.py -> ../..)
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env():
+    """Loads .env into the environment (no-op after the first call)."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv(os.environ.get("ENV_FILE") or REPO_ROOT / ".env")
+            _env_loaded = True
+
+
+def get_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    load_env()
+    value = os.environ.get(name)
+    return default if value in (None, "") else value
+
+
+def get_int(name: str, default: int) -> int:
+    value = get_str(name)
+    return default if value is None else int(value)
+
+
+def get_float(name: str, default: float) -> float:
+    value = get_str(name)
+    return default if value is None else float(value)
+
+
+def get_flag(name: str, default: bool) -> bool:
+    """On unless set to "0" (or off unless set, with default=False)."""
+    value = get_str(name)
+    return default if value is None else value != "0"
+
+
+def get_path(name: str, default: str) -> Path:
+    """Path setting; a relative default is relative to the repository root, not the working directory."""
+    value = get_str(name)
+    return Path(value) if value is not None else REPO_ROOT / default
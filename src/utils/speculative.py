@@ -0,0 +1,71 @@
+import json
+from typing import List, Optional
+
+from src.utils.text import strip_code_fence
+
+# Temperatures used for alternative candidates (cycled when more candidates are requested)
+SPECULATIVE_TEMPERATURES = [0.2, 0.6, 0.9, 1.1]
+
+
+# --------------------PROMPT----------------------
+def build_candidate_prompt(user_prompt: str, section: dict, learned_rules: List[str],
+                           specific_rules: List[str]) -> str:
+    """Prompt asking for an alternative draft of a single low-confidence section."""
+    return f"""
+You are an expert content generator for technical documentation.
+
+Write an alternative version of ONE section of a document.
+
+User request for the whole document: {user_prompt}
+
+Section: {section['name']}
+
+Current draft:
+{section['content']}
+
+Why the current draft is uncertain:
+{section.get('reasoning', 'N/A')}
+
+Resolve that uncertainty where you can and self-assess your confidence (0.0 to 1.0 scale).
+
+Global rules to follow:
+{chr(10).join('- ' + rule for rule in learned_rules) if learned_rules else '- None'}
+
+Section-specific rules for '{section['name']}':
+{chr(10).join('- ' + rule for rule in specific_rules) if specific_rules else '- None'}
+
+Respond ONLY with valid JSON:
+{{
+    "content": "section content here",
+    "confidence": 0.XX,
+    "reasoning": "why this confidence"
+}}
+"""
+
+
+# --------------------SCORING----------------------
+def parse_candidate(response_text: str) -> Optional[dict]:
+    """Parses a candidate response, returns None if it is not usable."""
+    try:
+        result = json.loads(strip_code_fence(response_text))
+        content = str(result["content"]).strip()
+        confidence = float(result["confidence"])
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None
+
+    if not content:
+        return None
+
+    return {
+        "content": content,
+        "confidence": max(0.0, min(1.0, confidence)),
+        "reasoning": result.get("reasoning", "Speculative candidate"),
+    }
+
+
+def pick_best_candidate(candidates: List[Optional[dict]]) -> Optional[dict]:
+    """Returns the highest scoring valid candidate (score = self-reported confidence)."""
+    valid = [c for c in candidates if c is not None]
+    if not valid:
+        return None
+    return max(valid, key=lambda c: c["confidence"])
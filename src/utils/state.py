@@ -1,9 +1,16 @@
-from typing import TypedDict, List, Annotated, Optional
+import time
+from typing import Dict, TypedDict, List, Annotated, Optional
 
 from langgraph.graph import add_messages
 
 
+# render_mode of threads that do not choose one
+DEFAULT_RENDER_MODE = "pooled"
+
+
 #--------------------STATE----------------------
+# Checkpoints are schema-versioned: when a stored field changes shape, bump SCHEMA_VERSION
+# in src/utils/checkpoint_serde.py and register a migration for older checkpoints
 class AgentState(TypedDict):
     # logs: List[dict]
     prompt: str
@@ -41,5 +48,68 @@ class AgentState(TypedDict):
     human_review_count: int
     confidence_threshold: float
     max_regen_attempts: int
+    started_at: float
+    render_mode: str
+    render_job: Optional[str]
+    export_formats: List[str]
+    preview_renders: bool
+    section_versions: Dict[str, List[str]]
+    streamed_sections: List[str]
+
+    reflection_mode: str
+    reflection_token_budget: int
+    regeneration_mode: str
+    calibrated_routing: bool
+
+    speculative_candidates: int
+    speculative_max_calls: int
+    speculative_calls_used: int
+    speculative_tokens_used: int
+    speculative_reviews_avoided: int
+
+    token_usage: Dict[str, Dict[str, dict]]  # node -> revision -> usage (see src/utils/usage.py)
+    token_budget: int  # 0 = unlimited
 
 #-----------------------------------------------
+
+
+def default_initial_state(prompt: str, confidence_threshold: float, max_regen_attempts: int, **settings):
+    """Initial graph state; extra keyword settings (e.g. reflection_mode) override the defaults."""
+    state = {
+        "prompt": prompt,
+        "messages": [],
+        "sections": [],
+        "high_confidence_sections": [],
+        "review_req_sections": [],
+        "approved_sections": [],
+        "rejected_sections": [],
+        "section_feedback": {},
+        "section_rules": {},
+        "mistakes": [],
+        "revision_count": 0,
+        "auto_approval_count": 0,
+        "human_review_count": 0,
+        "confidence_threshold": confidence_threshold,  # Sections with confidence >= threshold are auto-approved
+        "max_regen_attempts": max_regen_attempts,  # Maximum regeneration cycles
+        "reflection_mode": "batched",  # "batched" (single structured call) or "per_section"
+        "reflection_token_budget": 12000,  # Batched reflection falls back to per-section above this
+        "regeneration_mode": "patch",  # "patch" (paragraph edits) or "full" (rewrite whole section)
+        "calibrated_routing": False,  # Route on per-section-type calibrated confidence learned from reviews
+        "speculative_candidates": 0,  # Alternative drafts per low-confidence section (0 = disabled)
+        "speculative_max_calls": 12,  # Max extra speculative LLM calls per thread
+        "speculative_calls_used": 0,
+        "speculative_tokens_used": 0,
+        "speculative_reviews_avoided": 0,
+        "token_usage": {},  # Tokens and cost per node and revision (see usage.py)
+        "token_budget": 0,  # Stop regenerating once the thread used this many tokens (0 = unlimited)
+        "started_at": time.time(),
+        "render_mode": DEFAULT_RENDER_MODE,  # "inline" or "pooled" (background render worker pool)
+        "export_formats": [],  # Extra streamed exports next to DOCX: "markdown", "html", "jsonl"
+        "streamed_sections": [],
+        "preview_renders": False,  # Write a preview document after every regeneration round
+        "section_versions": {},  # Content hashes per section, one per revision (see section_store)
+        "feedback": "",
+        "output": ""
+    }
+    state.update(settings)
+    return state
@@ -0,0 +1,14 @@
+# --------------------TEXT HELPERS----------------------
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for context budgeting."""
+    return len(text) // 4 + 1
+
+
+def strip_code_fence(text: str) -> str:
+    """Removes a surrounding markdown code block (```json ... ```) from a model response."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return text
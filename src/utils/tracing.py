@@ -0,0 +1,406 @@
+"""
+Local span tracing of agent runs, exported to a file without any tracing backend.
+
+Spans:
+  - run:            one graph invocation of a thread (start, or resume after an interrupt)
+  - node:           one graph node execution, with the sections it produced and their confidence
+  - llm:            one model call, with call site, token counts and whether it was coalesced
+  - interrupt_wait: the time a thread waited for a human response
+
+All spans of a thread share one trace id (derived from the thread id), so a
+thread's runs form a single timeline. Node spans attach to the thread's active run
+span; model call spans attach to the node span they are made from.
+
+Finished spans are put on a bounded queue and written in batches by a background
+thread, so recording never blocks on the disk; when the queue is full, spans are
+dropped and counted. TRACE_FORMAT selects the file format: "jsonl" (one span per
+line) or "otlp" (OTLP/JSON ExportTraceServiceRequest per line, as written by the
+OpenTelemetry collector file exporter).
+
+Timeline of a thread:
+    python -m src.utils.tracing timeline <thread_id> [--file PATH] [--width N]
+"""
+import argparse
+import atexit
+import contextvars
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from langgraph.errors import GraphInterrupt
+from langgraph.types import Command
+
+from src.utils import settings
+from src.utils.nodes import NodeCall, node_thread_id
+
+# Settings, read on first use: TRACING_ENABLED ("0" turns tracing off), TRACE_FILE (traces/spans.jsonl
+# under the repository), TRACE_FORMAT ("jsonl" or "otlp"), TRACE_QUEUE_SIZE (10000)
+TRACE_BATCH_SIZE = 256
+TRACE_FLUSH_INTERVAL_S = 1.0
+SERVICE_NAME = "progressive-refinement-agent"
+
+
+def trace_file() -> Path:
+    return settings.get_path("TRACE_FILE", "traces/spans.jsonl")
+
+
+def trace_id_for(thread_id: str) -> str:
+    return hashlib.blake2b(str(thread_id).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, start_ns: Optional[int] = None,
+                 **attributes):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+# --------------------EXPORT----------------------
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span]) -> dict:
+    """OTLP/JSON ExportTraceServiceRequest for a batch of spans."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "src.utils.tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2 if s.status == "error" else 1, "message": s.status},
+            } for s in spans],
+        }],
+    }]}
+
+
+def _from_otlp_value(value: dict):
+    if "arrayValue" in value:
+        return [_from_otlp_value(v) for v in value["arrayValue"].get("values", [])]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return next(iter(value.values()), None)
+
+
+def read_spans(path: Optional[Path] = None) -> Iterator[dict]:
+    """Spans from a trace file (TRACE_FILE by default) in either format, as to_dict() dictionaries."""
+    with open(path or trace_file(), encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "resourceSpans" not in record:
+                yield record
+                continue
+            for resource in record["resourceSpans"]:
+                for scope in resource.get("scopeSpans", []):
+                    for s in scope.get("spans", []):
+                        yield {
+                            "trace_id": s["traceId"],
+                            "span_id": s["spanId"],
+                            "parent_id": s.get("parentSpanId") or None,
+                            "name": s["name"],
+                            "start_ns": int(s["startTimeUnixNano"]),
+                            "end_ns": int(s["endTimeUnixNano"]),
+                            "status": s.get("status", {}).get("message", "ok"),
+                            "attributes": {a["key"]: _from_otlp_value(a["value"]) for a in s.get("attributes", [])},
+                        }
+
+
+class SpanExporter:
+    """
+    Writes finished spans to a file in batches from a background thread; never blocks the caller.
+    Settings not given (TRACE_FILE, TRACE_FORMAT, TRACE_QUEUE_SIZE) are read when the first span is exported.
+    """
+
+    def __init__(self, path: Optional[Path] = None, fmt: Optional[str] = None, max_queue: Optional[int] = None,
+                 batch_size: int = TRACE_BATCH_SIZE, flush_interval: float = TRACE_FLUSH_INTERVAL_S):
+        self.path = Path(path) if path else None
+        self.format = fmt
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self.dropped = 0
+        self._queue: Optional[queue.Queue] = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self.path = self.path or trace_file()
+                self.format = self.format or settings.get_str("TRACE_FORMAT", "jsonl")
+                if self.format not in ("jsonl", "otlp"):
+                    raise ValueError(f"Unknown trace format: {self.format}")
+                self._queue = queue.Queue(maxsize=self.max_queue or settings.get_int("TRACE_QUEUE_SIZE", 10000))
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:  # None: flush now
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._write([s for s in batch if s is not None])
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, spans: List[Span]):
+        if not spans:
+            return
+        if self.format == "otlp":
+            lines = [json.dumps(to_otlp(spans), default=str)]
+        else:
+            lines = [json.dumps(s.to_dict(), default=str) for s in spans]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self.exported += len(spans)
+        except OSError:
+            self.dropped += len(spans)
+
+    def flush(self, timeout: float = 5.0):
+        """Waits until every queued span is written (or timeout)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put_nowait(None)  # wakes a batch waiting for more spans
+        except queue.Full:
+            pass  # a full queue is written in full batches without waiting anyway
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and self._thread.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+# --------------------TRACER----------------------
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self, exporter: SpanExporter, enabled: Optional[bool] = None):
+        self.exporter = exporter
+        self._enabled = enabled
+        self._runs: Dict[str, Span] = {}
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = settings.get_flag("TRACING_ENABLED", True)
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool):
+        self._enabled = enabled
+
+    def _parent(self, thread_id: Optional[str]) -> Optional[Span]:
+        return _current_span.get() or (self._runs.get(thread_id) if thread_id else None)
+
+    def start_span(self, name: str, thread_id: Optional[str] = None, start_ns: Optional[int] = None,
+                   **attributes) -> Span:
+        parent = self._parent(thread_id)
+        if parent is not None:
+            trace_id, thread_id = parent.trace_id, thread_id or parent.attributes.get("thread_id")
+        else:
+            trace_id = trace_id_for(thread_id or os.urandom(8).hex())
+        if thread_id:
+            attributes["thread_id"] = thread_id
+        return Span(name, trace_id, parent.span_id if parent else None, start_ns, **attributes)
+
+    def end_span(self, span: Span, status: Optional[str] = None, end_ns: Optional[int] = None):
+        span.end_ns = end_ns or time.time_ns()
+        if status:
+            span.status = status
+        self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, thread_id: Optional[str] = None, **attributes):
+        """Span around a block; spans started inside the block (same thread or copied context) nest under it."""
+        if not self.enabled:
+            yield None
+            return
+        span = self.start_span(name, thread_id, **attributes)
+        token = _current_span.set(span)
+        status = "ok"
+        try:
+            yield span
+        except GraphInterrupt:
+            status = "interrupted"
+            raise
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span, status)
+
+    @contextmanager
+    def run(self, thread_id: str, **attributes):
+        """
+        Run span of a thread. Node spans find it by thread id rather than through the
+        context, so it also works around async generators and executor threads. Callers
+        may set span.status (e.g. "interrupted") before the block ends.
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = self.start_span("run", thread_id, **attributes)
+        self._runs[thread_id] = span
+        failed = False
+        try:
+            yield span
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if self._runs.get(thread_id) is span:
+                del self._runs[thread_id]
+            self.end_span(span, "error" if failed else None)
+
+    def record(self, name: str, thread_id: str, start_s: float, end_s: float, **attributes):
+        """A span that already happened, e.g. an interrupt wait measured across requests."""
+        if not self.enabled:
+            return
+        span = Span(name, trace_id_for(thread_id), None, int(start_s * 1e9), thread_id=thread_id, **attributes)
+        self.end_span(span, end_ns=int(end_s * 1e9))
+
+
+tracer = Tracer(SpanExporter())
+atexit.register(tracer.exporter.flush)
+
+
+def _section_attributes(result) -> dict:
+    update = result.update if isinstance(result, Command) else result
+    if not isinstance(update, dict):
+        return {}
+    attributes = {}
+    if isinstance(result, Command) and result.goto:
+        attributes["goto"] = [getattr(g, "node", g) for g in (result.goto if isinstance(result.goto, (list, tuple))
+                                                               else [result.goto])]
+    sections = update.get("sections")
+    if sections:
+        attributes["sections"] = [s["name"] for s in sections]
+        attributes["confidence"] = [round(float(s.get("confidence", 0.0)), 3) for s in sections]
+    return attributes
+
+
+def node_span(name: str, state, config, call: NodeCall):
+    """Node middleware (see src/utils/nodes.py): a span carrying the sections the node returned and their confidence."""
+    with tracer.span(name, node_thread_id(config), kind="node", revision=state.get("revision_count", 0)) as span:
+        result = call()
+        if span is not None:
+            span.set(**_section_attributes(result))
+        return result
+
+
+# --------------------TIMELINE----------------------
+def render_timeline(spans: List[dict], width: int = 60) -> str:
+    """Flame-style text timeline: one row per span, nested under its parent, bar placed on the thread's time axis."""
+    if not spans:
+        return "no spans"
+    start = min(s["start_ns"] for s in spans)
+    end = max(s["end_ns"] for s in spans)
+    scale = width / max(end - start, 1)
+
+    children: Dict[Optional[str], List[dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start_ns"]):
+        children.setdefault(s["parent_id"] if s["parent_id"] in ids else None, []).append(s)
+
+    rows = [f"{'span':<44} {'ms':>9}  |{'timeline':<{width}}|"]
+
+    def walk(parent_id, depth):
+        for s in children.get(parent_id, []):
+            attrs = s["attributes"]
+            label = s["name"] if s["name"] != "llm" else f"llm:{attrs.get('site', '?')}"
+            if "input_tokens" in attrs:
+                label += f" {attrs['input_tokens']}/{attrs['output_tokens']} tok"
+            if attrs.get("coalesced"):
+                label += " (coalesced)"
+            if s["status"] != "ok":
+                label += f" [{s['status']}]"
+            offset = int((s["start_ns"] - start) * scale)
+            length = max(1, int((s["end_ns"] - s["start_ns"]) * scale))
+            bar = " " * offset + "#" * min(length, width - offset)
+            rows.append(f"{('  ' * depth + label)[:44]:<44} {(s['end_ns'] - s['start_ns']) / 1e6:>9.1f}  "
+                        f"|{bar:<{width}}|")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    rows.append(f"total {(end - start) / 1e6:.1f} ms, {len(spans)} spans")
+    return "\n".join(rows)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Render a thread's spans as a timeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    timeline = sub.add_parser("timeline", help="Timeline of one thread")
+    timeline.add_argument("thread_id")
+    timeline.add_argument("--file", help="Trace file (default: TRACE_FILE)")
+    timeline.add_argument("--width", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    trace_id = trace_id_for(args.thread_id)
+    spans = [s for s in read_spans(Path(args.file) if args.file else None) if s["trace_id"] == trace_id]
+    print(render_timeline(spans, args.width))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Per-thread token usage and cost accounting.
+
+Model calls made while a graph node runs are metered (invoke_model calls
+record_usage) and added to the thread's `token_usage` state by the node wrapper:
+
+    token_usage[node][revision] = {"calls", "coalesced", "input_tokens", "output_tokens", "cost_usd"}
+
+where revision is the revision the node started from (0: the initial draft).
+
+A call served by another thread's identical in-flight call (see src/utils/llm.py)
+is counted as coalesced and costs this thread nothing.
+
+Cost uses MODEL_PRICES (USD per million input / output tokens); MODEL_PRICES_JSON
+overrides or extends it, e.g. '{"gpt-4o": [2.5, 10.0]}'. Unknown models cost 0.
+"""
+import contextvars
+import json
+import threading
+from typing import Dict, Optional
+
+from langgraph.types import Command
+
+from src.utils import settings
+from src.utils.nodes import NodeCall
+
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+_prices_loaded = False
+
+USAGE_FIELDS = ("calls", "coalesced", "input_tokens", "output_tokens", "cost_usd")
+
+
+def call_cost(model_name: Optional[str], input_tokens: int, output_tokens: int) -> float:
+    global _prices_loaded
+    if not _prices_loaded:
+        MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(settings.get_str("MODEL_PRICES_JSON", "{}")).items()})
+        _prices_loaded = True
+    prices = MODEL_PRICES.get(model_name or "")
+    if prices is None:
+        return 0.0
+    return (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000
+
+
+class UsageMeter:
+    """Usage of the model calls made within one node execution (calls may come from several threads)."""
+
+    def __init__(self):
+        self.usage = dict.fromkeys(USAGE_FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, model_name: Optional[str], usage: dict, coalesced: bool):
+        with self._lock:
+            self.usage["calls"] += 1
+            if coalesced:
+                self.usage["coalesced"] += 1
+                return
+            input_tokens = usage.get("input_tokens", 0)
+            output_tokens = usage.get("output_tokens", 0)
+            self.usage["input_tokens"] += input_tokens
+            self.usage["output_tokens"] += output_tokens
+            self.usage["cost_usd"] += call_cost(model_name, input_tokens, output_tokens)
+
+
+_meter: contextvars.ContextVar[Optional[UsageMeter]] = contextvars.ContextVar("usage_meter", default=None)
+
+
+def record_usage(model, response, coalesced: bool = False):
+    """Adds a model call to the running node's meter (no-op outside a metered node)."""
+    meter = _meter.get()
+    if meter is not None:
+        meter.add(getattr(model, "model_name", None), getattr(response, "usage_metadata", None) or {}, coalesced)
+
+
+def add_usage(token_usage: Dict[str, dict], node: str, revision: int, usage: dict) -> Dict[str, dict]:
+    """token_usage with `usage` added under node / revision (a new dict; the state value is not mutated)."""
+    by_revision = dict(token_usage.get(node, {}))
+    entry = dict(by_revision.get(str(revision), dict.fromkeys(USAGE_FIELDS, 0)))
+    for field in USAGE_FIELDS:
+        entry[field] = entry.get(field, 0) + usage[field]
+    entry["cost_usd"] = round(entry["cost_usd"], 8)
+    by_revision[str(revision)] = entry
+    return {**token_usage, node: by_revision}
+
+
+def summarize_usage(token_usage: Dict[str, dict]) -> dict:
+    """Totals, and totals per node and per revision cycle."""
+    total = dict.fromkeys(USAGE_FIELDS, 0)
+    by_node: Dict[str, dict] = {}
+    by_revision: Dict[str, dict] = {}
+    for node, revisions in (token_usage or {}).items():
+        for revision, entry in revisions.items():
+            for bucket in (total, by_node.setdefault(node, dict.fromkeys(USAGE_FIELDS, 0)),
+                           by_revision.setdefault(revision, dict.fromkeys(USAGE_FIELDS, 0))):
+                for field in USAGE_FIELDS:
+                    bucket[field] += entry.get(field, 0)
+    total["total_tokens"] = total["input_tokens"] + total["output_tokens"]
+    return {"total": total, "by_node": by_node,
+            "by_revision": dict(sorted(by_revision.items(), key=lambda kv: int(kv[0])))}
+
+
+def total_tokens(state) -> int:
+    return sum(entry.get("input_tokens", 0) + entry.get("output_tokens", 0)
+               for revisions in (state.get("token_usage") or {}).values() for entry in revisions.values())
+
+
+def over_budget(state) -> bool:
+    """True when the thread has a token budget (token_budget > 0) and has used it up."""
+    budget = state.get("token_budget", 0)
+    return budget > 0 and total_tokens(state) >= budget
+
+
+def usage_metering(name: str, state, config, call: NodeCall):
+    """Node middleware (see src/utils/nodes.py): adds the usage of the node's model calls to token_usage."""
+    meter = UsageMeter()
+    token = _meter.set(meter)
+    try:
+        result = call()
+    finally:
+        _meter.reset(token)
+    if not meter.usage["calls"]:
+        return result
+
+    token_usage = add_usage(state.get("token_usage") or {}, name, state.get("revision_count", 0), meter.usage)
+    if isinstance(result, Command):
+        return Command(graph=result.graph, update={**(result.update or {}), "token_usage": token_usage},
+                       resume=result.resume, goto=result.goto)
+    return {**(result or {}), "token_usage": token_usage}
@@ -1,8 +1,105 @@
+import json
+import os
 import sys
+import tempfile
 from pathlib import Path
-from docx import Document
+from typing import List
+
+from src.utils.doc_builder import DocumentBuilder
+from src.utils.doc_cache import fragment_cache
+
+
+# --------------------RENDERING----------------------
+def save_atomic(doc, filepath: Path):
+    """Saves to a temp file in the target directory, then atomically renames it into place."""
+    if hasattr(filepath, "write"):
+        # Already a stream (e.g. BytesIO), nothing to rename
+        doc.save(filepath)
+        return
+
+    filepath = Path(filepath)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.stem}_", suffix=".tmp")
+    os.close(fd)
+    try:
+        doc.save(tmp_path)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def render_document(title: str, content: str, filepath: Path) -> str:
+    """Renders a single-heading document from plain content."""
+    doc = DocumentBuilder()
+    doc.heading(title, level=2)
+    doc.paragraphs(content.split("\\n"))
+
+    save_atomic(doc, filepath)
+    return str(filepath)
+
+
+def render_sections(title: str, sections: List[dict], filepath: Path) -> str:
+    """
+    Renders multiple sections to a .docx file with metadata.
+    Each section dict should have: {name, content, confidence, status}
+    """
+    doc = DocumentBuilder()
+
+    # Main title
+    doc.heading(title, level=1)
+
+    # Add metadata paragraph
+    total_sections = len(sections)
+    auto_approved = sum(1 for s in sections if s.get("status") == "auto_approved")
+    human_reviewed = sum(1 for s in sections if s.get("status") == "human_reviewed")
+
+    doc.rich_paragraph([
+        ("Document Statistics:\n", True, False),
+        (f"Total Sections: {total_sections}\n", False, False),
+        (f"Auto-approved: {auto_approved}\n", False, False),
+        (f"Human-reviewed: {human_reviewed}\n", False, False),
+        (f"Efficiency: {(auto_approved/total_sections*100):.1f}% automated\n\n", False, False),
+    ])
+
+    # Add each section (unchanged sections are spliced in from the fragment cache)
+    for section in sections:
+        doc.splice(fragment_cache.fragment(section, doc.template))
+
+    save_atomic(doc, filepath)
+    return str(filepath)
+
+
+# --------------------WORKER----------------------
+def serve(stdin, stdout):
+    """
+    Render worker loop used by the render service (`write_to_doc.py --serve`).
+    Reads one JSON job per line ({title, sections, path}) and answers one JSON line
+    per job: {"status": "ok", "path": ..., "rendered_sections": ...} or {"status": "error", "error": ...}.
+    rendered_sections counts the sections that missed the worker's fragment cache.
+    """
+    for line in stdin:
+        if not line.strip():
+            continue
+
+        try:
+            job = json.loads(line)
+            Path(job["path"]).parent.mkdir(parents=True, exist_ok=True)
+            misses = fragment_cache.misses
+            path = render_sections(job["title"], job["sections"], Path(job["path"]))
+            reply = {"status": "ok", "path": path, "rendered_sections": fragment_cache.misses - misses}
+        except Exception as e:
+            reply = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        stdout.write(json.dumps(reply) + "\n")
+        stdout.flush()
+
 
 def main():
+    if sys.argv[1:] == ["--serve"]:
+        serve(sys.stdin, sys.stdout)
+        return
+
     title = sys.argv[1]
     content = sys.argv[2]
 
@@ -11,13 +108,7 @@ def main():
 
     filepath = output_dir / "output_test.docx"
 
-    doc = Document()
-    doc.add_heading(title, level=2)
-
-    for line in content.split("\\n"):
-        doc.add_paragraph(line)
-
-    doc.save(filepath)
+    render_document(title, content, filepath)
     print(f"[WORKER] Saved doc to {filepath}")
 
 if __name__ == "__main__":
@@ -0,0 +1,33 @@
+"""Benchmark fixtures: outputs, run history and traces go to a temporary directory, logs nowhere; models are fakes."""
+import logging
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="agent-bench-")
+for _name, _value in {
+    "OUTPUT_ROOT": os.path.join(_TMP, "outputs"),
+    "RUN_HISTORY_DIR": os.path.join(_TMP, "run_history"),
+    "TRACE_FILE": os.path.join(_TMP, "spans.jsonl"),
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import pytest  # noqa: E402
+
+from src.utils.fake_model import FakeChatModel  # noqa: E402
+from src.utils.llm import set_model_provider  # noqa: E402
+from src.utils.set_logging import start_logging  # noqa: E402
+
+# Entry points start logging to a file; the benchmarks' records are written nowhere
+start_logging(logging.NullHandler())
+
+
+@pytest.fixture
+def use_fake_model():
+    """Makes every node use the given FakeChatModel; returns a function taking the model."""
+
+    def use(model: FakeChatModel) -> FakeChatModel:
+        set_model_provider(lambda **kwargs: model)
+        return model
+
+    yield use
+    set_model_provider(None)
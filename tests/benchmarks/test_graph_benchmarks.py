@@ -0,0 +1,141 @@
+"""
+End-to-end benchmarks of the refinement graph against the deterministic fake model
+(src/utils/fake_model.py) and the scripted reviewer (src/utils/reviewer.py).
+
+    make benchmark            # run and save the results under .benchmarks/
+    make benchmark_compare    # run and compare with the last saved results
+
+- test_node_latency: each node called on the state it received in a recorded run
+  (human_selective_review only runs inside the graph; it is part of the full runs)
+- test_full_run: one thread from prompt to document, by number of revision cycles;
+  extra_info has the memory the checkpointer keeps per finished thread
+- test_throughput: concurrent threads with model latency, extra_info has runs/s
+
+The fake answers instantly except in test_throughput, so the numbers are the
+graph's own overhead: nodes, checkpointing, serialization and rendering.
+"""
+import copy
+import gc
+import itertools
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import src.graph_agent_complex as agent
+from src.utils.fake_model import FakeChatModel
+from src.utils.llm import set_model_provider
+from src.utils.reviewer import ScriptedReviewer, run_with_reviewer
+
+PROMPT = "Write a comprehensive technical guide about Docker containerization for beginners"
+MEMORY_THREADS = 10
+THROUGHPUT_THREADS = 32
+THROUGHPUT_WORKERS = 16
+THROUGHPUT_CALL_LATENCY_S = 0.02
+
+_thread_ids = itertools.count()
+
+NODES = {
+    "ai_generate_with_confidence": agent.ai_generate_with_confidence,
+    "speculative_drafting": agent.speculative_drafting,
+    "evaluate_sections": agent.evaluate_sections,
+    "reflect_and_learn": agent.reflect_and_learn,
+    "regenerate_sections": agent.regenerate_sections,
+    "finalize": agent.finalize,
+}
+
+
+def initial_state(**settings) -> dict:
+    return {"prompt": PROMPT, "messages": [], "mistakes": [], "section_rules": {}, "revision_count": 0,
+            "confidence_threshold": 0.8, "max_regen_attempts": 5, "token_usage": {}, **settings}
+
+
+def run_one(graph, reviewer: ScriptedReviewer, **settings) -> dict:
+    config = {"configurable": {"thread_id": f"bench-{next(_thread_ids)}"}}
+    return run_with_reviewer(graph, initial_state(**settings), config, reviewer)
+
+
+@pytest.fixture(scope="module")
+def recorded_inputs():
+    """State each node received in one run with a review round (finalize gets the final state)."""
+    # Candidates and rewrites stay below the threshold, so the run reaches review and regeneration
+    model = FakeChatModel(confidence=(4.0, 3.0), revised_confidence=(3.0, 4.0))
+    set_model_provider(lambda **kwargs: model)
+    try:
+        graph = agent.compile_graph()
+        config = {"configurable": {"thread_id": "recorded"}}
+        final = run_with_reviewer(graph, initial_state(speculative_candidates=2), config,
+                                  ScriptedReviewer(reject_rate=0.6))
+        inputs = {"finalize": final}
+        for snapshot in graph.get_state_history(config):
+            if len(snapshot.next) == 1 and snapshot.next[0] in NODES:
+                inputs.setdefault(snapshot.next[0], snapshot.values)
+    finally:
+        set_model_provider(None)
+    return inputs, config
+
+
+@pytest.mark.parametrize("node", list(NODES))
+def test_node_latency(benchmark, use_fake_model, recorded_inputs, node):
+    use_fake_model(FakeChatModel(confidence=(4.0, 3.0)))
+    inputs, config = recorded_inputs
+    fn = NODES[node]
+    takes_config = fn.__code__.co_argcount > 1
+
+    # Nodes update sections in place, so every round gets a fresh copy (not timed)
+    def setup():
+        state = copy.deepcopy(inputs[node])
+        return ((state, config) if takes_config else (state,)), {}
+
+    benchmark.pedantic(fn, setup=setup, rounds=30, warmup_rounds=2)
+
+
+@pytest.mark.parametrize("revisions", [0, 1, 2, 3])
+def test_full_run(benchmark, use_fake_model, revisions):
+    # Low confidences everywhere, so every round has sections to reject
+    use_fake_model(FakeChatModel(confidence=(3.0, 4.0), revised_confidence=(3.0, 4.0)))
+    graph = agent.compile_graph()
+
+    def reviewer():
+        return ScriptedReviewer(reject_rate=1.0, max_rounds=revisions)
+
+    # A fresh reviewer per round: reviewers count their rounds
+    values = benchmark.pedantic(run_one, setup=lambda: ((graph, reviewer()), {}), rounds=20, warmup_rounds=1)
+    assert values.get("revision_count", 0) == revisions
+    assert values["output"].startswith("Document completed")
+
+    # Memory kept per finished thread (checkpoints, interned section versions), measured untimed
+    graph = agent.compile_graph()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(MEMORY_THREADS):
+            run_one(graph, reviewer())
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["bytes_per_thread"] = (after - before) // MEMORY_THREADS
+
+
+def test_throughput(benchmark, use_fake_model):
+    use_fake_model(FakeChatModel(confidence=(4.0, 3.0), call_latency=THROUGHPUT_CALL_LATENCY_S))
+    graph = agent.compile_graph()
+
+    durations = []
+
+    def run_batch():
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=THROUGHPUT_WORKERS) as executor:
+            futures = [executor.submit(run_one, graph, ScriptedReviewer(reject_rate=0.5, seed=i))
+                       for i in range(THROUGHPUT_THREADS)]
+            results = [future.result() for future in futures]
+        durations.append(time.perf_counter() - start)
+        return results
+
+    results = benchmark.pedantic(run_batch, rounds=3, warmup_rounds=1)
+    assert all(values["output"].startswith("Document completed") for values in results)
+    benchmark.extra_info["threads"] = THROUGHPUT_THREADS
+    benchmark.extra_info["runs_per_s"] = round(THROUGHPUT_THREADS / min(durations), 1)
@@ -0,0 +1,17 @@
+"""Unit test fixtures: documents, run history and traces go to a temporary directory, logs nowhere."""
+import logging
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="agent-unit-")
+for _name, _value in {
+    "OUTPUT_ROOT": os.path.join(_TMP, "outputs"),
+    "RUN_HISTORY_DIR": os.path.join(_TMP, "run_history"),
+    "TRACE_FILE": os.path.join(_TMP, "spans.jsonl"),
+}.items():
+    os.environ.setdefault(_name, _value)
+
+from src.utils.set_logging import start_logging  # noqa: E402
+
+# Entry points start logging to a file; the tests' records are written nowhere
+start_logging(logging.NullHandler())
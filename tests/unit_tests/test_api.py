@@ -0,0 +1,181 @@
+"""Agent API over a fake model: thread lifecycle, forking and the WebSocket protocol."""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from src.utils.fake_model import FakeChatModel  # noqa: E402
+from src.utils.llm import set_model_provider  # noqa: E402
+from src.utils.reviewer import ScriptedReviewer  # noqa: E402
+from src.utils.section_store import section_store  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def server():
+    set_model_provider(lambda **kwargs: FakeChatModel(confidence=(3.0, 4.0), revised_confidence=(3.0, 4.0)))
+    import src.main_api_server as srv
+
+    client = TestClient(srv.create_app(warm_up=False)).__enter__()
+    try:
+        yield srv, client
+    finally:
+        client.__exit__(None, None, None)
+        set_model_provider(None)
+
+
+def start_thread(client, **request) -> str:
+    return client.post("/agent/start", json={"prompt": "Docker", "render_mode": "inline", **request}).json()["thread_id"]
+
+
+def stream(client, thread_id: str) -> list:
+    response = client.get(f"/agent/stream/{thread_id}")
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def receive_until(ws, *types) -> list:
+    messages = [ws.receive_json()]
+    while messages[-1]["type"] not in types:
+        messages.append(ws.receive_json())
+    return messages
+
+
+def test_start_rejects_unknown_modes(server):
+    _, client = server
+    for field in ("render_mode", "durability", "reflection_mode", "regeneration_mode"):
+        response = client.post("/agent/start", json={"prompt": "Docker", field: "nope"})
+        assert response.status_code == 422 and response.json()["detail"][0]["loc"] == ["body", field]
+
+
+def test_delete_thread_releases_its_sections(server):
+    _, client = server
+    thread_id = start_thread(client)
+    assert stream(client, thread_id)[-1]["type"] == "interrupt"
+
+    owned = set(section_store._owned[thread_id])
+    assert owned
+    holders = {key: section_store._holders[key] for key in owned}
+
+    assert client.delete(f"/agent/thread/{thread_id}").json() == {"status": "deleted", "thread_id": thread_id}
+    assert thread_id not in section_store._owned
+    for key, count in holders.items():
+        assert section_store._holders.get(key, 0) == count - 1
+        if count == 1:
+            assert key not in section_store._blobs
+    assert client.delete(f"/agent/thread/{thread_id}").status_code == 404
+
+
+def test_fork_reroutes_sections_and_leaves_the_parent_unchanged(server):
+    srv, client = server
+    # Everything is confident at 0.1: the run streams every section to the export and completes
+    thread_id = start_thread(client, confidence_threshold=0.1, export_formats=["markdown"])
+    assert stream(client, thread_id)[-1]["type"] == "done"
+    checkpoints = client.get(f"/agent/thread/{thread_id}/checkpoints").json()
+    routed = next(checkpoint for checkpoint in checkpoints if checkpoint["next"] == ["finalize"])
+    parent = srv.get_graph().get_state(srv.graph_config(thread_id)).values
+
+    response = client.post(f"/agent/thread/{thread_id}/fork", json={
+        "checkpoint_id": routed["checkpoint_id"], "overrides": {"confidence_threshold": 0.5}})
+    assert response.status_code == 200
+    fork = response.json()
+    assert fork["forked_from"] == {"thread_id": thread_id, "checkpoint_id": routed["checkpoint_id"]}
+    assert fork["next_nodes"] == ["finalize"]
+
+    values = srv.get_graph().get_state(srv.graph_config(fork["thread_id"])).values
+    assert values["confidence_threshold"] == 0.5
+    for section in values["sections"]:
+        assert section["status"] == ("auto_approved" if section["confidence"] >= 0.5 else "pending_review")
+    assert values["review_req_sections"] == [s["name"] for s in values["sections"] if s["confidence"] < 0.5]
+    assert values["review_req_sections"]
+    assert values["streamed_sections"] == []
+
+    assert srv.get_graph().get_state(srv.graph_config(thread_id)).values == parent
+    assert parent["streamed_sections"] and parent["confidence_threshold"] == 0.1
+    assert client.get(f"/agent/thread/{thread_id}/checkpoints").json() == checkpoints
+
+    # The fork runs finalize itself rather than reusing the parent's result
+    assert stream(client, fork["thread_id"])[-1]["type"] == "done"
+    assert client.get(f"/agent/thread/{thread_id}/checkpoints").json() == checkpoints
+
+
+def test_fork_of_a_thread_waiting_for_review_waits_too(server):
+    _, client = server
+    thread_id = start_thread(client)
+    interrupt = stream(client, thread_id)[-1]
+
+    fork = client.post(f"/agent/thread/{thread_id}/fork", json={}).json()
+    assert fork["status"] == "waiting_for_user" and fork["next_nodes"] == ["human_selective_review"]
+    assert stream(client, fork["thread_id"])[-1] == interrupt
+
+
+def test_fork_errors(server):
+    _, client = server
+    assert client.post("/agent/thread/nope/fork", json={}).status_code == 404
+
+    thread_id = start_thread(client)
+    # Not run yet: nothing to fork from
+    assert client.post(f"/agent/thread/{thread_id}/fork", json={}).status_code == 409
+    stream(client, thread_id)
+    assert client.post(f"/agent/thread/{thread_id}/fork", json={"checkpoint_id": "nope"}).status_code == 404
+    assert client.post(f"/agent/thread/{thread_id}/fork", json={"overrides": {"nope": 1}}).status_code == 400
+
+
+def test_websocket_resume_and_replay(server):
+    _, client = server
+    thread_id = start_thread(client)
+    reviewer = ScriptedReviewer(reject_rate=1.0, max_rounds=1)
+
+    with client.websocket_connect(f"/agent/ws/{thread_id}") as ws:
+        assert ws.receive_json() == {"type": "session", "thread_id": thread_id, "status": "created", "last_seq": 0}
+        first = receive_until(ws, "interrupt", "error")
+        assert first[-1]["type"] == "interrupt"
+        assert [event["seq"] for event in first] == list(range(1, len(first) + 1))
+
+        ws.send_json({"type": "resume", "response": reviewer.answer(first[-1]["data"][0])})
+        second = receive_until(ws, "interrupt", "done", "error")
+        assert second[-1]["type"] in ("interrupt", "done")
+        assert second[0]["seq"] == first[-1]["seq"] + 1
+
+    # Reconnecting after the first interrupt replays what came after it
+    with client.websocket_connect(f"/agent/ws/{thread_id}?last_seq={first[-1]['seq']}") as ws:
+        assert ws.receive_json()["last_seq"] == second[-1]["seq"]
+        assert [ws.receive_json() for _ in second] == second
+
+
+def test_websocket_gap_when_the_replay_buffer_moved_on(server, monkeypatch):
+    _, client = server
+    monkeypatch.setenv("WS_REPLAY_EVENTS", "3")
+    thread_id = start_thread(client)
+    with client.websocket_connect(f"/agent/ws/{thread_id}") as ws:
+        ws.receive_json()
+        events = receive_until(ws, "interrupt", "error")
+    assert events[-1]["type"] == "interrupt" and len(events) > 3
+
+    with client.websocket_connect(f"/agent/ws/{thread_id}?last_seq=1") as ws:
+        ws.receive_json()
+        assert ws.receive_json() == {"type": "gap", "missed": len(events) - 4}
+        assert [ws.receive_json() for _ in range(3)] == events[-3:]
+
+
+def test_websocket_idle_timeout_closes_the_socket(server, monkeypatch):
+    _, client = server
+    monkeypatch.setenv("WS_IDLE_TIMEOUT_S", "0.2")
+    thread_id = start_thread(client)
+    stream(client, thread_id)
+
+    with client.websocket_connect(f"/agent/ws/{thread_id}") as ws:
+        assert ws.receive_json()["status"] == "waiting_for_user"
+        assert ws.receive_json()["type"] == "interrupt"
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1001
+
+    with client.websocket_connect("/agent/ws/nope") as ws:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 4404
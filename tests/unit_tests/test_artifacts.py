@@ -0,0 +1,16 @@
+from src.utils import settings
+from src.utils.artifacts import artifact_path, output_root, thread_dir_name
+
+
+def test_thread_directories_never_collide_or_escape():
+    names = {thread_dir_name(thread_id) for thread_id in ("a/b", "a_b", "a?b", "..", ".")}
+    assert len(names) == 5
+    assert not names & {"..", "."} and all("/" not in name for name in names)
+
+    path = artifact_path("../../etc", 1)
+    assert path.parent.parent == output_root()
+
+
+def test_default_output_root_is_under_the_repository(monkeypatch):
+    monkeypatch.delenv("OUTPUT_ROOT")
+    assert output_root() == settings.REPO_ROOT / "outputs"
@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.main_batch import BatchRunner, ReviewFile, load_prompts
+from src.utils.artifacts import set_output_root
+from src.utils.fake_model import FakeChatModel
+from src.utils.llm import set_model_provider
+
+
+@pytest.fixture
+def prompts(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text(json.dumps({"id": "docker", "prompt": "Write a guide about Docker"}) + "\n"
+                    + json.dumps({"prompt": "Write a guide about Git", "max_regen_attempts": 1}) + "\n")
+    # Low confidences, so every document has sections to review
+    set_model_provider(lambda **kwargs: FakeChatModel(confidence=(3.0, 4.0)))
+    yield path
+    set_model_provider(None)
+    set_output_root(None)
+
+
+def test_deferred_reviews_resume_from_saved_checkpoints(tmp_path, prompts):
+    out = tmp_path / "run"
+    first = BatchRunner(out, workers=2, review="file").run(load_prompts(prompts))
+    assert [r["status"] for r in first] == ["waiting_for_review", "waiting_for_review"]
+
+    reviews = ReviewFile(out / "reviews.jsonl")
+    for question in reviews.read():
+        reviews.append({**question, "response": "y"})
+
+    # A new runner only has the files under out/, as after a restart
+    second = BatchRunner(out, workers=2, review="file").run(load_prompts(prompts))
+    assert [(r["id"], r["status"], r["questions"], r["runs"]) for r in second] == [
+        ("docker", "done", 1, 2), ("2", "done", 1, 2)]
+    assert all(r["documents"] and r["timings"]["finished_at"] for r in second)
+    assert all(path.startswith(str((out / "outputs").resolve())) for r in second for path in r["documents"])
+
+    # Finished documents are not run again
+    progress_lines = (out / "progress.jsonl").read_text().count("\n")
+    assert BatchRunner(out, review="file").run(load_prompts(prompts)) == second
+    assert (out / "progress.jsonl").read_text().count("\n") == progress_lines
+    assert json.loads((out / "manifest.json").read_text())["by_status"] == {"done": 2}
+
+
+def test_unknown_settings_are_rejected(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text(json.dumps({"prompt": "Docker", "confidence": 0.5}) + "\n")
+    with pytest.raises(ValueError, match="unknown setting"):
+        load_prompts(path)
+
+
+def test_thread_ids_follow_the_resolved_out_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    try:
+        doc = {"id": "docker"}
+        relative = BatchRunner(Path("a") / "run").thread_id(doc)
+        assert BatchRunner(tmp_path / "a" / "run").thread_id(doc) == relative
+        assert BatchRunner(tmp_path / "b" / "run").thread_id(doc) != relative
+    finally:
+        set_output_root(None)
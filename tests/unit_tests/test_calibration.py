@@ -0,0 +1,45 @@
+import numpy as np
+
+from src.utils.calibration import CALIBRATION_BINS, CalibrationStore, SectionCalibrator
+
+
+def test_curve_is_monotone_on_noisy_decisions():
+    rng = np.random.default_rng(0)
+    confidences = rng.uniform(0, 1, 400)
+    # Approval gets likelier with confidence, with noise that breaks monotonicity between bins
+    approved = rng.uniform(0, 1, 400) < np.clip(confidences + rng.normal(0, 0.3, 400), 0, 1)
+    calibrator = SectionCalibrator(confidences, approved)
+
+    assert np.all(np.diff(calibrator.curve) >= 0)
+    probabilities = [calibrator.probability(c) for c in np.linspace(0, 1, 101)]
+    assert all(b >= a for a, b in zip(probabilities, probabilities[1:]))
+
+
+def test_sparse_bins_fall_back_to_the_reported_confidence():
+    # Every decision is in the top bin; empty bins keep the prior (their own confidence)
+    calibrator = SectionCalibrator(np.full(20, 0.95), np.ones(20, dtype=bool))
+    centers = (np.arange(CALIBRATION_BINS) + 0.5) / CALIBRATION_BINS
+    assert np.allclose(calibrator.curve[:-1], centers[:-1])
+    assert calibrator.probability(0.95) > 0.95
+
+    # No history at all: the raw confidence
+    empty = SectionCalibrator(np.zeros(0), np.zeros(0, dtype=bool))
+    assert empty.probability(0.37) == 0.37
+    assert CalibrationStore().probability("Installation", 0.42) == 0.42
+
+
+def test_decisions_round_trip_through_the_file(tmp_path, monkeypatch):
+    path = tmp_path / "calibration.jsonl"
+    # The setting is read on first use, not when the store is created
+    store = CalibrationStore(path_setting="CALIBRATION_FILE")
+    monkeypatch.setenv("CALIBRATION_FILE", str(path))
+    for i in range(30):
+        store.record("2. Troubleshooting", 0.85, approved=i % 3 != 0)
+    store.record("Installation", 0.6, approved=True)
+
+    reloaded = CalibrationStore(path=str(path))
+    for name in ("Troubleshooting", "installation", "Usage"):
+        assert reloaded.probability(name, 0.85) == store.probability(name, 0.85)
+    assert reloaded.calibrator("troubleshooting").observations == 30
+    # 2/3 of the decisions were approvals: calibrated well below the reported 0.85
+    assert reloaded.probability("Troubleshooting", 0.85) < 0.8
@@ -0,0 +1,36 @@
+import pytest
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.utils.checkpoint_serde import SCHEMA_VERSION, CompactSerializer
+
+SECTION = {"name": "Intro", "content": "Docker runs containers. " * 300, "confidence": 0.7,
+           "status": "human_reviewed"}
+
+
+@pytest.mark.parametrize("compression", ["zlib", "none", "auto"])
+def test_round_trip_is_tagged_with_codec_and_schema(compression):
+    serde = CompactSerializer(compression=compression)
+    tag, data = serde.dumps_typed({"sections": [SECTION]})
+    assert tag.endswith(f"@{SCHEMA_VERSION}")
+    assert serde.loads_typed((tag, data))["sections"][0]["content"] == SECTION["content"]
+
+
+def test_v1_payloads_are_migrated():
+    serde = CompactSerializer()
+    untagged = JsonPlusSerializer().dumps_typed({"sections": [SECTION]})
+    tag, data = untagged
+    for payload in (untagged, (f"{tag}+raw@1", data)):
+        section = serde.loads_typed(payload)["sections"][0]
+        assert section["initial_confidence"] == 0.7 and section["reviewed"] is True
+
+
+@pytest.mark.parametrize("tag", ["msgpack+lz4@2", "msgpack@2", "msgpack+raw@x", f"msgpack+raw@{SCHEMA_VERSION + 1}"])
+def test_unknown_codecs_and_tags_are_rejected(tag):
+    _, data = JsonPlusSerializer().dumps_typed({"sections": []})
+    with pytest.raises(ValueError):
+        CompactSerializer().loads_typed((tag, data))
+
+
+def test_unknown_inner_types_are_rejected():
+    with pytest.raises(NotImplementedError):
+        CompactSerializer().loads_typed(("bogus+raw@2", b"\x80"))
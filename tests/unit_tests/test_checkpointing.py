@@ -0,0 +1,83 @@
+import operator
+from typing import Annotated, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Command, interrupt
+
+from src.utils.checkpointing import CoalescingSaver
+
+CONFIG = {"configurable": {"thread_id": "t"}}
+
+
+class State(TypedDict):
+    log: Annotated[list, operator.add]
+
+
+def build(saver: CoalescingSaver, ask: bool = False):
+    """draft -> route (only routes) -> review (asks the user when ask)."""
+    graph = StateGraph(State)
+    graph.add_node("draft", lambda state: {"log": ["draft"]})
+    graph.add_node("route", lambda state: {})
+    graph.add_node("review", (lambda state: {"log": [interrupt("ok?")]}) if ask else (lambda state: {"log": ["review"]}))
+    graph.add_edge(START, "draft")
+    graph.add_edge("draft", "route")
+    graph.add_conditional_edges("route", lambda state: "review", ["review"])
+    graph.add_edge("review", END)
+    return graph.compile(checkpointer=saver)
+
+
+def checkpoints(saver: CoalescingSaver) -> int:
+    return len(saver.storage["t"][""])
+
+
+def test_routing_only_checkpoint_is_replaced_by_the_next():
+    plain, coalescing = CoalescingSaver(coalesce=False), CoalescingSaver()
+    assert build(plain).invoke({"log": []}, CONFIG, durability="sync") == {"log": ["draft", "review"]}
+    assert build(coalescing).invoke({"log": []}, CONFIG, durability="sync") == {"log": ["draft", "review"]}
+
+    assert coalescing.coalesced == 1
+    assert checkpoints(coalescing) == checkpoints(plain) - 1
+    # The checkpoint after the route is chained to the one before it
+    history = list(coalescing.list(CONFIG))
+    assert [h.metadata["step"] for h in history] == [3, 1, 0, -1]
+    assert history[0].parent_config["configurable"]["checkpoint_id"] == history[1].config["configurable"]["checkpoint_id"]
+
+
+def test_held_checkpoint_is_written_when_read():
+    for read in (lambda saver: saver.get_tuple(CONFIG), lambda saver: list(saver.list(CONFIG))):
+        saver = CoalescingSaver()
+        graph = build(saver)
+        for event in graph.stream({"log": []}, CONFIG, durability="sync"):
+            if "route" in event:
+                break
+        assert saver._held and checkpoints(saver) == 3
+
+        read(saver)
+        assert not saver._held and checkpoints(saver) == 4
+        assert graph.get_state(CONFIG).next == ("review",)
+
+
+def test_held_checkpoint_is_written_at_an_interrupt():
+    saver = CoalescingSaver()
+    graph = build(saver, ask=True)
+    events = list(graph.stream({"log": []}, CONFIG, durability="sync"))
+    assert "__interrupt__" in events[-1]
+
+    # Nothing reads the thread: the interrupt alone wrote the checkpoint it resumes from
+    assert not saver._held and checkpoints(saver) == 4
+    assert graph.invoke(Command(resume="yes"), CONFIG, durability="sync") == {"log": ["draft", "yes"]}
+
+
+def test_exit_durability_writes_at_the_interrupt_and_the_end_only():
+    saver = CoalescingSaver()
+    graph = build(saver, ask=True)
+    for event in graph.stream({"log": []}, CONFIG, durability="exit"):
+        if "__interrupt__" not in event:
+            assert saver.written == 0
+    assert saver.written == 1
+    assert graph.get_state(CONFIG).next == ("review",)
+
+    list(graph.stream(Command(resume="yes"), CONFIG, durability="exit"))
+    assert saver.written == 2
+    assert [h.metadata["step"] for h in saver.list(CONFIG)] == [3, 2]
+    assert graph.get_state(CONFIG).values == {"log": ["draft", "yes"]}
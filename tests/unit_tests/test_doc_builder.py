@@ -0,0 +1,41 @@
+import io
+import shutil
+
+import docx
+
+from src.utils.doc_builder import DEFAULT_TEMPLATE, DocumentBuilder, get_template
+
+
+def test_built_document_opens_with_python_docx():
+    doc = DocumentBuilder()
+    doc.heading("Docker Guide", level=0)
+    doc.heading("Introduction", level=1)
+    doc.paragraph("Containers package an application with its dependencies.")
+    doc.rich_paragraph([("Status: ", True, False), ("approved", False, True)])
+    doc.paragraphs(["First line", "Second line"])
+    buffer = io.BytesIO()
+    doc.save(buffer)
+
+    paragraphs = docx.Document(io.BytesIO(buffer.getvalue())).paragraphs
+    assert [(p.style.name, p.text) for p in paragraphs] == [
+        ("Title", "Docker Guide"),
+        ("Heading 1", "Introduction"),
+        ("Normal", "Containers package an application with its dependencies."),
+        ("Normal", "Status: approved"),
+        ("Normal", "First line"),
+        ("Normal", "Second line"),
+    ]
+    runs = paragraphs[3].runs
+    assert (runs[0].bold, runs[0].italic) == (True, None)
+    assert (runs[1].bold, runs[1].italic) == (None, True)
+
+
+def test_template_from_the_docx_template_setting(monkeypatch, tmp_path):
+    template = tmp_path / "corporate.docx"
+    shutil.copy(DEFAULT_TEMPLATE, template)
+    monkeypatch.setenv("DOCX_TEMPLATE", str(template))
+    get_template.cache_clear()
+    try:
+        assert get_template().path == str(template)
+    finally:
+        get_template.cache_clear()
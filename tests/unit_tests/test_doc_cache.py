@@ -0,0 +1,56 @@
+from src.utils.doc_builder import DocumentBuilder, get_template
+from src.utils.doc_cache import FragmentCache, render_section_fragment
+
+SECTIONS = [
+    {"name": "Introduction", "content": "Docker runs containers.\nImages are layered.", "confidence": 0.91,
+     "status": "auto_approved"},
+    {"name": "Installation", "content": "Install the engine.", "confidence": 0.62, "status": "human_reviewed"},
+    {"name": "Usage", "content": "Run docker run hello-world.", "confidence": 0.4, "status": "pending_review"},
+]
+
+
+def document_xml(sections, cache=None) -> bytes:
+    doc = DocumentBuilder()
+    doc.heading("Docker Guide", level=1)
+    for section in sections:
+        doc.splice(cache.fragment(section) if cache else render_section_fragment(section, get_template()))
+    return doc.to_xml()
+
+
+def test_unchanged_sections_hit_and_edited_sections_miss():
+    cache = FragmentCache()
+    document_xml(SECTIONS, cache)
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    edited = [dict(s) for s in SECTIONS]
+    edited[1]["content"] = "Install the engine, then add your user to the docker group."
+    document_xml(edited, cache)
+    assert (cache.hits, cache.misses) == (2, 4)
+
+    # Only what is displayed matters: the confidence is shown with two decimals
+    edited[0]["confidence"] = 0.912
+    document_xml(edited, cache)
+    assert (cache.hits, cache.misses) == (5, 4)
+    edited[0]["status"] = "human_reviewed"
+    document_xml(edited, cache)
+    assert cache.misses == 5
+
+
+def test_incremental_render_equals_full_render():
+    cache = FragmentCache()
+    document_xml(SECTIONS, cache)
+    edited = [dict(s) for s in SECTIONS]
+    edited[2].update(content="Run docker compose up.", confidence=0.85, status="auto_approved")
+
+    assert document_xml(edited, cache) == document_xml(edited)
+    assert cache.hits == 2
+
+
+def test_least_recently_used_fragment_is_evicted():
+    cache = FragmentCache(max_entries=2)
+    document_xml(SECTIONS, cache)
+    assert cache.stats()["entries"] == 2
+    document_xml(SECTIONS[1:], cache)
+    assert (cache.hits, cache.misses) == (2, 3)
+    document_xml(SECTIONS[:1], cache)
+    assert cache.misses == 4
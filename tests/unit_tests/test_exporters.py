@@ -0,0 +1,26 @@
+from src.utils.artifacts import artifact_index
+from src.utils.exporters import stream_approved_sections
+
+
+def section(name: str, status: str) -> dict:
+    return {"name": name, "content": f"{name} text.", "confidence": 0.9, "status": status}
+
+
+def test_sections_are_streamed_in_document_order():
+    state = {"export_formats": ["markdown"], "revision_count": 1, "streamed_sections": [],
+             "sections": [section("Intro", "auto_approved"), section("Setup", "pending"),
+                          section("Usage", "auto_approved")]}
+
+    # Usage is approved but waits for Setup
+    state["streamed_sections"] = stream_approved_sections(state, "export-order", "Guide")
+    assert state["streamed_sections"] == ["Intro"]
+
+    state["sections"][1]["status"] = "human_reviewed"
+    state["streamed_sections"] = stream_approved_sections(state, "export-order", "Guide")
+    assert state["streamed_sections"] == ["Intro", "Setup", "Usage"]
+
+    stream_approved_sections(state, "export-order", "Guide", final=True)
+    path = artifact_index.query("export-order")[0]["path"]
+    with open(path, encoding="utf-8") as f:
+        headings = [line for line in f if line.startswith("## ")]
+    assert headings == ["## Intro\n", "## Setup\n", "## Usage\n"]
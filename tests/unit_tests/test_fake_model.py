@@ -0,0 +1,59 @@
+import json
+
+from src.utils.fake_model import FakeChatModel
+from src.utils.patching import build_patch_prompt, parse_section_patch
+from src.utils.reflection import build_batch_reflection_prompt, parse_batch_reflection
+from src.utils.reviewer import ScriptedReviewer
+
+DRAFT = "User request: Write a guide about Docker"
+
+
+def test_responses_are_deterministic_per_seed():
+    first = FakeChatModel(seed=1).invoke(DRAFT).content
+    assert FakeChatModel(seed=1).invoke(DRAFT).content == first
+    assert FakeChatModel(seed=2).invoke(DRAFT).content != first
+
+
+def test_draft_follows_the_settings():
+    model = FakeChatModel(sections=14, confidence=(1.0, 1.0))
+    sections = json.loads(model.invoke(DRAFT).content)["sections"]
+    assert len(sections) == 14
+    assert sections[-1]["name"] == "Section 14"
+    assert all(0.0 <= s["confidence"] <= 1.0 for s in sections)
+    assert model.invoke(DRAFT).usage_metadata["output_tokens"] > 0
+
+
+def test_patch_and_batch_reflection_pass_validation():
+    model = FakeChatModel()
+    paragraphs = ["One.", "Two.", "Three.", "Four."]
+    patch = model.invoke(build_patch_prompt("Setup", paragraphs, "Shorter", [], [])).content
+    assert parse_section_patch(patch, len(paragraphs)) is not None
+
+    names = ["Setup", "Usage"]
+    reflection = model.invoke(build_batch_reflection_prompt([(n, "text", "feedback") for n in names])).content
+    global_rules, specific = parse_batch_reflection(reflection, names)
+    assert global_rules and set(specific) == set(names)
+
+
+def test_malformed_rate():
+    model = FakeChatModel(malformed_rate=0.3)
+    for i in range(200):
+        model.invoke(f"{DRAFT} {i}")
+    assert 40 <= model.stats()["malformed"] <= 80
+    assert FakeChatModel(malformed_rate=1.0).respond(DRAFT)[1]
+
+
+def review(details_sections):
+    details = "".join(f"\n Section: {name}\n   Confidence: 0.50\n" for name in details_sections)
+    return {"question": "Review complete. Approve all reviewed sections? (y/n): ", "details": details}
+
+
+def test_reviewer_rejects_then_approves():
+    reviewer = ScriptedReviewer(reject_rate=1.0, max_rounds=2, feedback="More detail.")
+    for _ in range(2):
+        assert reviewer.answer(review(["Setup", "Usage"])) == "n"
+        assert reviewer.answer({"question": "Enter section name(s) to reject (comma-separated) or 'all': "}) \
+            == "Setup, Usage"
+        assert reviewer.answer({"question": "What's wrong with section 'Setup'? Provide feedback: "}) == "More detail."
+    assert reviewer.answer(review(["Setup", "Usage"])) == "y"
+    assert ScriptedReviewer(reject_rate=0.0).answer(review(["Setup"])) == "y"
@@ -0,0 +1,33 @@
+import src.graph_agent_complex as agent
+from src.utils.artifacts import artifact_index
+from src.utils.state import default_initial_state
+from src.utils.usage import USAGE_FIELDS
+
+
+class QueuedRenders:
+    """Render service stand-in that keeps the jobs, so they finish after the node returned."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, title, sections, path, on_done=None, affinity=None, timeout=None):
+        self.jobs.append((str(path), on_done))
+        return f"job-{len(self.jobs)}"
+
+
+def test_pooled_render_is_recorded_under_the_thread_revision(monkeypatch):
+    renders = QueuedRenders()
+    monkeypatch.setattr(agent, "get_render_service", lambda: renders)
+    usage = dict.fromkeys(USAGE_FIELDS, 1)
+    state = default_initial_state("Write a guide about Docker", 0.8, 3, render_mode="pooled", revision_count=2,
+                                  token_usage={"ai_generate_with_confidence": {"0": usage},
+                                               "regenerate_sections": {"1": usage, "2": usage}})
+    state["sections"] = [{"name": "Intro", "content": "Text", "confidence": 0.9, "status": "auto_approved"}]
+
+    result = agent.finalize(state, {"configurable": {"thread_id": "pooled-finalize"}})
+    assert result["render_job"] == "job-1"
+
+    path, on_done = renders.jobs[0]
+    on_done({"job_id": "job-1", "status": "done", "path": path})
+    recorded = artifact_index.query("pooled-finalize")[0]
+    assert recorded["revision"] == 2 and recorded["render_job"] == "job-1"
@@ -0,0 +1,57 @@
+"""
+Import-time budget for the entry points.
+
+Each module is imported in a fresh interpreter with `-X importtime`, from an
+empty working directory. Importing must stay under IMPORT_TIME_BUDGET_S, must not
+pull in the lazily imported heavy modules and must have no side effects (no log
+directory, no background threads).
+"""
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# About 1.2-1.5 s here; importing langchain_openai again would add ~1.3 s
+IMPORT_TIME_BUDGET_S = float(os.getenv("IMPORT_TIME_BUDGET_S", "2.0"))
+
+LAZY_MODULES = ("langchain_openai", "openai", "docx")
+
+# __import__, not importlib.import_module: only the C import path is timed by -X importtime
+PROBE = """
+import sys, threading
+__import__(sys.argv[1])
+print("LOADED", ",".join(m for m in sys.argv[2].split(",") if m in sys.modules))
+print("THREADS", threading.active_count())
+"""
+
+
+def import_module(module: str, cwd: Path):
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(ROOT), str(ROOT / "src")])}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, module, ",".join(LAZY_MODULES)],
+        cwd=cwd, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    # "import time: self [us] | cumulative | imported package"; the top-level line of the module
+    cumulative_us = next(int(m.group(1)) for m in re.finditer(
+        rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", result.stderr, re.MULTILINE))
+    output = dict(line.split(" ", 1) if " " in line else (line, "") for line in result.stdout.splitlines())
+    return cumulative_us / 1e6, output
+
+
+@pytest.mark.parametrize("module", ["src.main", "src.main_api_server"])
+def test_import_is_fast_and_side_effect_free(module, tmp_path):
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    seconds, output = import_module(module, cwd)
+
+    assert seconds < IMPORT_TIME_BUDGET_S, f"importing {module} took {seconds:.2f} s"
+    assert output["LOADED"].strip() == "", f"{module} imported {output['LOADED']}"
+    assert output["THREADS"] == "1"
+    assert not (tmp_path / "logs").exists()
+    assert list(cwd.iterdir()) == []
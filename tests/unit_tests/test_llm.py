@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+from src.utils.llm import SingleFlight
+
+
+def test_concurrent_calls_with_the_same_key_share_one_call():
+    flight = SingleFlight(max_workers=2)
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    joined = []
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, "key", call, None, lambda: joined.append(1)) for _ in range(4)]
+        while flight.stats()["coalesced"] < 3:
+            time.sleep(0.001)
+        release.set()
+        assert [f.result() for f in futures] == ["result"] * 4
+
+    assert len(calls) == 1 and len(joined) == 3
+    assert flight.stats()["calls"] == 1 and flight.stats()["in_flight"] == 0
+
+
+def test_abandoned_waiter_does_not_cancel_the_call():
+    flight = SingleFlight(max_workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def call():
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        patient = executor.submit(flight.do, "key", call)
+        started.wait(5)
+        with pytest.raises(TimeoutError):
+            flight.do("key", call, timeout=0.01)
+        release.set()
+        assert patient.result() == "result"
+
+    stats = flight.stats()
+    assert stats["abandoned"] == 1 and stats["cancelled"] == 0 and stats["in_flight"] == 0
+
+
+def test_instant_call_completes_and_is_forgotten():
+    flight = SingleFlight(max_workers=1)
+    assert flight.do("key", lambda: "first") == "first"
+    # The finished call is not reused for a later request
+    assert flight.do("key", lambda: "second") == "second"
+    assert flight.stats()["calls"] == 2 and flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter_and_are_counted():
+    flight = SingleFlight(max_workers=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    # Errors are counted by the call's done callback, which may run just after the waiter wakes up
+    deadline = time.monotonic() + 5
+    while flight.stats()["errors"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert flight.stats()["errors"] == 1 and flight.stats()["in_flight"] == 0
+
+
+def test_queue_depth_counts_calls_waiting_for_a_worker():
+    flight = SingleFlight(max_workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return "first"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(flight.do, "a", blocking)
+        started.wait(5)
+        second = executor.submit(flight.do, "b", lambda: "second")
+        while flight.stats()["calls"] < 2:
+            time.sleep(0.001)
+        assert flight.queue_depth() == 1
+        release.set()
+        assert first.result() == "first" and second.result() == "second"
+    assert flight.queue_depth() == 0
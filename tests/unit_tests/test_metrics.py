@@ -0,0 +1,14 @@
+from src.utils.metrics import Counter, Gauge, set_metrics_enabled
+
+
+def test_disabled_metrics_record_nothing():
+    counter, gauge = Counter("c", "Counter."), Gauge("g", "Gauge.")
+    set_metrics_enabled(False)
+    try:
+        counter.inc()
+        gauge.set(value=5)
+        assert counter.value() == 0 and gauge.value() == 0
+    finally:
+        set_metrics_enabled(None)
+    gauge.set(value=5)
+    assert gauge.value() == 5
@@ -0,0 +1,24 @@
+from src.utils.nodes import wrap_node
+
+
+def test_middlewares_run_outermost_first_around_the_node():
+    calls = []
+
+    def middleware(label):
+        def around(name, state, config, call):
+            calls.append(f"{label}:{name}")
+            return {**call(), label: True}
+        return around
+
+    def with_config(state, config):
+        calls.append(config["configurable"]["thread_id"])
+        return {"value": state["value"] + 1}
+
+    def without_config(state):
+        return {"value": state["value"] * 2}
+
+    node = wrap_node("step", with_config, middleware("outer"), middleware("inner"))
+    assert node({"value": 1}, {"configurable": {"thread_id": "t"}}) == {"value": 2, "inner": True, "outer": True}
+    assert calls == ["outer:step", "inner:step", "t"]
+    assert node.__name__ == "with_config"
+    assert wrap_node("step", without_config)({"value": 3}, {}) == {"value": 6}
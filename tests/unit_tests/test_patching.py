@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from src.utils.patching import ParagraphEdit, apply_patch, parse_section_patch, split_paragraphs
+
+PARAGRAPHS = ["First.", "Second.", "Third."]
+
+
+def patch_json(*edits, confidence=0.9):
+    return json.dumps({"edits": [dict(zip(("op", "index", "text"), edit)) for edit in edits],
+                       "confidence": confidence})
+
+
+def test_edits_use_the_original_numbering():
+    paragraphs, separator = split_paragraphs("First.\n\nSecond.\n\nThird.")
+    assert (paragraphs, separator) == (PARAGRAPHS, "\n\n")
+    edits = [ParagraphEdit(op="delete", index=0), ParagraphEdit(op="replace", index=1, text=" Two. "),
+             ParagraphEdit(op="insert_after", index=1, text="Two and a half."),
+             ParagraphEdit(op="insert_after", index=-1, text="Zero.")]
+    assert apply_patch(paragraphs, edits, separator) == "Zero.\n\nTwo.\n\nTwo and a half.\n\nThird."
+
+
+@pytest.mark.parametrize("edit", [("replace", 3, "x"), ("delete", -1, ""), ("insert_after", 3, "x"),
+                                  ("insert_after", -2, "x")])
+def test_out_of_range_indices_are_rejected(edit):
+    assert parse_section_patch(patch_json(edit), len(PARAGRAPHS)) is None
+
+
+@pytest.mark.parametrize("edits", [
+    [("replace", 1, "a"), ("replace", 1, "b")],
+    [("replace", 1, "a"), ("delete", 1, "")],
+    [("delete", 0, ""), ("delete", 1, ""), ("delete", 2, "")],  # nothing would be left
+])
+def test_overlapping_and_destructive_edits_are_rejected(edits):
+    assert parse_section_patch(patch_json(*edits), len(PARAGRAPHS)) is None
+
+
+def test_several_inserts_after_the_same_paragraph_are_kept_in_order():
+    patch = parse_section_patch(patch_json(("insert_after", 0, "a"), ("insert_after", 0, "b")), len(PARAGRAPHS))
+    assert apply_patch(PARAGRAPHS, patch.edits) == "First.\n\na\n\nb\n\nSecond.\n\nThird."
+
+
+@pytest.mark.parametrize("response", [
+    "not json",
+    '{"edits": [{"op": "replace", "index": 0, "text": "x"}]',  # truncated
+    '{"edits": [], "confidence": 0.9}',
+    '{"edits": [{"op": "rewrite", "index": 0, "text": "x"}], "confidence": 0.9}',
+    '{"edits": [{"op": "replace", "index": 0, "text": "  "}], "confidence": 0.9}',
+])
+def test_invalid_responses_are_rejected(response):
+    assert parse_section_patch(response, len(PARAGRAPHS)) is None
+
+
+def test_fenced_json_is_accepted():
+    patch = parse_section_patch(f"```json\n{patch_json(('replace', 2, 'Three.'))}\n```", len(PARAGRAPHS))
+    assert apply_patch(PARAGRAPHS, patch.edits) == "First.\n\nSecond.\n\nThree."
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from src.utils.reflection import parse_batch_reflection
+
+SECTIONS = ["Installation", "Usage"]
+
+
+def test_rules_are_kept_only_for_sections_in_the_batch():
+    response = json.dumps({
+        "global_rules": ["Use numbered steps.", "NONE", ""],
+        "section_rules": [
+            {"section": "Installation", "rules": ["List the prerequisites first. ", "none"]},
+            {"section": "Installation", "rules": ["Show the version command."]},
+            {"section": "Troubleshooting", "rules": ["Not part of this batch."]},
+            {"section": "Usage", "rules": ["NONE"]},
+        ],
+    })
+    global_rules, specific_rules = parse_batch_reflection(response, SECTIONS)
+    assert global_rules == ["Use numbered steps."]
+    # Usage only had "NONE"; Troubleshooting was not in the batch
+    assert specific_rules == {"Installation": ["List the prerequisites first.", "Show the version command."]}
+
+
+def test_missing_sections_and_fields_yield_no_rules():
+    assert parse_batch_reflection('{"global_rules": ["Be concise."]}', SECTIONS) == (["Be concise."], {})
+    assert parse_batch_reflection("{}", SECTIONS) == ([], {})
+
+
+def test_fenced_json_is_accepted():
+    response = '```json\n{"section_rules": [{"section": "Usage", "rules": ["Add an example."]}]}\n```'
+    assert parse_batch_reflection(response, SECTIONS) == ([], {"Usage": ["Add an example."]})
+
+
+@pytest.mark.parametrize("response", [
+    "GLOBAL: Use numbered steps.\nSPECIFIC: NONE",
+    '{"global_rules": "Use numbered steps."}',
+    '{"section_rules": [{"rules": ["No section name."]}]}',
+])
+def test_invalid_responses_return_none(response):
+    assert parse_batch_reflection(response, SECTIONS) is None
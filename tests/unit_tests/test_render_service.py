@@ -0,0 +1,100 @@
+import io
+import queue
+from types import SimpleNamespace
+
+import src.utils.render_service as render_module
+from src.utils.render_service import RenderService
+
+
+class FakeWorker:
+    def request(self, job, timeout):
+        return {"status": "ok"}
+
+    def stop(self, force=False):
+        pass
+
+
+def test_jobs_fail_while_workers_cannot_start_and_recover(monkeypatch):
+    starts = []
+
+    def start():
+        starts.append(1)
+        if len(starts) <= 2:
+            raise OSError("no processes left")
+        return FakeWorker()
+
+    monkeypatch.setattr(render_module, "_Worker", start)
+    service = RenderService(workers=1)
+    try:
+        failed = service.wait(service.submit("t", [], "a.docx"), timeout=5)
+        assert failed["status"] == "failed" and "could not be started" in failed["error"]
+        # The next job starts a worker again
+        assert service.wait(service.submit("t", [], "b.docx"), timeout=5)["status"] == "done"
+    finally:
+        service.shutdown()
+
+
+def test_finished_jobs_are_pruned(monkeypatch):
+    monkeypatch.setattr(render_module, "_Worker", FakeWorker)
+    monkeypatch.setenv("RENDER_MAX_JOBS", "2")
+    service = RenderService(workers=1)
+    try:
+        job_ids = [service.submit("t", [], f"{i}.docx") for i in range(4)]
+        service.wait(job_ids[-1], timeout=5)
+        assert list(service.jobs) == job_ids[2:]
+
+        service.job_ttl = 0
+        service.submit("t", [], "last.docx")
+        assert job_ids[3] not in service.jobs
+    finally:
+        service.shutdown()
+
+
+def test_jobs_with_the_same_affinity_use_the_same_worker(monkeypatch):
+    workers = []
+
+    class RecordingWorker(FakeWorker):
+        def __init__(self):
+            workers.append(self)
+            self.paths = []
+
+        def request(self, job, timeout):
+            self.paths.append(job["path"])
+            return {"status": "ok", "rendered_sections": 0}
+
+    monkeypatch.setattr(render_module, "_Worker", RecordingWorker)
+    service = RenderService(workers=3)
+    try:
+        job_ids = [service.submit("t", [], f"{i}.docx", affinity="thread-1") for i in range(5)]
+        service.wait(job_ids[-1], timeout=5)
+        assert sorted(len(worker.paths) for worker in workers) == [0, 0, 5]
+    finally:
+        service.shutdown()
+
+
+def test_invalid_worker_output_fails_the_pending_job():
+    worker = object.__new__(render_module._Worker)
+    worker.process = SimpleNamespace(stdout=io.StringIO('{"status": "ok"}\nTraceback (most recent call last):\n'))
+    worker.replies = queue.Queue()
+    worker._read()
+
+    assert worker.replies.get_nowait() == {"status": "ok"}
+    failed = worker.replies.get_nowait()
+    assert failed["status"] == "failed" and "Traceback" in failed["error"]
+    assert worker.replies.empty()
+
+
+def test_failing_on_done_callback_is_logged(monkeypatch):
+    logged = []
+    monkeypatch.setattr(render_module, "_Worker", FakeWorker)
+    monkeypatch.setattr(render_module.logger, "exception", logged.append)
+    service = RenderService(workers=1)
+
+    def on_done(status):
+        raise RuntimeError("callback failed")
+
+    job_id = service.submit("t", [], "a.docx", on_done=on_done)
+    # Joins the dispatcher, which runs the callback after the job is seen finished
+    service.shutdown()
+    assert service.status(job_id)["status"] == "done"
+    assert logged == [f"[RENDER] on_done callback of job {job_id} failed"]
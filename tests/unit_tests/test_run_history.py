@@ -0,0 +1,24 @@
+import numpy as np
+
+from src.utils import settings
+from src.utils.run_history import ColumnarTable, RunHistory
+
+
+def test_append_after_a_partial_row_keeps_columns_aligned(tmp_path):
+    table = ColumnarTable(tmp_path / "runs", {"run_id": np.int64, "latency_s": np.float32})
+    table.append({"run_id": [0], "latency_s": [1.5]})
+    # A crash between column writes: run_id got the next row, latency_s did not
+    with open(tmp_path / "runs" / "run_id.bin", "ab") as f:
+        np.asarray([99], dtype=np.int64).tofile(f)
+    assert len(table) == 1
+
+    table.append({"run_id": [1], "latency_s": [2.5]})
+    assert len(table) == 2
+    assert table.column("run_id").tolist() == [0, 1]
+    assert table.column("latency_s").tolist() == [1.5, 2.5]
+
+
+def test_default_directory_is_under_the_repository(monkeypatch, tmp_path):
+    monkeypatch.delenv("RUN_HISTORY_DIR", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert RunHistory().directory == settings.REPO_ROOT / "run_history"
@@ -0,0 +1,40 @@
+from langgraph.checkpoint.base import empty_checkpoint
+
+from src.utils.checkpointing import CoalescingSaver
+from src.utils.section_store import InterningSerializer, SectionStore, section_owner, section_store
+
+
+def put_checkpoint(saver, thread_id, content):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"sections": [{"name": "Intro", "content": content}]}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    return saver.put(config, checkpoint, {"source": "loop", "step": 1}, {"sections": 1})
+
+
+def test_blobs_of_deleted_threads_leave_memory():
+    saver = CoalescingSaver(serde=InterningSerializer(), coalesce=False)
+    shared, own = "shared " * 100, "only in thread a " * 100
+    put_checkpoint(saver, "a", shared)
+    put_checkpoint(saver, "a", own)
+    put_checkpoint(saver, "b", shared)
+    saver.fork_thread("a", "a-fork")
+    evicted = section_store.evicted
+
+    saver.delete_thread("a")
+    # Still referenced by b and by the fork
+    assert section_store.evicted == evicted
+    saver.delete_thread("a-fork")
+    assert section_store.evicted == evicted + 1
+    saver.delete_thread("b")
+    assert section_store.evicted == evicted + 2
+
+
+def test_unreferenced_puts_are_kept_and_mirrored_blobs_reload(tmp_path):
+    store = SectionStore(directory=tmp_path)
+    pinned = store.put("no thread")
+    with section_owner("t"):
+        key = store.put("thread t")
+    assert store.release("t") == 1
+    # Evicted from memory only: the mirror still has it
+    assert store.get(key) == "thread t" and store.get(pinned) == "no thread"
+    assert store.stats()["blobs"] == 2 and store.stats()["threads"] == 0
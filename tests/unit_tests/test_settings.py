@@ -0,0 +1,43 @@
+"""
+Settings set in a .env file apply whichever module is imported first.
+
+Runs in a fresh interpreter, with the .env file given through ENV_FILE and the
+settings removed from the environment.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+PROBE = """
+import json, os
+from src.utils.artifacts import artifact_path
+from src.utils.llm import chat_model
+
+loaded_at_import = "MODEL_PROVIDER" in os.environ
+print(json.dumps({
+    "loaded_at_import": loaded_at_import,
+    "model": type(chat_model()).__name__,
+    "document": str(artifact_path("thread-1", 1)),
+}))
+"""
+
+
+def test_settings_are_read_from_env_file(tmp_path):
+    outputs = tmp_path / "outputs"
+    env_file = tmp_path / ".env"
+    env_file.write_text(f"MODEL_PROVIDER=fake\nOUTPUT_ROOT={outputs}\n")
+
+    env = {k: v for k, v in os.environ.items() if k not in ("MODEL_PROVIDER", "OUTPUT_ROOT")}
+    env.update(ENV_FILE=str(env_file), PYTHONPATH=str(ROOT))
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    output = json.loads(result.stdout.splitlines()[-1])
+    assert output["loaded_at_import"] is False
+    assert output["model"] == "FakeChatModel"
+    assert Path(output["document"]).parent.parent == outputs
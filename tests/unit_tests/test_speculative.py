@@ -0,0 +1,68 @@
+import pytest
+
+import src.graph_agent_complex as agent
+from src.utils.fake_model import FakeChatModel
+from src.utils.llm import set_model_provider
+from src.utils.state import default_initial_state
+
+CONFIDENCES = {"Introduction": 0.2, "Installation": 0.4, "Usage": 0.6}
+
+
+def low_confidence_state(**settings) -> dict:
+    state = default_initial_state("Write a guide about Docker", 0.8, 3, speculative_candidates=2, **settings)
+    state["sections"] = [{"name": "Overview", "content": "Overview draft.", "confidence": 0.9,
+                          "status": "auto_approved"}]
+    state["sections"] += [{"name": name, "content": f"{name} draft.", "confidence": confidence,
+                           "status": "pending_review"} for name, confidence in CONFIDENCES.items()]
+    state["high_confidence_sections"] = ["Overview"]
+    state["review_req_sections"] = list(CONFIDENCES)
+    return state
+
+
+@pytest.fixture
+def candidates_confidence():
+    """Sets the confidence distribution of the candidates the model drafts."""
+    def use(shape):
+        set_model_provider(lambda **kwargs: FakeChatModel(revised_confidence=shape))
+
+    yield use
+    set_model_provider(None)
+
+
+def test_confident_candidates_are_auto_approved(candidates_confidence):
+    candidates_confidence((50.0, 1.0))
+    update = agent.speculative_drafting(low_confidence_state(speculative_reviews_avoided=1))
+
+    assert update["review_req_sections"] == []
+    assert sorted(update["high_confidence_sections"]) == sorted(["Overview", *CONFIDENCES])
+    for section in update["sections"]:
+        assert section["status"] == "auto_approved" and section["confidence"] >= 0.8
+        if section["name"] != "Overview":
+            assert section["content"] != f"{section['name']} draft."
+    assert update["speculative_reviews_avoided"] == 1 + 3
+    assert update["auto_approval_count"] == 3
+    assert update["speculative_calls_used"] == 6 and update["speculative_tokens_used"] > 0
+
+
+def test_weaker_candidates_leave_the_drafts_for_review(candidates_confidence):
+    candidates_confidence((1.0, 50.0))
+    update = agent.speculative_drafting(low_confidence_state())
+
+    # Lowest confidence first
+    assert update["review_req_sections"] == list(CONFIDENCES)
+    assert {s["name"]: s["confidence"] for s in update["sections"][1:]} == CONFIDENCES
+    assert update["speculative_reviews_avoided"] == 0 and update["auto_approval_count"] == 0
+
+
+def test_call_budget_stops_speculation(candidates_confidence):
+    candidates_confidence((50.0, 1.0))
+    state = low_confidence_state(speculative_max_calls=3)
+    update = agent.speculative_drafting(state)
+
+    # Two candidates for the least confident section, one for the next, none for the last
+    assert update["speculative_calls_used"] == 3
+    assert update["review_req_sections"] == ["Usage"]
+    assert update["speculative_reviews_avoided"] == 2
+
+    state.update(update)
+    assert agent.speculative_drafting(state) == {}
@@ -0,0 +1,29 @@
+import time
+
+from src.utils import settings
+from src.utils.tracing import Span, SpanExporter, trace_file
+
+
+def test_flush_does_not_block_on_a_full_queue_or_a_dead_exporter(tmp_path):
+    exporter = SpanExporter(tmp_path / "spans.jsonl", max_queue=1, flush_interval=0.2)
+    exporter._start()
+    exporter.export(Span("first", "trace"))
+    exporter.export(Span("second", "trace"))
+
+    start = time.monotonic()
+    exporter.flush(timeout=5)
+    assert time.monotonic() - start < 2
+    assert exporter.exported + exporter.dropped == 2
+
+    # Never started, or its thread is gone: nothing to wait for
+    SpanExporter(tmp_path / "unused.jsonl").flush()
+    exporter._thread = type("Dead", (), {"is_alive": lambda self: False})()
+    exporter._queue.put(Span("stuck", "trace"))
+    start = time.monotonic()
+    exporter.flush(timeout=5)
+    assert time.monotonic() - start < 1
+
+
+def test_default_trace_file_is_under_the_repository(monkeypatch):
+    monkeypatch.delenv("TRACE_FILE")
+    assert trace_file() == settings.REPO_ROOT / "traces" / "spans.jsonl"
@@ -0,0 +1,22 @@
+import src.graph_agent_complex as agent
+from src.utils.fake_model import FakeChatModel
+from src.utils.llm import set_model_provider
+from src.utils.reviewer import ScriptedReviewer, run_with_reviewer
+from src.utils.state import default_initial_state
+
+
+def test_speculative_drafts_are_metered():
+    # Low confidences, so every section gets speculative candidates
+    set_model_provider(lambda **kwargs: FakeChatModel(confidence=(3.0, 4.0)))
+    try:
+        graph = agent.compile_graph()
+        state = default_initial_state("Write a guide about Docker", 0.8, 1, render_mode="inline",
+                                      speculative_candidates=2, speculative_max_calls=4)
+        final = run_with_reviewer(graph, state, {"configurable": {"thread_id": "speculative-usage"}},
+                                  ScriptedReviewer(reject_rate=0.0))
+    finally:
+        set_model_provider(None)
+
+    usage = final["token_usage"]["speculative_drafting"]["0"]
+    assert usage["calls"] == final["speculative_calls_used"] == 4
+    assert usage["input_tokens"] > 0 and usage["output_tokens"] > 0